@@ -2,7 +2,9 @@
 Flask application untuk sistem absensi QR Code (Refactored)
 Aplikasi ini mengelola absensi siswa menggunakan QR code dengan timezone WIB.
 """
+import atexit
 import os
+from functools import partial
 from flask import Flask
 try:
     from flask_cors import CORS
@@ -12,6 +14,7 @@ except ImportError:
     print("Warning: flask_cors not installed. Install with: pip install flask-cors")
 
 from config import Config
+from init_db import migrate
 
 # Import blueprints
 from routes.auth import auth_bp
@@ -19,6 +22,18 @@ from routes.guru import guru_bp
 from routes.siswa import siswa_bp
 from routes.api_siswa import api_siswa_bp
 from routes.api_absensi import api_absensi_bp
+from routes.api_metrics import api_metrics_bp
+from services.ingest_service import JournaledIngest, ScanIngestQueue
+from services.siswa_service import get_roster_cache_stats
+from services.token_service import get_token_cache_stats, sweep_qr_tokens
+from utils import admission, db, query_log
+from utils.cache import TTLCache
+from utils.coalesce import RequestCoalescer
+from utils.event_hub import configure_event_hub
+from utils.metrics import register_metrics_provider
+from utils.qr import configure_qr_cache, get_qr_cache_stats
+from utils.qr_store import QRFileStore
+from utils.scheduler import scheduler
 
 
 def create_app(config_class=Config):
@@ -43,21 +58,138 @@ def create_app(config_class=Config):
     out_dir = os.path.join(flask_app.root_path, qrcode_folder)
     os.makedirs(out_dir, exist_ok=True)
 
+    # File QR lama dibersihkan saat startup dan terjadwal
+    qr_store = QRFileStore(
+        out_dir,
+        max_age_seconds=flask_app.config.get('QRCODE_MAX_AGE_SECONDS', 86400),
+        max_bytes=flask_app.config.get('QRCODE_MAX_BYTES', 50 * 1024 * 1024)
+    )
+    qr_store.cleanup()
+    flask_app.extensions['qr_store'] = qr_store
+
+    configure_qr_cache(flask_app.config.get('QR_CACHE_SIZE', 256))
+
+    # Backend SQLite (lokal/benchmark): skema dibuat/diperbarui otomatis
+    if db.get_dialect() == 'sqlite':
+        migrate()
+
+    # Koneksi database request-scoped (dilepas saat teardown)
+    db.init_app(flask_app)
+    # Timing query, slow-query log, header X-DB-Query-Count / X-DB-Time-Ms
+    query_log.init_app(flask_app)
+    # Batas konkurensi endpoint database (503 + Retry-After saat overload)
+    limiters = admission.init_app(flask_app)
+
     # Register blueprints
     flask_app.register_blueprint(auth_bp)
     flask_app.register_blueprint(guru_bp)
     flask_app.register_blueprint(siswa_bp)
     flask_app.register_blueprint(api_siswa_bp)
     flask_app.register_blueprint(api_absensi_bp)
+    flask_app.register_blueprint(api_metrics_bp)
+
+    # Metrik runtime
+    register_metrics_provider('db_pool', db.get_pool_stats)
+    register_metrics_provider('sql', query_log.get_query_stats)
+    register_metrics_provider('token_cache', get_token_cache_stats)
+    register_metrics_provider('roster_cache', get_roster_cache_stats)
+    register_metrics_provider('admission', partial(admission.get_admission_stats, limiters))
+    register_metrics_provider('qr_cache', get_qr_cache_stats)
+    register_metrics_provider('qr_files', qr_store.stats)
+    register_metrics_provider('scheduler', scheduler.stats)
+
+    # Fan-out live feed absensi ke dashboard guru
+    event_hub = configure_event_hub(
+        buffer_size=flask_app.config.get('SSE_CLIENT_BUFFER_SIZE', 100),
+        max_subscribers=flask_app.config.get('SSE_MAX_CLIENTS', 200)
+    )
+    register_metrics_provider('event_hub', event_hub.stats)
+
+    # Dedupe scan berulang dari halaman scanner siswa
+    coalesce_window = flask_app.config.get('SCAN_COALESCE_WINDOW_SECONDS', 5)
+    if coalesce_window:
+        coalescer = RequestCoalescer(window=coalesce_window)
+        flask_app.extensions['scan_coalescer'] = coalescer
+        register_metrics_provider('scan_coalescer', coalescer.stats)
+
+    # idempotency_key batch scan yang sudah diproses
+    scan_idempotency = TTLCache(
+        maxsize=100000,
+        default_ttl=flask_app.config.get('SCAN_IDEMPOTENCY_TTL_SECONDS', 86400)
+    )
+    flask_app.extensions['scan_idempotency'] = scan_idempotency
+    register_metrics_provider('scan_idempotency', scan_idempotency.stats)
+
+    # Ingest scan write-behind / journal (opsional)
+    ingest_mode = flask_app.config.get('SCAN_INGEST_MODE', 'direct')
+    ingest = None
+    if ingest_mode == 'queue':
+        ingest = ScanIngestQueue(
+            maxsize=flask_app.config.get('SCAN_QUEUE_MAXSIZE', 10000),
+            batch_size=flask_app.config.get('SCAN_QUEUE_BATCH_SIZE', 200),
+            flush_interval=flask_app.config.get('SCAN_QUEUE_FLUSH_INTERVAL', 0.5)
+        )
+    elif ingest_mode == 'journal':
+        ingest = JournaledIngest(
+            os.path.join(flask_app.root_path, flask_app.config['SCAN_JOURNAL_PATH']),
+            replay_interval=flask_app.config.get('SCAN_JOURNAL_REPLAY_INTERVAL', 0.5)
+        )
+    if ingest is not None:
+        flask_app.extensions['scan_ingest'] = ingest
+        register_metrics_provider('scan_ingest', ingest.stats)
+
+    # Tugas latar belakang
+    scheduler.add(
+        'qr_token_sweeper',
+        flask_app.config.get('TOKEN_SWEEP_INTERVAL_SECONDS', 60),
+        partial(
+            sweep_qr_tokens,
+            batch_size=flask_app.config.get('TOKEN_SWEEP_BATCH_SIZE', 500),
+            max_batches=flask_app.config.get('TOKEN_SWEEP_MAX_BATCHES', 20),
+            retention_days=flask_app.config.get('TOKEN_RETENTION_DAYS', 30)
+        )
+    )
+    scheduler.add(
+        'qr_file_cleanup',
+        flask_app.config.get('QRCODE_CLEANUP_INTERVAL_SECONDS', 3600),
+        qr_store.cleanup
+    )
 
     return flask_app
 
 
+def start_background(flask_app):
+    """
+    Menjalankan thread latar belakang (ingest scan dan scheduler).
+    Dipanggil hanya oleh proses yang melayani request, bukan saat
+    modul di-import (test, init_db, proses induk reloader).
+
+    Args:
+        flask_app: Flask app hasil create_app()
+    """
+    if flask_app.extensions.get('background_started'):
+        return
+    flask_app.extensions['background_started'] = True
+
+    ingest = flask_app.extensions.get('scan_ingest')
+    if ingest is not None:
+        ingest.start()
+        # Antrian/journal dikosongkan ke database saat proses berhenti
+        atexit.register(ingest.stop)
+    if flask_app.config.get('SCHEDULER_ENABLED', True):
+        scheduler.start()
+
+
 # Create application instance
 app = create_app()
 
 
 if __name__ == '__main__':
+    DEBUG = True
+    # Dengan reloader, proses induk hanya memantau file; thread latar
+    # belakang dijalankan di proses anak yang melayani request
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background(app)
     # Jalankan aplikasi
     # Akses dari perangkat lain di LAN: http://[IP_ADDRESS]:5000
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    app.run(host='0.0.0.0', port=5000, debug=DEBUG)
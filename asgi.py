@@ -0,0 +1,29 @@
+"""
+Entry point ASGI untuk sistem absensi QR Code
+
+Scan token siswa dan generate token guru berjalan native asyncio
+(aiomysql jika terpasang); route lain dijalankan aplikasi Flask di
+thread pool kecil. Contoh:
+
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+from app import app as flask_app, start_background
+from routes.asgi_routes import ASYNC_ROUTES
+from utils.asgi import AsgiApp
+from utils.async_db import configure_async_db
+from utils.metrics import register_metrics_provider
+
+async_db = configure_async_db(
+    pool_size=flask_app.config.get('ASYNC_DB_POOL_SIZE', 20),
+    executor_threads=flask_app.config.get('ASYNC_DB_EXECUTOR_THREADS', 4)
+)
+register_metrics_provider('async_db', async_db.stats)
+
+# uvicorn meng-import modul ini di proses yang melayani request
+start_background(flask_app)
+
+app = AsgiApp(
+    flask_app,
+    ASYNC_ROUTES,
+    wsgi_threads=flask_app.config.get('ASGI_WSGI_THREADS', 8)
+)
@@ -22,6 +22,43 @@ DB_CONFIG = {
     'database': 'absensi_qr'
 }
 
+# Backend database: 'mysql' (default) atau 'sqlite'
+DB_BACKEND = os.environ.get('DB_BACKEND', 'mysql').lower()
+
+# Dipakai jika DB_BACKEND = 'sqlite'; ':memory:' untuk database in-memory
+SQLITE_CONFIG = {
+    'database': os.environ.get('SQLITE_PATH', 'absensi_qr.sqlite3'),
+    'timeout': 5.0
+}
+
+# ========================================
+# CONNECTION POOL CONFIGURATION
+# ========================================
+DB_POOL_CONFIG = {
+    'pool_size': int(os.environ.get('DB_POOL_SIZE', 10)),        # koneksi idle yang dipertahankan
+    'max_overflow': int(os.environ.get('DB_POOL_OVERFLOW', 10)), # koneksi tambahan saat burst
+    'idle_timeout': int(os.environ.get('DB_POOL_IDLE_TIMEOUT', 300)),  # detik
+    'pool_timeout': float(os.environ.get('DB_POOL_TIMEOUT', 5)),  # detik menunggu koneksi
+    'health_check': True  # ping koneksi saat diambil dari pool
+}
+
+# ========================================
+# CACHE CONFIGURATION
+# ========================================
+TOKEN_CACHE_CONFIG = {
+    'maxsize': 1024,      # jumlah token yang di-cache
+    'negative_ttl': 2,    # detik menyimpan hasil "token tidak ditemukan"
+    'revocation_ttl': 30  # detik menyimpan status revokasi token bertanda tangan
+}
+
+# Profil siswa (nama, jurusan, kelas) yang disalin ke absensi setiap scan.
+# Diinvalidasi oleh create/update/delete siswa; TTL membatasi data basi
+# jika siswa diubah dari proses lain.
+ROSTER_CACHE_CONFIG = {
+    'maxsize': int(os.environ.get('ROSTER_CACHE_SIZE', 5000)),
+    'ttl': int(os.environ.get('ROSTER_CACHE_TTL', 3600))  # detik
+}
+
 # ========================================
 # FLASK CONFIGURATION
 # ========================================
@@ -32,10 +69,77 @@ class Config:
     SESSION_COOKIE_SAMESITE = 'Lax'
     SESSION_COOKIE_HTTPONLY = True
 
+    # SQL instrumentation
+    SLOW_QUERY_THRESHOLD_MS = float(os.environ.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    SQL_LOG_REQUESTS = False  # log total query & waktu DB per request
+
     # QR Code settings
     TOKEN_TTL_SECONDS = 300  # 5 menit
+    QR_CACHE_SIZE = 256  # gambar QR (PNG) yang disimpan di memori
+    # Token bertanda tangan (SECRET_KEY): scan diverifikasi tanpa lookup qr_token
+    SIGNED_TOKENS = os.environ.get('SIGNED_TOKENS', '0') == '1'
+
+    # Ingest scan: 'direct' (insert per scan), 'queue' (write-behind batch),
+    # atau 'journal' (journal lokal + replay, tetap jalan saat MySQL down)
+    SCAN_INGEST_MODE = os.environ.get('SCAN_INGEST_MODE', 'direct')
+    SCAN_QUEUE_MAXSIZE = 10000
+    SCAN_QUEUE_BATCH_SIZE = 200
+    SCAN_QUEUE_FLUSH_INTERVAL = 0.5  # detik
+    SCAN_JOURNAL_PATH = os.environ.get('SCAN_JOURNAL_PATH', 'journal/scan_journal.jsonl')
+    SCAN_JOURNAL_REPLAY_INTERVAL = 0.5  # detik
+
+    # Scan identik (siswa + token sama) dalam jendela ini dijawab dari memori
+    SCAN_COALESCE_WINDOW_SECONDS = 5
+
+    # Upload batch scan (/siswa/scan_batch)
+    SCAN_BATCH_MAX_ITEMS = 100
+    SCAN_BATCH_CLOCK_SKEW_SECONDS = 120  # toleransi jam HP siswa
+    # Scan lebih tua dari ini (detik) atau dari hari WIB sebelumnya ditolak
+    SCAN_BATCH_MAX_UPLOAD_LAG = 6 * 3600
+    SCAN_IDEMPOTENCY_TTL_SECONDS = 24 * 3600
+
+    # Pagination /api/absensi
+    ABSENSI_PAGE_SIZE = 50
+    ABSENSI_MAX_PAGE_SIZE = 200
+
+    # Rekap /api/absensi/rekap: rentang tanggal maksimum per request
+    REKAP_MAX_DAYS = 366
+
+    # Live feed absensi guru (/guru/absensi_stream, Server-Sent Events)
+    SSE_HEARTBEAT_SECONDS = 15   # komentar keep-alive saat tidak ada scan
+    SSE_CLIENT_BUFFER_SIZE = 100  # event per dashboard sebelum dibuang (resync)
+    SSE_MAX_CLIENTS = 200         # koneksi live maksimum per proses
+
+    # Absensi manual guru (/api/absensi/manual)
+    MANUAL_ABSEN_MAX_ENTRIES = 5000
+
+    # Admission control endpoint yang menyentuh database
+    ADMISSION_CONTROL_ENABLED = os.environ.get('ADMISSION_CONTROL_ENABLED', '1') == '1'
+    ADMISSION_LIMITS = {
+        # Scan siswa: jalur terpanas, dipisah agar tidak tertahan export/dashboard
+        'scan': {'max_concurrent': 12, 'max_queue': 100, 'queue_timeout': 2.0},
+        'db': {'max_concurrent': 6, 'max_queue': 30, 'queue_timeout': 2.0}
+    }
+    ADMISSION_RETRY_AFTER = 1  # detik, header Retry-After saat ditolak
+
+    # Entry point ASGI (asgi.py)
+    ASYNC_DB_POOL_SIZE = 20          # koneksi aiomysql
+    ASYNC_DB_EXECUTOR_THREADS = 4    # thread DB jika aiomysql tidak terpasang
+    ASGI_WSGI_THREADS = 8            # thread untuk route Flask biasa
+
+    # Background scheduler (sweeper qr_token, dll.)
+    SCHEDULER_ENABLED = os.environ.get('SCHEDULER_ENABLED', '1') == '1'
+    TOKEN_SWEEP_INTERVAL_SECONDS = 60
+    TOKEN_SWEEP_BATCH_SIZE = 500
+    TOKEN_SWEEP_MAX_BATCHES = 20  # per putaran, sisanya di putaran berikutnya
+    TOKEN_RETENTION_DAYS = 30     # token expired dihapus setelah ini
 
     # File paths
     STATIC_FOLDER = 'static'
     TEMPLATE_FOLDER = 'templates'
     QRCODE_FOLDER = 'static/qrcodes'
+
+    # Garbage collection static/qrcodes
+    QRCODE_MAX_AGE_SECONDS = 24 * 3600         # file QR lebih tua dihapus
+    QRCODE_MAX_BYTES = 50 * 1024 * 1024        # budget ukuran folder
+    QRCODE_CLEANUP_INTERVAL_SECONDS = 3600
@@ -1,16 +1,32 @@
 """
 Database initialization script for absensi_qr database
+
+Skema dikelola lewat migrasi bernomor. Versi yang sudah diterapkan
+dicatat di tabel schema_version sehingga database lama cukup
+menjalankan migrasi yang belum ada. Migrasi berlaku untuk backend
+MySQL maupun SQLite (lihat DB_BACKEND di config.py).
+
+Usage:
+    python init_db.py            # terapkan semua migrasi yang belum ada
+    python init_db.py --status   # tampilkan versi skema saat ini
+    python init_db.py --rebuild-rekap [--mulai YYYY-MM-DD] [--selesai YYYY-MM-DD]
+                                 # bangun ulang rekap harian dari absensi
 """
-import mysql.connector
-from config import DB_CONFIG
+import argparse
+from datetime import date
 
-def create_tables():
-    """Create all required tables if they don't exist"""
-    conn = mysql.connector.connect(**DB_CONFIG)
-    cur = conn.cursor()
+from utils.db import get_dialect, open_connection
+from utils.time_helper import get_current_time_wib
 
-    # Create qr_token table
-    cur.execute("""
+# ========================================
+# MIGRATIONS
+# ========================================
+# Setiap migrasi: (versi, deskripsi, [statement SQL]). Statement berbentuk
+# (dialek, SQL) hanya dijalankan di backend itu.
+# Jangan ubah migrasi yang sudah dirilis; tambahkan migrasi baru.
+MIGRATIONS = [
+    (1, "Skema awal", [
+        """
         CREATE TABLE IF NOT EXISTS qr_token (
             id INT AUTO_INCREMENT PRIMARY KEY,
             token VARCHAR(255) UNIQUE NOT NULL,
@@ -18,10 +34,8 @@ def create_tables():
             waktu_expired DATETIME NOT NULL,
             status ENUM('aktif', 'expired') DEFAULT 'aktif'
         )
-    """)
-
-    # Create siswa table
-    cur.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS siswa (
             id_siswa INT AUTO_INCREMENT PRIMARY KEY,
             username VARCHAR(50) UNIQUE NOT NULL,
@@ -31,12 +45,10 @@ def create_tables():
             jurusan VARCHAR(50),
             kelas VARCHAR(20)
         )
-    """)
-
-    # Create absensi table
-    cur.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS absensi (
-            id_absensi INT AUTO_INCREMENT PRIMARY KEY,
+            id_absen INT AUTO_INCREMENT PRIMARY KEY,
             id_siswa INT,
             waktu_absen DATETIME NOT NULL,
             token_qr VARCHAR(255),
@@ -46,22 +58,193 @@ def create_tables():
             kelas VARCHAR(20),
             FOREIGN KEY (id_siswa) REFERENCES siswa(id_siswa)
         )
-    """)
-
-    # Create guru table (assuming it exists based on session usage)
-    cur.execute("""
+        """,
+        """
         CREATE TABLE IF NOT EXISTS guru (
             id_guru INT AUTO_INCREMENT PRIMARY KEY,
             username VARCHAR(50) UNIQUE NOT NULL,
             password VARCHAR(255) NOT NULL,
             nama_guru VARCHAR(100) NOT NULL
         )
-    """)
+        """
+    ]),
+    (2, "Index absensi untuk cek duplikat harian dan riwayat", [
+        # Cek duplikat per siswa per hari & riwayat siswa (range scan)
+        "CREATE INDEX idx_absensi_siswa_waktu ON absensi (id_siswa, waktu_absen)",
+        # Daftar absensi terbaru / filter rentang tanggal
+        "CREATE INDEX idx_absensi_waktu ON absensi (waktu_absen)"
+    ]),
+    (3, "Guru pembuat token di qr_token (audit token bertanda tangan)", [
+        "ALTER TABLE qr_token ADD COLUMN issued_by VARCHAR(50) NULL"
+    ]),
+    (4, "Index qr_token untuk sweeper expiry dan purge", [
+        "CREATE INDEX idx_qr_token_status_expired ON qr_token (status, waktu_expired)",
+        "CREATE INDEX idx_qr_token_expired ON qr_token (waktu_expired)"
+    ]),
+    (5, "Kolom tanggal dan unique key absensi (id_siswa, tanggal)", [
+        "ALTER TABLE absensi ADD COLUMN tanggal DATE NULL",
+        "UPDATE absensi SET tanggal = DATE(waktu_absen)",
+        # Duplikat lama (race condition sebelum unique key) dibuang,
+        # absensi pertama per siswa per hari dipertahankan
+        """
+        DELETE FROM absensi WHERE id_absen NOT IN (
+            SELECT id_absen FROM (
+                SELECT MIN(id_absen) AS id_absen FROM absensi
+                GROUP BY id_siswa, tanggal
+            ) AS pertama
+        )
+        """,
+        "CREATE UNIQUE INDEX uq_absensi_siswa_tanggal ON absensi (id_siswa, tanggal)"
+    ]),
+    (6, "Index absensi per kelas untuk filter laporan/export", [
+        # "hari ini, kelas X" cukup membaca baris kelas itu saja
+        "CREATE INDEX idx_absensi_kelas_waktu ON absensi (kelas, waktu_absen)"
+    ]),
+    (7, "Rekap harian absensi_harian (tanggal x kelas x jurusan x status)", [
+        """
+        CREATE TABLE IF NOT EXISTS absensi_harian (
+            tanggal DATE NOT NULL,
+            kelas VARCHAR(20) NOT NULL DEFAULT '',
+            jurusan VARCHAR(50) NOT NULL DEFAULT '',
+            status VARCHAR(20) NOT NULL,
+            jumlah INT NOT NULL DEFAULT 0,
+            PRIMARY KEY (tanggal, kelas, jurusan, status)
+        )
+        """,
+        # Rekap ulang satu tanggal/kelas (insert bulk, absensi manual)
+        "CREATE INDEX idx_absensi_tanggal_kelas ON absensi (tanggal, kelas)",
+        """
+        INSERT INTO absensi_harian (tanggal, kelas, jurusan, status, jumlah)
+        SELECT tanggal, COALESCE(kelas, ''), COALESCE(jurusan, ''),
+               COALESCE(status, 'hadir'), COUNT(*)
+        FROM absensi WHERE tanggal IS NOT NULL
+        GROUP BY tanggal, COALESCE(kelas, ''), COALESCE(jurusan, ''), COALESCE(status, 'hadir')
+        """
+    ]),
+    (8, "Status token 'dicabut' (revokasi guru), terpisah dari 'expired' sweeper", [
+        # SQLite menyimpan ENUM sebagai VARCHAR(20): tidak perlu diubah
+        ('mysql', "ALTER TABLE qr_token MODIFY status "
+                  "ENUM('aktif', 'expired', 'dicabut') DEFAULT 'aktif'")
+    ]),
+    (9, "Versi perubahan absensi (polling delta dan ETag /api/absensi)", [
+        # Satu baris counter; dinaikkan di transaksi yang sama dengan
+        # insert/upsert absensi sehingga urutan versi = urutan commit
+        """
+        CREATE TABLE IF NOT EXISTS absensi_versi (
+            id INT PRIMARY KEY,
+            versi BIGINT NOT NULL
+        )
+        """,
+        "ALTER TABLE absensi ADD COLUMN versi BIGINT NULL",
+        # Watermark since lama (id_absen) tetap berlaku
+        "UPDATE absensi SET versi = id_absen",
+        "INSERT INTO absensi_versi (id, versi) SELECT 1, COALESCE(MAX(id_absen), 0) FROM absensi",
+        "CREATE INDEX idx_absensi_versi ON absensi (versi)"
+    ])
+]
+
+SCHEMA_VERSION_DDL = """
+    CREATE TABLE IF NOT EXISTS schema_version (
+        version INT PRIMARY KEY,
+        description VARCHAR(255) NOT NULL,
+        applied_at DATETIME NOT NULL
+    )
+"""
+
 
-    conn.commit()
-    cur.close()
-    conn.close()
+def get_schema_version(cur):
+    """
+    Membaca versi skema yang sudah diterapkan
+
+    Args:
+        cur: Database cursor
+
+    Returns:
+        int: Versi tertinggi yang tercatat (0 jika belum ada)
+    """
+    cur.execute(SCHEMA_VERSION_DDL)
+    cur.execute("SELECT MAX(version) FROM schema_version")
+    row = cur.fetchone()
+    return (row[0] or 0) if row else 0
+
+
+def migrate(conn=None, target=None):
+    """
+    Menerapkan migrasi yang belum ada secara berurutan
+
+    Args:
+        conn: Koneksi database (opsional, default koneksi baru ke backend aktif)
+        target (int): Versi tujuan (default versi terbaru)
+
+    Returns:
+        list: Versi migrasi yang baru diterapkan
+    """
+    own_conn = conn is None
+    if own_conn:
+        conn = open_connection()
+    cur = conn.cursor()
+    applied = []
+
+    try:
+        current = get_schema_version(cur)
+        for version, description, statements in MIGRATIONS:
+            if version <= current or (target is not None and version > target):
+                continue
+            for statement in statements:
+                if isinstance(statement, tuple):
+                    dialect, statement = statement
+                    if dialect != get_dialect():
+                        continue
+                cur.execute(statement)
+            cur.execute(
+                "INSERT INTO schema_version (version, description, applied_at) "
+                "VALUES (%s, %s, %s)",
+                (version, description, get_current_time_wib())
+            )
+            # DDL MySQL auto-commit; commit per migrasi agar versi tercatat
+            conn.commit()
+            applied.append(version)
+            print(f"Migrasi {version} diterapkan: {description}")
+        return applied
+    finally:
+        cur.close()
+        if own_conn:
+            conn.close()
+
+
+def create_tables():
+    """Create all required tables and apply pending migrations"""
+    migrate()
     print("Database tables created successfully!")
 
+
 if __name__ == "__main__":
-    create_tables()
+    parser = argparse.ArgumentParser(description="Migrasi skema absensi_qr")
+    parser.add_argument('--status', action='store_true',
+                        help="tampilkan versi skema saat ini")
+    parser.add_argument('--rebuild-rekap', action='store_true',
+                        help="bangun ulang tabel absensi_harian dari absensi")
+    parser.add_argument('--mulai', type=date.fromisoformat,
+                        help="awal rentang --rebuild-rekap (YYYY-MM-DD)")
+    parser.add_argument('--selesai', type=date.fromisoformat,
+                        help="akhir rentang --rebuild-rekap (YYYY-MM-DD, inklusif)")
+    args = parser.parse_args()
+
+    if args.status:
+        connection = open_connection()
+        cursor = connection.cursor()
+        try:
+            version = get_schema_version(cursor)
+            latest = MIGRATIONS[-1][0]
+            print(f"Versi skema: {version} (terbaru: {latest})")
+        finally:
+            cursor.close()
+            connection.close()
+    elif args.rebuild_rekap:
+        # pylint: disable-next=import-outside-toplevel
+        from services.absensi_service import rebuild_absensi_harian
+        migrate()
+        written = rebuild_absensi_harian(args.mulai, args.selesai)
+        print(f"Rekap harian dibangun ulang: {written} baris")
+    else:
+        create_tables()
@@ -3,6 +3,7 @@ from .siswa import siswa_bp
 from .guru import guru_bp
 from .token import token_bp
 from .api_absensi import api_absensi_bp
+from .api_metrics import api_metrics_bp
 
 def register_blueprints(app):
     app.register_blueprint(auth_bp)
@@ -10,3 +11,4 @@ def register_blueprints(app):
     app.register_blueprint(siswa_bp)
     app.register_blueprint(token_bp)
     app.register_blueprint(api_absensi_bp)
+    app.register_blueprint(api_metrics_bp)
@@ -1,35 +1,226 @@
 """
 API Absensi Blueprint - Handles absensi API and export routes
 """
+import hashlib
 import io
-from datetime import datetime
-from flask import Blueprint, jsonify, redirect, url_for, session, send_file
+import json
+from datetime import date, datetime
+from flask import (
+    Blueprint, current_app, jsonify, redirect,
+    request, url_for, session, send_file
+)
 from mysql.connector import Error
 from openpyxl import Workbook
-from services.absensi_service import get_all_absensi, get_absensi_with_filters
+from services.absensi_service import (
+    ABSEN_STATUSES,
+    get_absensi_page,
+    get_absensi_since,
+    get_absensi_versi,
+    get_absensi_with_filters,
+    get_rekap_harian,
+    upsert_absen_manual
+)
+from utils.admission import admission_controlled
+from utils.db import transaction
+from utils.pagination import clamp_page_size, decode_cursor, encode_cursor
 from utils.time_helper import get_current_time_wib, format_datetime
 
 api_absensi_bp = Blueprint('api_absensi', __name__, url_prefix='/api')
 
 
+def _filters_from_args(args):
+    """
+    Baca filter absensi dari query string
+
+    Args:
+        args: request.args
+
+    Returns:
+        dict: Filter untuk absensi_service (tanggal sebagai date)
+
+    Raises:
+        ValueError: Format tanggal atau status tidak valid
+    """
+    filters = {}
+    for key in ('tanggal', 'tanggal_mulai', 'tanggal_selesai'):
+        value = args.get(key, '').strip()
+        if not value:
+            continue
+        try:
+            parsed = date.fromisoformat(value)
+        except ValueError:
+            raise ValueError('Format tanggal harus YYYY-MM-DD') from None
+        if key == 'tanggal':
+            filters['tanggal_mulai'] = filters['tanggal_selesai'] = parsed
+        else:
+            filters[key] = parsed
+    for key in ('kelas', 'jurusan', 'status', 'nis', 'nama'):
+        value = args.get(key, '').strip()
+        if value:
+            filters[key] = value
+    if filters.get('status') and filters['status'] not in ABSEN_STATUSES:
+        raise ValueError(f'Status harus salah satu dari {", ".join(ABSEN_STATUSES)}')
+    return filters
+
+
+def _parse_since(value):
+    """Watermark since harus bilangan bulat >= 0"""
+    try:
+        since = int(value)
+    except ValueError:
+        since = -1
+    if since < 0:
+        raise ValueError('since harus berupa versi absensi (bilangan bulat)')
+    return since
+
+
+def _absensi_etag(versi, limit, cursor, since, filters):
+    """
+    ETag /api/absensi: versi perubahan absensi + parameter query yang
+    sudah dinormalisasi, sehingga respons dengan filter/halaman berbeda
+    tidak saling dianggap sama
+    """
+    params = json.dumps(
+        [limit, cursor, since, sorted(filters.items())], default=str, separators=(',', ':')
+    )
+    digest = hashlib.sha1(params.encode('utf-8')).hexdigest()[:16]
+    return f"absensi-{versi}-{digest}"
+
+
+def _not_modified(etag):
+    """Respons 304 tanpa body"""
+    response = current_app.response_class(status=304)
+    response.set_etag(etag, weak=True)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
 @api_absensi_bp.route('/absensi', methods=['GET'])
+@admission_controlled('db')
 def get_absensi():
     """
-    API GET - Ambil semua data absensi
+    API GET - Ambil data absensi per halaman (terbaru dulu)
+
+    Query params:
+        limit: Jumlah baris per halaman (dibatasi ABSENSI_MAX_PAGE_SIZE)
+        cursor: next_cursor dari halaman sebelumnya
+        since: Watermark dari respons sebelumnya; hanya absensi yang baru
+            atau berubah setelahnya yang dikirim (urut versi naik)
+        tanggal / tanggal_mulai / tanggal_selesai: YYYY-MM-DD
+        kelas, jurusan, status, nis: Filter nilai persis
+        nama: Sebagian nama siswa
+
+    Header If-None-Match dengan ETag respons sebelumnya (parameter query
+    yang sama) dijawab 304 jika belum ada absensi baru atau yang berubah.
 
     Returns:
-        JSON response dengan list data absensi
+        JSON response dengan list data absensi, next_cursor, dan since
+        (watermark untuk polling berikutnya)
     """
+    limit = clamp_page_size(
+        request.args.get('limit'),
+        current_app.config.get('ABSENSI_PAGE_SIZE', 50),
+        current_app.config.get('ABSENSI_MAX_PAGE_SIZE', 200)
+    )
+    cursor = None
+    since = None
     try:
-        data = get_all_absensi()
+        filters = _filters_from_args(request.args)
+        if request.args.get('cursor'):
+            cursor = decode_cursor(request.args['cursor'])
+        if request.args.get('since'):
+            since = _parse_since(request.args['since'])
+        if cursor is not None and since is not None:
+            raise ValueError('cursor dan since tidak bisa dipakai bersamaan')
+    except ValueError as err:
+        return jsonify({
+            'success': False,
+            'message': str(err)
+        }), 400
+
+    try:
+        # Satu lookup counter versi sebelum query data: cukup untuk 304
+        versi = get_absensi_versi()
+        etag = _absensi_etag(versi, limit, cursor, since, filters)
+        if request.if_none_match.contains_weak(etag):
+            return _not_modified(etag)
+
+        next_cursor = None
+        has_more = False
+        if since is not None:
+            data, has_more = get_absensi_since(since, limit, filters)
+        else:
+            data, next_cursor = get_absensi_page(limit, cursor, filters)
+        if has_more:
+            # Sisa perubahan diambil di polling berikutnya
+            latest = data[-1]['versi']
+        else:
+            # Versi <= counter sudah ter-commit saat counter dibaca
+            latest = max([versi, since or 0] + [row['versi'] or 0 for row in data])
 
         # Format datetime objects
         for row in data:
             if isinstance(row.get('waktu_absen'), datetime):
                 row['waktu_absen'] = format_datetime(row['waktu_absen'])
 
+        response = jsonify({
+            'success': True,
+            'data': data,
+            'next_cursor': encode_cursor(*next_cursor) if next_cursor else None,
+            'since': latest,
+            'has_more': has_more
+        })
+        response.set_etag(etag, weak=True)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response, 200
+
+    except Error as err:
+        return jsonify({
+            'success': False,
+            'message': str(err)
+        }), 500
+
+
+@api_absensi_bp.route('/absensi/rekap', methods=['GET'])
+@admission_controlled('db')
+def get_rekap():
+    """
+    API GET - Rekap kehadiran per tanggal, kelas, dan jurusan
+
+    Dibaca dari tabel rekap absensi_harian, bukan dari baris absensi.
+
+    Query params:
+        tanggal / tanggal_mulai / tanggal_selesai: YYYY-MM-DD (default hari ini)
+        kelas, jurusan: Filter opsional
+
+    Returns:
+        JSON response dengan rekap per grup (hadir/izin/sakit/alpa, total,
+        jumlah_siswa, persen_hadir)
+    """
+    try:
+        filters = _filters_from_args(request.args)
+    except ValueError as err:
+        return jsonify({
+            'success': False,
+            'message': str(err)
+        }), 400
+
+    selesai = filters.get('tanggal_selesai') or filters.get('tanggal_mulai') \
+        or get_current_time_wib().date()
+    mulai = filters.get('tanggal_mulai') or selesai
+    max_days = current_app.config.get('REKAP_MAX_DAYS', 366)
+    if mulai > selesai or (selesai - mulai).days >= max_days:
+        return jsonify({
+            'success': False,
+            'message': f'Rentang tanggal harus 1-{max_days} hari'
+        }), 400
+
+    try:
+        data = get_rekap_harian(mulai, selesai, filters.get('kelas'), filters.get('jurusan'))
         return jsonify({
             'success': True,
+            'tanggal_mulai': mulai.isoformat(),
+            'tanggal_selesai': selesai.isoformat(),
             'data': data
         }), 200
 
@@ -40,20 +231,103 @@ def get_absensi():
         }), 500
 
 
+@api_absensi_bp.route('/absensi/manual', methods=['POST'])
+@admission_controlled('db')
+def mark_absensi_manual():
+    """
+    API POST - Guru menandai absensi satu kelas (atau banyak kelas) sekaligus
+
+    Body JSON: {"kelas": "10A", "tanggal": "YYYY-MM-DD",
+    "entries": [{"id_siswa": 1, "status": "izin"}, ...]}.
+    kelas dan tanggal opsional (default: semua kelas, hari ini).
+
+    Returns:
+        JSON response dengan jumlah baris yang ditulis
+    """
+    if 'guru' not in session:
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized'
+        }), 401
+
+    data = request.get_json(silent=True) or {}
+    entries = data.get('entries')
+    if not isinstance(entries, list) or not entries:
+        return jsonify({
+            'success': False,
+            'message': 'Daftar siswa kosong'
+        }), 400
+    max_entries = current_app.config.get('MANUAL_ABSEN_MAX_ENTRIES', 5000)
+    if len(entries) > max_entries:
+        return jsonify({
+            'success': False,
+            'message': f'Maksimal {max_entries} siswa per request'
+        }), 413
+
+    pairs = []
+    for entry in entries:
+        entry = entry if isinstance(entry, dict) else {}
+        id_siswa = entry.get('id_siswa')
+        status = entry.get('status')
+        if not isinstance(id_siswa, int) or isinstance(id_siswa, bool) \
+                or status not in ABSEN_STATUSES:
+            return jsonify({
+                'success': False,
+                'message': 'Setiap entri wajib berisi id_siswa dan status '
+                           f'({", ".join(ABSEN_STATUSES)})'
+            }), 400
+        pairs.append((id_siswa, status))
+
+    tanggal = None
+    if data.get('tanggal'):
+        try:
+            tanggal = date.fromisoformat(str(data['tanggal']))
+        except ValueError:
+            return jsonify({
+                'success': False,
+                'message': 'Format tanggal harus YYYY-MM-DD'
+            }), 400
+
+    try:
+        with transaction():
+            result = upsert_absen_manual(
+                pairs, tanggal, data.get('kelas') or None, session['guru']
+            )
+        return jsonify({
+            'success': True,
+            'message': f"{result['written']} absensi tersimpan",
+            'data': result
+        }), 200
+
+    except Error as err:
+        return jsonify({
+            'success': False,
+            'message': str(err)
+        }), 500
+
+
 @api_absensi_bp.route('/export_absensi', methods=['GET'])
+@admission_controlled('db')
 def export_absensi():
     """
     Export riwayat absensi ke file Excel (.xlsx)
 
+    Query params: filter yang sama dengan /api/absensi (tanpa limit/cursor)
+
     Returns:
         File Excel dengan data absensi
     """
     if 'guru' not in session:
         return redirect(url_for('auth.index'))
 
+    try:
+        filters = _filters_from_args(request.args)
+    except ValueError as err:
+        return f"Filter tidak valid: {str(err)}", 400
+
     try:
         # Ambil data absensi
-        absensi_list = get_absensi_with_filters()
+        absensi_list = get_absensi_with_filters(filters)
 
         # Buat workbook Excel
         wb = Workbook()
@@ -0,0 +1,27 @@
+"""
+API Metrics Blueprint - Menampilkan metrik runtime aplikasi
+"""
+from flask import Blueprint, jsonify, session
+from utils.metrics import collect_metrics
+
+api_metrics_bp = Blueprint('api_metrics', __name__, url_prefix='/api')
+
+
+@api_metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """
+    API GET - Metrik runtime (pool koneksi, cache, antrian)
+
+    Returns:
+        JSON response dengan metrik per komponen
+    """
+    if 'guru' not in session:
+        return jsonify({
+            'success': False,
+            'message': 'Unauthorized'
+        }), 401
+
+    return jsonify({
+        'success': True,
+        'data': collect_metrics()
+    }), 200
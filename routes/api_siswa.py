@@ -10,11 +10,13 @@ from services.siswa_service import (
     update_siswa,
     delete_siswa
 )
+from utils.admission import admission_controlled
 
 api_siswa_bp = Blueprint('api_siswa', __name__, url_prefix='/api/siswa')
 
 
 @api_siswa_bp.route('', methods=['GET'])
+@admission_controlled('db')
 def get_siswa():
     """
     API GET - Ambil semua data siswa
@@ -37,6 +39,7 @@ def get_siswa():
 
 
 @api_siswa_bp.route('/<int:id_siswa>', methods=['GET'])
+@admission_controlled('db')
 def get_siswa_detail(id_siswa):
     """
     API GET - Ambil satu data siswa berdasarkan ID
@@ -69,6 +72,7 @@ def get_siswa_detail(id_siswa):
 
 
 @api_siswa_bp.route('', methods=['POST'])
+@admission_controlled('db')
 def add_siswa():
     """
     API POST - Tambah siswa baru
@@ -109,6 +113,7 @@ def add_siswa():
 
 
 @api_siswa_bp.route('/<int:id_siswa>', methods=['PUT'])
+@admission_controlled('db')
 def update_siswa_data(id_siswa):
     """
     API PUT - Update data siswa
@@ -160,6 +165,7 @@ def update_siswa_data(id_siswa):
 
 
 @api_siswa_bp.route('/<int:id_siswa>', methods=['DELETE'])
+@admission_controlled('db')
 def delete_siswa_data(id_siswa):
     """
     API DELETE - Hapus siswa
@@ -0,0 +1,198 @@
+"""
+Route asyncio native untuk asgi.py - scan token siswa, generate token guru,
+dan live feed absensi guru
+
+Request, response, dan service yang dipakai sama dengan versi sinkron di
+routes/siswa.py dan routes/guru.py; hanya akses database yang async.
+"""
+import asyncio
+from functools import partial
+
+from services.absensi_service import insert_absen_by_id_async
+from services.ingest_service import IngestQueueFull
+from services.token_service import (
+    create_signed_token_with_ttl_async,
+    create_token_with_ttl_async,
+    is_signed_token,
+    verify_signed_token_async,
+    verify_token_async
+)
+from utils.asgi import AsgiStream, load_session
+from utils.event_hub import HubFullError, format_sse_batch, get_event_hub
+from utils.qr import get_qr_png, to_data_uri
+from utils.time_helper import get_current_time_wib, localize_to_wib
+
+
+async def scan_token(flask_app, request):
+    """
+    Proses scan token QR untuk absensi (versi async)
+
+    Args:
+        flask_app (Flask): Aplikasi (config & extensions)
+        request (AsgiRequest): Request ASGI
+
+    Returns:
+        tuple: (payload JSON, status HTTP, header tambahan)
+    """
+    session = load_session(flask_app, request)
+    if 'id_siswa' not in session:
+        return {
+            'status': 'error',
+            'message': 'Siswa belum login'
+        }, 401, {}
+    data = request.get_json()
+    token = data.get('token') if isinstance(data, dict) else None
+    if not token or not isinstance(token, str):
+        return {
+            'status': 'error',
+            'message': 'Token kosong'
+        }, 400, {}
+
+    id_siswa = session['id_siswa']
+    coalescer = flask_app.extensions.get('scan_coalescer')
+    if coalescer is None:
+        return await _process_scan(flask_app, id_siswa, token)
+    return await coalescer.run_async(
+        (id_siswa, token),
+        partial(_process_scan, flask_app, id_siswa, token),
+        cacheable=lambda result: result[1] != 503
+    )
+
+
+async def _process_scan(flask_app, id_siswa, token):
+    if is_signed_token(token):
+        row = await verify_signed_token_async(token, flask_app.config['SECRET_KEY'])
+    else:
+        row = await verify_token_async(token)
+    if not row:
+        return {
+            'status': 'error',
+            'message': 'Token tidak valid atau sudah expired'
+        }, 400, {}
+    waktu_sekarang_wib = get_current_time_wib()
+    if waktu_sekarang_wib > localize_to_wib(row['waktu_expired']):
+        return {
+            'status': 'error',
+            'message': 'Token sudah kadaluarsa'
+        }, 400, {}
+
+    ingest_queue = flask_app.extensions.get('scan_ingest')
+    if ingest_queue is None:
+        success = await insert_absen_by_id_async(id_siswa, token, row.get('issued_by'))
+    else:
+        try:
+            # submit journal menunggu fsync: jangan blok event loop
+            success = await asyncio.get_running_loop().run_in_executor(
+                None, ingest_queue.submit, id_siswa, token, waktu_sekarang_wib
+            )
+        except IngestQueueFull:
+            return {
+                'status': 'error',
+                'message': 'Server sedang sibuk, silakan scan ulang'
+            }, 503, {'Retry-After': '2'}
+    if success:
+        return {
+            'status': 'success',
+            'message': 'Absensi berhasil tercatat'
+        }, 200, {}
+    return {
+        'status': 'warning',
+        'message': 'Anda sudah absen hari ini'
+    }, 200, {}
+
+
+async def generate_token(flask_app, request):
+    """
+    Generate token QR untuk absensi (versi async)
+
+    Args:
+        flask_app (Flask): Aplikasi (config & url_map)
+        request (AsgiRequest): Request ASGI
+
+    Returns:
+        tuple: (payload JSON, status HTTP, header tambahan)
+    """
+    session = load_session(flask_app, request)
+    if session.get('role') != 'guru':
+        return {
+            'status': 'error',
+            'message': 'Unauthorized'
+        }, 401, {}
+    ttl_seconds = flask_app.config.get('TOKEN_TTL_SECONDS', 300)
+    try:
+        if flask_app.config.get('SIGNED_TOKENS'):
+            token, _ = await create_signed_token_with_ttl_async(
+                flask_app.config['SECRET_KEY'], ttl_seconds, session.get('guru')
+            )
+        else:
+            token, _ = await create_token_with_ttl_async(ttl_seconds, session.get('guru'))
+        # Render PNG memakan CPU: jalankan di thread
+        png = await asyncio.get_running_loop().run_in_executor(
+            None, get_qr_png, token, ttl_seconds
+        )
+    except (IOError, OSError) as err:
+        return {
+            'status': 'error',
+            'message': str(err)
+        }, 500, {}
+
+    qr_url = flask_app.url_map.bind(
+        '', script_name=request.root_path or None
+    ).build('guru.qr_image', {'token': token})
+    return {
+        'status': 'success',
+        'token': token,
+        'qr_url': qr_url,
+        'qr_data_uri': to_data_uri(png),
+        'expires_in': ttl_seconds
+    }, 200, {}
+
+
+async def absensi_stream(flask_app, request):
+    """
+    Live feed absensi guru (versi async): koneksi SSE menunggu di event
+    loop, tidak memakai thread seperti route Flask
+
+    Args:
+        flask_app (Flask): Aplikasi (config)
+        request (AsgiRequest): Request ASGI
+
+    Returns:
+        AsgiStream atau tuple (payload JSON, status HTTP, header tambahan)
+    """
+    session = load_session(flask_app, request)
+    if 'guru' not in session:
+        return {
+            'status': 'error',
+            'message': 'Unauthorized'
+        }, 401, {}
+    try:
+        subscription = get_event_hub().subscribe(session['guru'])
+    except HubFullError as err:
+        return {
+            'status': 'error',
+            'message': str(err)
+        }, 503, {'Retry-After': '30'}
+
+    return AsgiStream(
+        _event_stream(subscription, flask_app.config.get('SSE_HEARTBEAT_SECONDS', 15)),
+        headers={
+            'Content-Type': 'text/event-stream',
+            'Cache-Control': 'no-cache',
+            'X-Accel-Buffering': 'no'
+        },
+        on_close=subscription.close
+    )
+
+
+async def _event_stream(subscription, heartbeat):
+    yield 'retry: 3000\n\n'
+    while True:
+        yield format_sse_batch(*await subscription.get_async(heartbeat))
+
+
+ASYNC_ROUTES = {
+    ('POST', '/siswa/scan_token'): scan_token,
+    ('POST', '/guru/generate_token'): generate_token,
+    ('GET', '/guru/absensi_stream'): absensi_stream
+}
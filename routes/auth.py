@@ -4,6 +4,7 @@ Authentication Blueprint - Handles login/logout routes
 from flask import Blueprint, render_template, request, redirect, url_for, session
 from services.guru_service import authenticate_guru
 from services.siswa_service import authenticate_siswa
+from utils.admission import admission_controlled
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/')
 
@@ -21,6 +22,7 @@ def index():
 
 
 @auth_bp.route('/login_guru', methods=['POST'])
+@admission_controlled('db')
 def login_guru():
     """
     Proses login untuk guru
@@ -40,6 +42,7 @@ def login_guru():
     return redirect(url_for('guru.dashboard'))
 
 @auth_bp.route('/login_siswa', methods=['POST'])
+@admission_controlled('scan')
 def login_siswa():
     """
     Proses login untuk siswa
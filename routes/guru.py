@@ -2,19 +2,22 @@
 Guru Blueprint - Handles teacher dashboard and QR generation routes
 """
 import os
-import qrcode
 from flask import (
     Blueprint, render_template, session, redirect,
-    url_for, jsonify, send_file, current_app
+    url_for, jsonify, send_file, current_app, Response
 )
-from services.absensi_service import get_all_absensi
-from services.token_service import create_token_with_ttl
-from utils.time_helper import get_current_time_wib
+from services.absensi_service import get_absensi_page
+from services.token_service import create_token_with_ttl, create_signed_token_with_ttl
+from utils.admission import admission_controlled
+from utils.event_hub import HubFullError, format_sse_batch, get_event_hub
+from utils.pagination import encode_cursor
+from utils.qr import get_qr_png, get_cached_qr_png, to_data_uri
 
 guru_bp = Blueprint('guru', __name__, url_prefix='/guru')
 
 
 @guru_bp.route('/')
+@admission_controlled('db')
 def dashboard():
     """
     Dashboard guru - menampilkan data absensi semua siswa
@@ -25,21 +28,23 @@ def dashboard():
     if 'guru' not in session:
         return redirect(url_for('auth.index'))
 
-    absensi = get_all_absensi()
+    absensi, next_cursor = get_absensi_page(current_app.config.get('ABSENSI_PAGE_SIZE', 50))
     return render_template(
         'guru.html',
         nama=session.get('nama_guru'),
-        absensi=absensi
+        absensi=absensi,
+        next_cursor=encode_cursor(*next_cursor) if next_cursor else ''
     )
 
 
 @guru_bp.route('/generate_token', methods=['POST'])
+@admission_controlled('db')
 def generate_token():
     """
     Generate token QR untuk absensi
 
     Returns:
-        JSON response dengan token, QR URL, dan waktu expired
+        JSON response dengan token, QR URL, QR data URI, dan waktu expired
     """
     if 'role' not in session or session['role'] != 'guru':
         return jsonify({
@@ -49,37 +54,21 @@ def generate_token():
     try:
         # Generate token dengan TTL dari config
         ttl_seconds = current_app.config.get('TOKEN_TTL_SECONDS', 300)
-        token, _ = create_token_with_ttl(ttl_seconds)
-        # Generate QR Code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(token)
-        qr.make(fit=True)
-
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Simpan QR code ke file
-        qrcode_folder = current_app.config.get('QRCODE_FOLDER', 'static/qrcodes')
-        out_dir = os.path.join(current_app.root_path, qrcode_folder)
-        os.makedirs(out_dir, exist_ok=True)
-
-        waktu_sekarang = get_current_time_wib()
-        timestamp = waktu_sekarang.strftime('%Y%m%d_%H%M%S')
-        filename = f"token_{timestamp}.png"
-        filepath = os.path.join(out_dir, filename)
-
-        img.save(filepath)
-
-        qr_url = url_for('static', filename=f'qrcodes/{filename}')
+        if current_app.config.get('SIGNED_TOKENS'):
+            token, _ = create_signed_token_with_ttl(
+                current_app.config['SECRET_KEY'], ttl_seconds, session.get('guru')
+            )
+        else:
+            token, _ = create_token_with_ttl(ttl_seconds, session.get('guru'))
+        # Render QR Code di memori (tanpa file & tanpa request kedua)
+        png = get_qr_png(token, ttl_seconds)
+        qr_url = url_for('guru.qr_image', token=token)
 
         return jsonify({
             'status': 'success',
             'token': token,
             'qr_url': qr_url,
+            'qr_data_uri': to_data_uri(png),
             'expires_in': ttl_seconds
         })
 
@@ -90,6 +79,68 @@ def generate_token():
         }), 500
 
 
+@guru_bp.route('/absensi_stream')
+def absensi_stream():
+    """
+    Live feed absensi (Server-Sent Events) dari token milik guru yang login
+
+    Tidak memakai admission control: koneksi terbuka lama dan tidak
+    menyentuh database. Setiap absensi baru dikirim sebagai event
+    'absensi'; event 'resync' berarti ada event terbuang dan dashboard
+    perlu memuat ulang data.
+
+    Returns:
+        Response text/event-stream
+    """
+    if 'guru' not in session:
+        return "Unauthorized", 401
+    try:
+        subscription = get_event_hub().subscribe(session['guru'])
+    except HubFullError as err:
+        return str(err), 503, {'Retry-After': '30'}
+
+    response = Response(
+        _event_stream(subscription, current_app.config.get('SSE_HEARTBEAT_SECONDS', 15)),
+        mimetype='text/event-stream'
+    )
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'  # nginx: jangan buffer stream
+    # Client bisa putus sebelum generator sempat berjalan
+    response.call_on_close(subscription.close)
+    return response
+
+
+def _event_stream(subscription, heartbeat):
+    """Generator SSE; heartbeat sekaligus mendeteksi client yang sudah putus"""
+    with subscription:
+        yield 'retry: 3000\n\n'
+        while True:
+            yield format_sse_batch(*subscription.get(heartbeat))
+
+
+@guru_bp.route('/qr/<path:token>')
+def qr_image(token):
+    """
+    Serve gambar QR token aktif dari cache memori
+
+    Args:
+        token (str): Token QR
+
+    Returns:
+        Gambar PNG atau error message
+    """
+    if 'guru' not in session:
+        return "Unauthorized", 401
+
+    png = get_cached_qr_png(token)
+    if png is None:
+        return "QR Code not found", 404
+
+    response = Response(png, mimetype='image/png')
+    response.headers['Cache-Control'] = 'private, max-age=300'
+    return response
+
+
 @guru_bp.route('/qrcodes/<filename>')
 def serve_qr(filename):
     """
@@ -101,12 +152,14 @@ def serve_qr(filename):
     Returns:
         File QR code atau error message
     """
-    qrcode_folder = current_app.config.get('QRCODE_FOLDER', 'static/qrcodes')
-    out_dir = os.path.join(current_app.root_path, qrcode_folder)
-    filepath = os.path.join(out_dir, filename)
+    status, filepath = current_app.extensions['qr_store'].lookup(filename)
+
+    # File sudah dihapus oleh cleanup
+    if status == 'gone':
+        return "QR Code expired", 410
 
     # Cek apakah file ada
-    if not os.path.exists(filepath):
+    if status == 'missing':
         return "QR Code not found", 404
 
     # Cek permission
@@ -1,15 +1,30 @@
 """
 Siswa Blueprint - Handles student attendance management routes
 """
-from flask import Blueprint, render_template, session, redirect, url_for, jsonify, request
-from services.absensi_service import get_absensi_by_id_siswa, insert_absen_by_id
-from services.token_service import verify_token
-from utils.time_helper import get_current_time_wib, localize_to_wib
+from datetime import timedelta
+from functools import partial
+
+from flask import (
+    Blueprint, render_template, session, redirect,
+    url_for, jsonify, request, current_app
+)
+from services.absensi_service import (
+    get_absensi_by_id_siswa, insert_absen_by_id, record_absen_batch
+)
+from services.ingest_service import IngestQueueFull
+from services.token_service import (
+    verify_token, is_signed_token, verify_signed_token, lookup_tokens
+)
+from utils.admission import admission_controlled
+from utils.cache import MISSING
+from utils.db import transaction
+from utils.time_helper import get_current_time_wib, localize_to_wib, parse_client_time_wib
 
 siswa_bp = Blueprint('siswa', __name__, url_prefix='/siswa')
 
 
 @siswa_bp.route('/')
+@admission_controlled('db')
 def dashboard():
     """
     Dashboard siswa - menampilkan history absensi
@@ -28,6 +43,7 @@ def dashboard():
     )
 
 @siswa_bp.route('/scan_token', methods=['POST'])
+@admission_controlled('scan')
 def scan_token():
     """
     Proses scan token QR untuk absensi
@@ -42,34 +58,210 @@ def scan_token():
         }), 401
     data = request.get_json() or {}
     token = data.get('token')
-    if not token:
+    if not token or not isinstance(token, str):
         return jsonify({
             'status': 'error',
             'message': 'Token kosong'
         }), 400
-    # Verifikasi token
-    row = verify_token(token)
-    if not row:
+    # Scan berulang dari siswa yang sama untuk token yang sama (jsQR
+    # mengirim tiap frame) dijawab dengan hasil scan pertama
+    coalescer = current_app.extensions.get('scan_coalescer')
+    if coalescer is None:
+        payload, status, headers = _process_scan(session['id_siswa'], token)
+    else:
+        payload, status, headers = coalescer.run(
+            (session['id_siswa'], token),
+            partial(_process_scan, session['id_siswa'], token),
+            cacheable=lambda result: result[1] != 503
+        )
+    response = jsonify(payload)
+    response.headers.extend(headers)
+    return response, status
+
+
+def _process_scan(id_siswa, token):
+    """
+    Verifikasi token dan catat absensi
+
+    Args:
+        id_siswa (int): ID siswa yang scan
+        token (str): Token QR hasil scan
+
+    Returns:
+        tuple: (payload JSON, status HTTP, header tambahan)
+    """
+    # Verifikasi token dan insert absensi dalam satu transaksi
+    with transaction():
+        if is_signed_token(token):
+            # Token bertanda tangan: cek signature & expiry tanpa query
+            row = verify_signed_token(token, current_app.config['SECRET_KEY'])
+        else:
+            row = verify_token(token)
+        if not row:
+            return {
+                'status': 'error',
+                'message': 'Token tidak valid atau sudah expired'
+            }, 400, {}
+        # Cek waktu expired dengan WIB
+        waktu_sekarang_wib = get_current_time_wib()
+        waktu_expired = localize_to_wib(row['waktu_expired'])
+        if waktu_sekarang_wib > waktu_expired:
+            return {
+                'status': 'error',
+                'message': 'Token sudah kadaluarsa'
+            }, 400, {}
+        # Insert absensi (langsung, atau lewat antrian/journal)
+        ingest_queue = current_app.extensions.get('scan_ingest')
+        if ingest_queue is None:
+            success = insert_absen_by_id(id_siswa, token, row.get('issued_by'))
+        else:
+            try:
+                success = ingest_queue.submit(id_siswa, token, waktu_sekarang_wib)
+            except IngestQueueFull:
+                return {
+                    'status': 'error',
+                    'message': 'Server sedang sibuk, silakan scan ulang'
+                }, 503, {'Retry-After': '2'}
+    if success:
+        return {
+            'status': 'success',
+            'message': 'Absensi berhasil tercatat'
+        }, 200, {}
+    return {
+        'status': 'warning',
+        'message': 'Anda sudah absen hari ini'
+    }, 200, {}
+
+
+# Hasil record_absen_batch -> (status, pesan) per item
+_BATCH_OUTCOMES = {
+    'tercatat': ('success', 'Absensi berhasil tercatat'),
+    'sudah_absen': ('warning', 'Anda sudah absen hari ini'),
+    'siswa_tidak_ditemukan': ('error', 'Siswa tidak ditemukan')
+}
+
+
+@siswa_bp.route('/scan_batch', methods=['POST'])
+@admission_controlled('scan')
+def scan_batch():
+    """
+    Upload banyak scan sekaligus (antrian lokal client saat jaringan putus)
+
+    Body JSON: {"scans": [{"token", "client_ts", "idempotency_key"}, ...]}.
+    client_ts berupa epoch milidetik atau ISO 8601. Scan diterima jika
+    client_ts berada dalam masa berlaku token, di hari WIB yang sama, dan
+    tidak lebih tua dari SCAN_BATCH_MAX_UPLOAD_LAG. Item dengan
+    idempotency_key yang sudah pernah diproses mendapat hasil yang sama
+    tanpa diproses ulang.
+
+    Returns:
+        JSON response dengan hasil per item
+    """
+    if 'id_siswa' not in session:
         return jsonify({
             'status': 'error',
-            'message': 'Token tidak valid atau sudah expired'
-        }), 400
-    # Cek waktu expired dengan WIB
-    waktu_sekarang_wib = get_current_time_wib()
-    waktu_expired = localize_to_wib(row['waktu_expired'])
-    if waktu_sekarang_wib > waktu_expired:
+            'message': 'Siswa belum login'
+        }), 401
+    data = request.get_json(silent=True) or {}
+    items = data.get('scans')
+    if not isinstance(items, list) or not items:
         return jsonify({
             'status': 'error',
-            'message': 'Token sudah kadaluarsa'
+            'message': 'Daftar scan kosong'
         }), 400
-    # Insert absensi
-    success = insert_absen_by_id(session['id_siswa'], token)
-    if success:
+    max_items = current_app.config.get('SCAN_BATCH_MAX_ITEMS', 100)
+    if len(items) > max_items:
         return jsonify({
-            'status': 'success',
-            'message': 'Absensi berhasil tercatat'
-        })
+            'status': 'error',
+            'message': f'Maksimal {max_items} scan per batch'
+        }), 413
+
+    id_siswa = session['id_siswa']
+    seen = current_app.extensions.get('scan_idempotency')
+    waktu_sekarang_wib = get_current_time_wib()
+    max_skew = timedelta(seconds=current_app.config.get('SCAN_BATCH_CLOCK_SKEW_SECONDS', 120))
+    # Batas umur scan: upload terlambat tidak boleh mengisi absensi hari lalu
+    max_lag = timedelta(seconds=current_app.config.get('SCAN_BATCH_MAX_UPLOAD_LAG', 6 * 3600))
+    oldest_scan = max(
+        waktu_sekarang_wib - max_lag,
+        waktu_sekarang_wib.replace(hour=0, minute=0, second=0, microsecond=0)
+    )
+
+    results = [None] * len(items)
+    first_index = {}  # idempotency_key -> index item pertama di batch ini
+    pending = []      # (index, token, waktu_scan)
+    for i, item in enumerate(items):
+        item = item if isinstance(item, dict) else {}
+        key = item.get('idempotency_key')
+        if not key or not isinstance(key, str) or len(key) > 128:
+            results[i] = _batch_result(key, 'error', 'idempotency_key tidak valid')
+            continue
+        if key in first_index:
+            continue
+        first_index[key] = i
+        cached = seen.get((id_siswa, key)) if seen is not None else MISSING
+        if cached is not MISSING:
+            results[i] = cached
+            continue
+
+        token = item.get('token')
+        waktu_scan = parse_client_time_wib(item.get('client_ts'))
+        if not token or not isinstance(token, str):
+            results[i] = _batch_result(key, 'error', 'Token kosong')
+        elif waktu_scan is None:
+            results[i] = _batch_result(key, 'error', 'client_ts tidak valid')
+        elif waktu_scan > waktu_sekarang_wib + max_skew:
+            results[i] = _batch_result(key, 'error', 'client_ts di masa depan')
+        elif waktu_scan < oldest_scan:
+            results[i] = _batch_result(key, 'error', 'Scan terlalu lama untuk diunggah')
+        else:
+            pending.append((i, token, waktu_scan))
+
+    # Seluruh token batch divalidasi dengan satu query, lalu insert bulk
+    with transaction():
+        rows = lookup_tokens([token for _, token, _ in pending]) if pending else {}
+        accepted = []
+        for i, token, waktu_scan in pending:
+            key = items[i]['idempotency_key']
+            row = rows.get(token)
+            if not row:
+                results[i] = _batch_result(key, 'error', 'Token tidak valid atau sudah expired')
+                continue
+            waktu_buat = localize_to_wib(row['waktu_buat'])
+            waktu_expired = localize_to_wib(row['waktu_expired'])
+            if row['status'] == 'dicabut':
+                # Direvokasi guru; status 'expired' dari sweeper tetap dinilai
+                # berdasarkan waktu scan
+                results[i] = _batch_result(key, 'error', 'Token tidak valid atau sudah expired')
+            elif not waktu_buat - max_skew <= waktu_scan <= waktu_expired:
+                results[i] = _batch_result(key, 'error', 'Token sudah kadaluarsa')
+            else:
+                accepted.append((i, token, waktu_scan))
+
+        outcomes = record_absen_batch([
+            {'id_siswa': id_siswa, 'waktu_absen': waktu_scan, 'token_qr': token}
+            for _, token, waktu_scan in accepted
+        ])
+        for (i, _, _), outcome in zip(accepted, outcomes):
+            results[i] = _batch_result(items[i]['idempotency_key'], *_BATCH_OUTCOMES[outcome])
+
+    # Hasil diingat setelah commit agar retry client tidak diproses ulang
+    for key, i in first_index.items():
+        if seen is not None:
+            seen.set((id_siswa, key), results[i])
+    for i, item in enumerate(items):
+        if results[i] is None:
+            results[i] = results[first_index[item['idempotency_key']]]
+
+    summary = {'success': 0, 'warning': 0, 'error': 0}
+    for result in results:
+        summary[result['status']] += 1
     return jsonify({
-        'status': 'warning',
-        'message': 'Anda sudah absen hari ini'
+        'status': 'success',
+        'results': results,
+        'summary': summary
     })
+
+
+def _batch_result(key, status, message):
+    return {'idempotency_key': key, 'status': status, 'message': message}
@@ -1,6 +1,11 @@
-from app import create_app
+import os
+
+from app import create_app, start_background
 
 app = create_app()
 
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5000, debug=True)
+    DEBUG = True
+    if not DEBUG or os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_background(app)
+    app.run(host='0.0.0.0', port=5000, debug=DEBUG)
@@ -1,17 +1,117 @@
 """
 Service layer untuk operasi Absensi
 """
-from utils.db import connect_db
-from utils.time_helper import get_current_time_wib
+from datetime import datetime
+from functools import partial
 
+from services.siswa_service import (
+    get_cached_siswa_profile, get_roster_counts, get_siswa_by_id, remember_siswa_profile
+)
+from utils.async_db import get_async_db
+from utils.db import connect_db, get_dialect, run_after_commit
+from utils.event_hub import get_event_hub
+from utils.time_helper import format_datetime, get_current_time_wib, get_day_range_wib
 
-def insert_absen_by_id(id_siswa, token_qr):
+# Batas jumlah parameter per statement untuk operasi bulk
+BULK_CHUNK_SIZE = 500
+
+# Status absensi yang boleh ditulis guru secara manual
+ABSEN_STATUSES = ('hadir', 'izin', 'sakit', 'alpa')
+
+# Insert absensi scan: profil dari roster cache, atau disalin dari siswa
+_SQL_INSERT_ABSEN_VALUES = """
+    INSERT IGNORE INTO absensi
+    (id_siswa, waktu_absen, tanggal, token_qr, status, nama_siswa, jurusan, kelas)
+    VALUES (%s, %s, %s, %s, 'hadir', %s, %s, %s)
+"""
+_SQL_INSERT_ABSEN_SELECT = """
+    INSERT IGNORE INTO absensi
+    (id_siswa, waktu_absen, tanggal, token_qr, status, nama_siswa, jurusan, kelas)
+    SELECT id_siswa, %s, %s, %s, 'hadir', nama_siswa, jurusan, kelas
+    FROM siswa WHERE id_siswa=%s
+"""
+
+# Versi perubahan absensi (absensi.versi): counter satu baris yang
+# dinaikkan di transaksi penulis. Lock baris counter dipegang sampai
+# commit, jadi versi yang lebih besar selalu ter-commit lebih akhir dan
+# polling "versi > since" tidak melewatkan baris yang commit terlambat.
+# Semua penulis menaikkan counter sebagai langkah terakhir sebelum commit
+# (urutan lock selalu absensi -> absensi_harian -> absensi_versi), jadi
+# lock counter hanya dipegang sesaat dan tidak ada siklus deadlock.
+# Baris baru ditulis dengan versi NULL lalu diberi versi di langkah itu.
+_SQL_VERSI_RESERVE = "UPDATE absensi_versi SET versi = versi + %s WHERE id = 1"
+_SQL_VERSI_CURRENT = "SELECT versi FROM absensi_versi WHERE id = 1"
+# Insert scan tunggal: versi ditulis setelah insert berhasil (scan ganda
+# tidak menyentuh counter)
+_SQL_STAMP_VERSI = f"UPDATE absensi SET versi = ({_SQL_VERSI_CURRENT}) WHERE id_absen = %s"
+_SQL_STAMP_VERSI_ID = "UPDATE absensi SET versi = %s WHERE id_absen = %s"
+
+# Upsert per dialek: baris (id_siswa, tanggal) yang sudah ada (mis. dari
+# scan) hanya diganti status dan data siswanya, waktu_absen tetap
+_UPSERT_SUFFIX = {
+    'mysql': """
+        ON DUPLICATE KEY UPDATE
+            status = VALUES(status),
+            nama_siswa = VALUES(nama_siswa),
+            jurusan = VALUES(jurusan),
+            kelas = VALUES(kelas)
+    """,
+    'sqlite': """
+        ON CONFLICT (id_siswa, tanggal) DO UPDATE SET
+            status = excluded.status,
+            nama_siswa = excluded.nama_siswa,
+            jurusan = excluded.jurusan,
+            kelas = excluded.kelas
+    """
+}
+
+# Rekap harian (absensi_harian): jumlah absensi per tanggal x kelas x
+# jurusan x status. Kelas/jurusan kosong dicatat sebagai ''.
+_ROLLUP_GROUP = "tanggal, COALESCE(kelas, ''), COALESCE(jurusan, ''), COALESCE(status, 'hadir')"
+_SQL_ROLLUP_INSERT = f"""
+    INSERT INTO absensi_harian (tanggal, kelas, jurusan, status, jumlah)
+    SELECT {_ROLLUP_GROUP}, COUNT(*) FROM absensi
+"""
+# +1 untuk satu absensi baru (jalur scan)
+_SQL_ROLLUP_BUMP = f"""
+    INSERT INTO absensi_harian (tanggal, kelas, jurusan, status, jumlah)
+    SELECT {_ROLLUP_GROUP}, 1 FROM absensi WHERE id_absen = %s
+"""
+_ROLLUP_BUMP_SUFFIX = {
+    'mysql': " ON DUPLICATE KEY UPDATE jumlah = jumlah + 1",
+    'sqlite': " ON CONFLICT (tanggal, kelas, jurusan, status) DO UPDATE SET jumlah = jumlah + 1"
+}
+# Selisih -n/+n untuk satu grup (absensi manual dan insert bulk)
+_SQL_ROLLUP_ADD = """
+    INSERT INTO absensi_harian (tanggal, kelas, jurusan, status, jumlah)
+    VALUES (%s, %s, %s, %s, %s)
+"""
+_ROLLUP_ADD_SUFFIX = {
+    'mysql': " ON DUPLICATE KEY UPDATE jumlah = jumlah + VALUES(jumlah)",
+    'sqlite': (
+        " ON CONFLICT (tanggal, kelas, jurusan, status)"
+        " DO UPDATE SET jumlah = jumlah + excluded.jumlah"
+    )
+}
+# Baris lama yang akan ditimpa upsert (dikunci sampai commit di MySQL)
+_LOCK_SUFFIX = {'mysql': " FOR UPDATE", 'sqlite': ""}
+
+
+def insert_absen_by_id(id_siswa, token_qr, issued_by=None):
     """
-    Mencatat absensi siswa
+    Mencatat absensi siswa dalam satu statement.
+
+    Profil siswa (nama, jurusan, kelas) diambil dari roster cache; jika
+    tidak ada di cache, data siswa disalin lewat INSERT ... SELECT. Unique
+    key (id_siswa, tanggal) membuat absensi ganda di hari yang sama
+    mustahil, termasuk saat dua scan masuk bersamaan.
+
+    Absensi baru dikirim ke live feed guru pembuat token setelah commit.
 
     Args:
         id_siswa (int): ID siswa yang absen
         token_qr (str): Token QR yang digunakan
+        issued_by (str): Username guru pembuat token (opsional)
 
     Returns:
         bool: True jika berhasil, False jika sudah absen hari ini
@@ -20,41 +120,512 @@ def insert_absen_by_id(id_siswa, token_qr):
     cur = conn.cursor(dictionary=True)
 
     try:
-        # Cek duplikat absensi hari ini
-        cur.execute(
-            "SELECT id_absen FROM absensi WHERE id_siswa=%s AND DATE(waktu_absen)=CURDATE()",
+        # Insert absensi dengan waktu WIB; baris diabaikan jika sudah ada
+        waktu_absen_wib = get_current_time_wib()
+        cur.execute(*_absen_insert_statement(id_siswa, token_qr, waktu_absen_wib))
+
+        # 0 baris: sudah absen hari ini (atau siswa tidak ditemukan)
+        inserted = cur.rowcount == 1
+        if inserted:
+            id_absen = cur.lastrowid
+            cur.execute(_rollup_bump_sql(), (id_absen,))
+            cur.execute(_SQL_VERSI_RESERVE, (1,))
+            cur.execute(_SQL_STAMP_VERSI, (id_absen,))
+        conn.commit()
+        if inserted and issued_by:
+            run_after_commit(partial(
+                publish_absen_event, issued_by, id_absen, id_siswa, waktu_absen_wib
+            ))
+        return inserted
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+async def insert_absen_by_id_async(id_siswa, token_qr, issued_by=None):
+    """
+    Versi async insert_absen_by_id (untuk asgi.py)
+
+    Args:
+        id_siswa (int): ID siswa yang absen
+        token_qr (str): Token QR yang digunakan
+        issued_by (str): Username guru pembuat token (opsional)
+
+    Returns:
+        bool: True jika berhasil, False jika sudah absen hari ini
+    """
+    waktu_absen_wib = get_current_time_wib()
+    async with get_async_db().transaction() as tx:
+        rowcount, id_absen = await tx.insert(
+            *_absen_insert_statement(id_siswa, token_qr, waktu_absen_wib)
+        )
+        if rowcount == 1:
+            await tx.execute(_rollup_bump_sql(), (id_absen,))
+            await tx.execute(_SQL_VERSI_RESERVE, (1,))
+            await tx.execute(_SQL_STAMP_VERSI, (id_absen,))
+    if rowcount == 1 and issued_by and get_event_hub().has_subscribers(issued_by):
+        profile = get_cached_siswa_profile(id_siswa) or await get_async_db().fetch_one(
+            "SELECT nis, nama_siswa, jurusan, kelas FROM siswa WHERE id_siswa=%s",
             (id_siswa,)
         )
-        if cur.fetchone():
-            return False
+        if profile:
+            get_event_hub().publish(
+                issued_by, _absen_event(id_absen, id_siswa, waktu_absen_wib, profile)
+            )
+    return rowcount == 1
+
 
-        # Ambil data siswa
+def publish_absen_event(issued_by, id_absen, id_siswa, waktu_absen):
+    """
+    Kirim absensi baru ke live feed guru (lihat /guru/absensi_stream)
+
+    Profil siswa hanya di-query jika ada dashboard yang mendengarkan
+    dan siswa belum ada di roster cache.
+
+    Args:
+        issued_by (str): Username guru pembuat token
+        id_absen (int): ID absensi yang baru tercatat
+        id_siswa (int): ID siswa
+        waktu_absen (datetime): Waktu absen (WIB)
+    """
+    hub = get_event_hub()
+    if not hub.has_subscribers(issued_by):
+        return
+    profile = get_cached_siswa_profile(id_siswa)
+    if profile is None:
+        siswa = get_siswa_by_id(id_siswa)
+        if siswa is None:
+            return
+        remember_siswa_profile(siswa)
+        profile = siswa
+    hub.publish(issued_by, _absen_event(id_absen, id_siswa, waktu_absen, profile))
+
+
+def _absen_event(id_absen, id_siswa, waktu_absen, profile, status='hadir'):
+    """Event live feed, bentuknya sama dengan baris /api/absensi"""
+    return {
+        'id_absen': id_absen,
+        'id_siswa': id_siswa,
+        'nis': profile.get('nis'),
+        'nama_siswa': profile.get('nama_siswa'),
+        'kelas': profile.get('kelas'),
+        'jurusan': profile.get('jurusan'),
+        'waktu_absen': format_datetime(waktu_absen),
+        'status': status
+    }
+
+
+def _fetch_absen_events(cur, ids):
+    """
+    Baris absensi yang ditulis transaksi ini beserta NIS dan guru pembuat
+    token, untuk live feed. Tidak ada query jika tidak ada dashboard yang
+    mendengarkan.
+    """
+    rows = []
+    if not ids or not get_event_hub().stats()['subscribers']:
+        return rows
+    for chunk in _chunks(sorted(ids)):
+        placeholders = ', '.join(['%s'] * len(chunk))
         cur.execute(
-            "SELECT nama_siswa, jurusan, kelas FROM siswa WHERE id_siswa=%s",
-            (id_siswa,)
+            "SELECT a.id_absen, a.id_siswa, a.waktu_absen, a.status, a.nama_siswa, "
+            "a.kelas, a.jurusan, s.nis, q.issued_by FROM absensi a "
+            "LEFT JOIN siswa s ON s.id_siswa = a.id_siswa "
+            "LEFT JOIN qr_token q ON q.token = a.token_qr "
+            f"WHERE a.id_absen IN ({placeholders})",
+            chunk
         )
-        siswa = cur.fetchone()
+        rows.extend(cur.fetchall())
+    return rows
 
-        if not siswa:
-            return False
 
-        # Insert absensi dengan waktu WIB
-        waktu_absen_wib = get_current_time_wib()
-        cur.execute("""
-            INSERT INTO absensi
-            (id_siswa, waktu_absen, token_qr, status, nama_siswa, jurusan, kelas)
-            VALUES (%s, %s, %s, 'hadir', %s, %s, %s)
-        """, (
+def _publish_absen_events(rows, issued_by=None):
+    """
+    Kirim baris absensi ke live feed guru pembuat token (dan guru yang
+    mengubah absensi, jika ada)
+    """
+    hub = get_event_hub()
+    for row in rows:
+        event = _absen_event(
+            row['id_absen'], row['id_siswa'], row['waktu_absen'], row, row['status'] or 'hadir'
+        )
+        for topic in sorted({row['issued_by'], issued_by} - {None}):
+            hub.publish(topic, event)
+
+
+def _publish_after_commit(rows, issued_by=None):
+    if rows:
+        run_after_commit(partial(_publish_absen_events, rows, issued_by))
+
+
+def _absen_insert_statement(id_siswa, token_qr, waktu_absen_wib):
+    """SQL + parameter insert absensi scan (roster cache atau INSERT ... SELECT)"""
+    profile = get_cached_siswa_profile(id_siswa)
+    if profile is not None:
+        return _SQL_INSERT_ABSEN_VALUES, (
             id_siswa,
             waktu_absen_wib,
+            waktu_absen_wib.date(),
             token_qr,
+            profile['nama_siswa'],
+            profile['jurusan'],
+            profile['kelas']
+        )
+    return _SQL_INSERT_ABSEN_SELECT, (
+        waktu_absen_wib,
+        waktu_absen_wib.date(),
+        token_qr,
+        id_siswa
+    )
+
+
+def _chunks(items, size=BULK_CHUNK_SIZE):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def _fetch_profiles(cur, ids, kelas=None):
+    """
+    Ambil nama/jurusan/kelas siswa: dari roster cache, sisanya dengan
+    satu query IN (...) per chunk (hasilnya mengisi cache)
+    """
+    profil = {}
+    missing = []
+    for id_siswa in set(ids):
+        cached = get_cached_siswa_profile(id_siswa)
+        if cached is None:
+            missing.append(id_siswa)
+        elif kelas is None or cached['kelas'] == kelas:
+            profil[id_siswa] = dict(cached, id_siswa=id_siswa)
+
+    for chunk in _chunks(sorted(missing)):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        sql = (
+            f"SELECT id_siswa, nis, nama_siswa, jurusan, kelas FROM siswa "
+            f"WHERE id_siswa IN ({placeholders})"
+        )
+        params = list(chunk)
+        if kelas is not None:
+            sql += " AND kelas=%s"
+            params.append(kelas)
+        cur.execute(sql, params)
+        for row in cur.fetchall():
+            remember_siswa_profile(row)
+            profil[row['id_siswa']] = row
+    return profil
+
+
+def _reserve_versi(cur, count):
+    """Naikkan counter versi sebanyak count; kembalikan versi pertama"""
+    cur.execute(_SQL_VERSI_RESERVE, (count,))
+    cur.execute(_SQL_VERSI_CURRENT)
+    return cur.fetchone()['versi'] - count + 1
+
+
+def _stamp_versi(cur, ids):
+    """
+    Beri versi berurutan ke baris absensi yang ditulis transaksi ini.
+    Dipanggil tepat sebelum commit: lock counter tidak dipegang selama
+    insert/upsert dan update rekap.
+    """
+    ids = sorted(ids)
+    if not ids:
+        return
+    versi = _reserve_versi(cur, len(ids))
+    values = [(versi + offset, id_absen) for offset, id_absen in enumerate(ids)]
+    for chunk in _chunks(values):
+        cur.executemany(_SQL_STAMP_VERSI_ID, chunk)
+
+
+def _fetch_unstamped(cur, keys):
+    """
+    Baris yang baru ditulis transaksi ini (versi masih NULL) untuk
+    pasangan (id_siswa, tanggal). Read biasa tanpa lock: baris milik
+    transaksi sendiri selalu terlihat, baris transaksi lain tidak dikunci.
+    """
+    rows = []
+    dates = sorted({tanggal for _, tanggal in keys})
+    if not dates:
+        return rows
+    date_placeholders = ', '.join(['%s'] * len(dates))
+    for chunk in _chunks(sorted({id_siswa for id_siswa, _ in keys})):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cur.execute(
+            f"SELECT id_absen, tanggal, kelas, jurusan, status FROM absensi "
+            f"WHERE versi IS NULL AND id_siswa IN ({placeholders}) "
+            f"AND tanggal IN ({date_placeholders})",
+            list(chunk) + dates
+        )
+        rows.extend(cur.fetchall())
+    return rows
+
+
+def _record_new_rows(cur, keys):
+    """
+    Selesaikan insert bulk: +1 rekap per baris baru (selisih per grup,
+    tanpa menghitung ulang dari absensi) lalu beri versi. Mengembalikan
+    id_absen baris baru.
+    """
+    rows = _fetch_unstamped(cur, keys)
+    ids = [row['id_absen'] for row in rows]
+    deltas = {}
+    for row in rows:
+        per_day = deltas.setdefault(row['tanggal'], {})
+        group = (row['kelas'] or '', row['jurusan'] or '', row['status'] or 'hadir')
+        per_day[group] = per_day.get(group, 0) + 1
+    for tanggal, groups in sorted(deltas.items()):
+        _apply_rollup_deltas(cur, tanggal, groups)
+    _stamp_versi(cur, ids)
+    return ids
+
+
+def _insert_rows(cur, scans, profil):
+    """executemany INSERT IGNORE untuk scan yang siswanya dikenal"""
+    scans = [scan for scan in scans if scan['id_siswa'] in profil]
+    if not scans:
+        return 0
+    values = []
+    for scan in scans:
+        siswa = profil[scan['id_siswa']]
+        values.append((
+            scan['id_siswa'],
+            scan['waktu_absen'],
+            scan['waktu_absen'].date(),
+            scan['token_qr'],
             siswa['nama_siswa'],
             siswa['jurusan'],
             siswa['kelas']
         ))
 
+    inserted = 0
+    for chunk in _chunks(values):
+        cur.executemany(_SQL_INSERT_ABSEN_VALUES, chunk)
+        inserted += max(cur.rowcount, 0)
+    return inserted
+
+
+def _fetch_recorded(cur, keys):
+    """{(id_siswa, tanggal): token_qr} untuk absensi yang sudah ada"""
+    recorded = {}
+    dates = sorted({tanggal for _, tanggal in keys})
+    date_placeholders = ', '.join(['%s'] * len(dates))
+    for chunk in _chunks(sorted({id_siswa for id_siswa, _ in keys})):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cur.execute(
+            f"SELECT id_siswa, tanggal, token_qr FROM absensi "
+            f"WHERE id_siswa IN ({placeholders}) AND tanggal IN ({date_placeholders})",
+            list(chunk) + dates
+        )
+        for row in cur.fetchall():
+            recorded[(row['id_siswa'], row['tanggal'])] = row['token_qr']
+    return recorded
+
+
+def insert_absen_batch(scans):
+    """
+    Mencatat banyak absensi sekaligus dalam satu transaksi
+
+    Data siswa diambil dengan satu query IN (...) per chunk, lalu semua
+    baris ditulis dengan executemany INSERT IGNORE. Baris ganda (siswa
+    yang sudah absen di tanggal yang sama) diabaikan oleh unique key.
+
+    Args:
+        scans (list): List of dict dengan key id_siswa, waktu_absen
+            (datetime WIB) dan token_qr
+
+    Returns:
+        int: Jumlah absensi yang benar-benar tercatat
+    """
+    if not scans:
+        return 0
+
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        profil = _fetch_profiles(cur, [scan['id_siswa'] for scan in scans])
+        inserted = _insert_rows(cur, scans, profil)
+        events = []
+        if inserted:
+            ids = _record_new_rows(
+                cur, [(scan['id_siswa'], scan['waktu_absen'].date()) for scan in scans]
+            )
+            events = _fetch_absen_events(cur, ids)
         conn.commit()
-        return True
+        _publish_after_commit(events)
+        return inserted
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def record_absen_batch(scans):
+    """
+    Mencatat banyak absensi sekaligus dan melaporkan hasil tiap scan
+
+    Sama seperti insert_absen_batch, tetapi absensi yang sudah ada dicek
+    lebih dulu (satu query) sehingga tiap scan mendapat hasilnya sendiri.
+    Jika beberapa scan jatuh di tanggal yang sama, scan paling awal yang
+    dicatat.
+
+    Args:
+        scans (list): List of dict dengan key id_siswa, waktu_absen
+            (datetime WIB) dan token_qr
+
+    Returns:
+        list: Hasil per scan (urutan sama dengan input): 'tercatat',
+            'sudah_absen', atau 'siswa_tidak_ditemukan'
+    """
+    if not scans:
+        return []
+
+    keys = [(scan['id_siswa'], scan['waktu_absen'].date()) for scan in scans]
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        profil = _fetch_profiles(cur, [id_siswa for id_siswa, _ in keys])
+        existing = _fetch_recorded(cur, keys)
+
+        results = [None] * len(scans)
+        candidates = []
+        claimed = set(existing)
+        for i in sorted(range(len(scans)), key=lambda i: scans[i]['waktu_absen']):
+            if keys[i][0] not in profil:
+                results[i] = 'siswa_tidak_ditemukan'
+            elif keys[i] in claimed:
+                results[i] = 'sudah_absen'
+            else:
+                claimed.add(keys[i])
+                candidates.append(i)
+                results[i] = 'tercatat'
+
+        inserted = _insert_rows(cur, [scans[i] for i in candidates], profil)
+        if inserted != len(candidates):
+            # Ada scan lain yang masuk bersamaan: cek ulang baris pemenangnya
+            recorded = _fetch_recorded(cur, [keys[i] for i in candidates])
+            for i in candidates:
+                if recorded.get(keys[i]) != scans[i]['token_qr']:
+                    results[i] = 'sudah_absen'
+        events = []
+        if inserted:
+            ids = _record_new_rows(cur, [keys[i] for i in candidates])
+            events = _fetch_absen_events(cur, ids)
+
+        conn.commit()
+        _publish_after_commit(events)
+        return results
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def upsert_absen_manual(entries, tanggal=None, kelas=None, issued_by=None):
+    """
+    Menulis absensi manual dari guru (hadir/izin/sakit/alpa) secara bulk
+
+    Semua baris ditulis dalam satu transaksi dengan upsert per chunk:
+    siswa yang belum punya absensi di tanggal tersebut mendapat baris
+    baru, yang sudah ada (mis. dari scan) diganti statusnya.
+
+    Args:
+        entries (list): List of (id_siswa, status)
+        tanggal (date): Tanggal absensi (default hari ini WIB)
+        kelas (str): Jika diisi, hanya siswa kelas ini yang ditulis
+        issued_by (str): Username guru yang mengubah; perubahan dikirim ke
+            live feed guru ini dan guru pembuat token scan-nya
+
+    Returns:
+        dict: {'written': jumlah baris, 'not_found': [id_siswa ditolak]}
+    """
+    waktu_sekarang = get_current_time_wib()
+    if tanggal is None or tanggal == waktu_sekarang.date():
+        tanggal = waktu_sekarang.date()
+        waktu_absen = waktu_sekarang
+    else:
+        waktu_absen = datetime(tanggal.year, tanggal.month, tanggal.day)
+
+    # Siswa yang muncul lebih dari sekali: status terakhir yang dipakai
+    statuses = dict(entries)
+    if not statuses:
+        return {'written': 0, 'not_found': []}
+
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        profil = _fetch_profiles(cur, statuses.keys(), kelas)
+        # Grup rekap lama dari baris yang akan ditimpa: -1, grup baru: +1
+        old_groups = _fetch_rollup_groups(cur, [i for i in statuses if i in profil], tanggal)
+        found = [(id_siswa, status) for id_siswa, status in sorted(statuses.items())
+                 if id_siswa in profil]
+        values = [
+            (
+                id_siswa,
+                waktu_absen,
+                tanggal,
+                status,
+                profil[id_siswa]['nama_siswa'],
+                profil[id_siswa]['jurusan'],
+                profil[id_siswa]['kelas']
+            )
+            for id_siswa, status in found
+        ]
+
+        sql = """
+            INSERT INTO absensi
+            (id_siswa, waktu_absen, tanggal, status, nama_siswa, jurusan, kelas)
+            VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """ + _UPSERT_SUFFIX[get_dialect()]
+        for chunk in _chunks(values):
+            cur.executemany(sql, chunk)
+
+        deltas = {}
+        for group in old_groups.values():
+            deltas[group] = deltas.get(group, 0) - 1
+        for _, _, _, status, _, jurusan, kelas_siswa in values:
+            group = (kelas_siswa or '', jurusan or '', status)
+            deltas[group] = deltas.get(group, 0) + 1
+        _apply_rollup_deltas(cur, tanggal, deltas)
+        ids = _fetch_written(cur, [id_siswa for id_siswa, _ in found], tanggal)
+        _stamp_versi(cur, ids)
+        events = _fetch_absen_events(cur, ids)
+
+        conn.commit()
+        _publish_after_commit(events, issued_by)
+        return {
+            'written': len(values),
+            'not_found': sorted(id_siswa for id_siswa in statuses if id_siswa not in profil)
+        }
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def has_absen_on(id_siswa, tanggal):
+    """
+    Cek apakah siswa sudah punya absensi di tanggal tertentu
+    (lookup unique key id_siswa, tanggal)
+
+    Args:
+        id_siswa (int): ID siswa
+        tanggal (date): Tanggal absensi
+
+    Returns:
+        bool: True jika absensi sudah tercatat
+    """
+    conn = connect_db()
+    cur = conn.cursor()
+
+    try:
+        cur.execute(
+            "SELECT 1 FROM absensi WHERE id_siswa=%s AND tanggal=%s LIMIT 1",
+            (id_siswa, tanggal)
+        )
+        return cur.fetchone() is not None
 
     finally:
         cur.close()
@@ -117,12 +688,123 @@ def get_all_absensi():
         conn.close()
 
 
+def get_absensi_page(limit=50, cursor=None, filters=None):
+    """
+    Mengambil satu halaman absensi terbaru (keyset pagination)
+
+    Halaman diurutkan (waktu_absen, id_absen) menurun. Halaman berikutnya
+    dimulai tepat setelah baris terakhir halaman sebelumnya, sehingga
+    biaya query tidak bertambah seiring bertambahnya riwayat.
+
+    Args:
+        limit (int): Jumlah baris per halaman
+        cursor (tuple): (waktu_absen, id_absen) baris terakhir halaman
+            sebelumnya, None untuk halaman pertama
+        filters (dict): Filter (lihat get_absensi_with_filters)
+
+    Returns:
+        tuple: (rows, next_cursor) - next_cursor None jika halaman terakhir
+    """
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        clauses, params = _absensi_filter_sql(filters)
+        if cursor is not None:
+            waktu, id_absen = cursor
+            # Bentuk ini bisa memakai range scan index waktu_absen
+            clauses.append("a.waktu_absen <= %s AND (a.waktu_absen < %s OR a.id_absen < %s)")
+            params += [waktu, waktu, id_absen]
+        query = _SQL_SELECT_ABSENSI
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY a.waktu_absen DESC, a.id_absen DESC LIMIT %s"
+        params.append(limit + 1)
+
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = (rows[-1]['waktu_absen'], rows[-1]['id_absen'])
+        return rows, next_cursor
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_absensi_since(since_versi, limit=50, filters=None):
+    """
+    Mengambil absensi yang baru atau berubah setelah watermark (polling delta)
+
+    Watermark adalah versi perubahan (absensi.versi), bukan id_absen:
+    urutan versi sama dengan urutan commit sehingga baris yang commit
+    terlambat tetap terkirim, begitu juga baris lama yang diubah guru.
+
+    Args:
+        since_versi (int): Versi terakhir yang sudah dimiliki client
+        limit (int): Jumlah baris maksimum
+        filters (dict): Filter (lihat get_absensi_with_filters)
+
+    Returns:
+        tuple: (rows, has_more) - rows urut versi naik; has_more True
+            jika masih ada perubahan di luar limit
+    """
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        clauses, params = _absensi_filter_sql(filters)
+        # Range scan index versi: murah walau riwayat sudah besar
+        clauses.append("a.versi > %s")
+        params.append(since_versi)
+        query = _SQL_SELECT_ABSENSI + " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY a.versi ASC LIMIT %s"
+        params.append(limit + 1)
+
+        cur.execute(query, params)
+        rows = cur.fetchall()
+        return rows[:limit], len(rows) > limit
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_absensi_versi():
+    """
+    Versi perubahan absensi terakhir yang sudah ter-commit - naik setiap
+    ada absensi baru maupun absensi yang diubah
+
+    Returns:
+        int: Versi terakhir (0 jika belum ada absensi)
+    """
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        cur.execute(_SQL_VERSI_CURRENT)
+        row = cur.fetchone()
+        return row['versi'] if row else 0
+
+    finally:
+        cur.close()
+        conn.close()
+
+
 def get_absensi_with_filters(query_params=None):
     """
     Mengambil data absensi dengan filter
 
+    Semua filter diterjemahkan ke SQL berparameter: rentang tanggal
+    menjadi range pada waktu_absen, kelas/jurusan/status memakai kolom
+    absensi (nilai saat absen), NIS lewat siswa.nis, dan nama sebagai
+    pencarian sebagian pada nama_siswa.
+
     Args:
-        query_params (dict): Dictionary berisi parameter filter
+        query_params (dict): Filter opsional - tanggal_mulai, tanggal_selesai
+            (date, inklusif), kelas, jurusan, status, nis, nama
 
     Returns:
         list: List of dictionaries berisi data absensi yang difilter
@@ -131,19 +813,196 @@ def get_absensi_with_filters(query_params=None):
     cur = conn.cursor(dictionary=True)
 
     try:
-        query = """
-            SELECT a.*, s.nis, s.nama_siswa, s.kelas, s.jurusan
-            FROM absensi a
-            JOIN siswa s ON a.id_siswa = s.id_siswa
-            WHERE 1=1
-            ORDER BY a.waktu_absen DESC
-        """
+        clauses, params = _absensi_filter_sql(query_params)
+        query = _SQL_SELECT_ABSENSI
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        query += " ORDER BY a.waktu_absen DESC, a.id_absen DESC"
 
-        # Tambahkan filter jika ada (bisa dikembangkan)
-        cur.execute(query)
+        cur.execute(query, params)
         rows = cur.fetchall()
         return rows
 
     finally:
         cur.close()
         conn.close()
+
+
+# Kolom kelas/jurusan/nama dari absensi: nilai saat siswa absen, sehingga
+# laporan lama tetap benar walau siswa pindah kelas
+_SQL_SELECT_ABSENSI = """
+    SELECT a.*, s.nis
+    FROM absensi a
+    JOIN siswa s ON a.id_siswa = s.id_siswa
+"""
+
+
+def _absensi_filter_sql(filters):
+    """Klausa WHERE + parameter dari dict filter absensi"""
+    filters = filters or {}
+    clauses, params = [], []
+    if filters.get('tanggal_mulai'):
+        clauses.append("a.waktu_absen >= %s")
+        params.append(get_day_range_wib(filters['tanggal_mulai'])[0])
+    if filters.get('tanggal_selesai'):
+        clauses.append("a.waktu_absen < %s")
+        params.append(get_day_range_wib(filters['tanggal_selesai'])[1])
+    for column in ('kelas', 'jurusan', 'status'):
+        if filters.get(column):
+            clauses.append(f"a.{column} = %s")
+            params.append(filters[column])
+    if filters.get('nis'):
+        clauses.append("s.nis = %s")
+        params.append(filters['nis'])
+    if filters.get('nama'):
+        # '!' sebagai karakter escape: sama di MySQL dan SQLite
+        pattern = filters['nama'].replace('!', '!!').replace('%', '!%').replace('_', '!_')
+        clauses.append("a.nama_siswa LIKE %s ESCAPE '!'")
+        params.append(f"%{pattern}%")
+    return clauses, params
+
+
+def _rollup_bump_sql():
+    return _SQL_ROLLUP_BUMP + _ROLLUP_BUMP_SUFFIX[get_dialect()]
+
+
+def _fetch_rollup_groups(cur, ids, tanggal):
+    """Grup rekap (kelas, jurusan, status) absensi siswa yang sudah ada di tanggal itu"""
+    groups = {}
+    for chunk in _chunks(sorted(ids)):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cur.execute(
+            "SELECT id_siswa, kelas, jurusan, status FROM absensi "
+            f"WHERE tanggal = %s AND id_siswa IN ({placeholders})" + _LOCK_SUFFIX[get_dialect()],
+            [tanggal] + chunk
+        )
+        for row in cur.fetchall():
+            groups[row['id_siswa']] = (
+                row['kelas'] or '', row['jurusan'] or '', row['status'] or 'hadir'
+            )
+    return groups
+
+
+def _fetch_written(cur, ids, tanggal):
+    """id_absen baris upsert manual (ditulis/dikunci transaksi ini)"""
+    written = []
+    for chunk in _chunks(sorted(ids)):
+        placeholders = ', '.join(['%s'] * len(chunk))
+        cur.execute(
+            f"SELECT id_absen FROM absensi WHERE tanggal = %s AND id_siswa IN ({placeholders})",
+            [tanggal] + chunk
+        )
+        written.extend(row['id_absen'] for row in cur.fetchall())
+    return written
+
+
+def _apply_rollup_deltas(cur, tanggal, deltas):
+    """Tambahkan selisih per grup ke rekap; grup yang menjadi 0 dihapus"""
+    changed = [
+        (tanggal, kelas, jurusan, status, delta)
+        for (kelas, jurusan, status), delta in sorted(deltas.items()) if delta
+    ]
+    if not changed:
+        return
+    cur.executemany(_SQL_ROLLUP_ADD + _ROLLUP_ADD_SUFFIX[get_dialect()], changed)
+    if any(delta < 0 for *_, delta in changed):
+        cur.execute("DELETE FROM absensi_harian WHERE tanggal = %s AND jumlah <= 0", (tanggal,))
+
+
+def rebuild_absensi_harian(tanggal_mulai=None, tanggal_selesai=None):
+    """
+    Membangun ulang rekap harian dari data absensi mentah
+    (lihat python init_db.py --rebuild-rekap)
+
+    Args:
+        tanggal_mulai (date): Awal rentang (default semua data)
+        tanggal_selesai (date): Akhir rentang, inklusif (default semua data)
+
+    Returns:
+        int: Jumlah baris rekap yang ditulis
+    """
+    clauses, params = ["tanggal IS NOT NULL"], []
+    if tanggal_mulai:
+        clauses.append("tanggal >= %s")
+        params.append(tanggal_mulai)
+    if tanggal_selesai:
+        clauses.append("tanggal <= %s")
+        params.append(tanggal_selesai)
+    where = " AND ".join(clauses)
+
+    conn = connect_db()
+    cur = conn.cursor()
+
+    try:
+        cur.execute(f"DELETE FROM absensi_harian WHERE {where}", params)
+        cur.execute(f"{_SQL_ROLLUP_INSERT} WHERE {where} GROUP BY {_ROLLUP_GROUP}", params)
+        written = cur.rowcount
+        conn.commit()
+        return written
+
+    finally:
+        cur.close()
+        conn.close()
+
+
+def get_rekap_harian(tanggal_mulai, tanggal_selesai, kelas=None, jurusan=None):
+    """
+    Rekap kehadiran per tanggal x kelas x jurusan dari absensi_harian
+
+    Biaya query sebanding dengan jumlah kelas x hari, bukan jumlah scan.
+
+    Args:
+        tanggal_mulai (date): Awal rentang
+        tanggal_selesai (date): Akhir rentang (inklusif)
+        kelas (str): Filter kelas (opsional)
+        jurusan (str): Filter jurusan (opsional)
+
+    Returns:
+        list: Dict per grup berisi tanggal, kelas, jurusan, jumlah per
+            status (hadir/izin/sakit/alpa), total, jumlah_siswa, dan
+            persen_hadir (None jika jumlah siswa tidak diketahui)
+    """
+    clauses = ["tanggal >= %s", "tanggal <= %s"]
+    params = [tanggal_mulai, tanggal_selesai]
+    for column, value in (('kelas', kelas), ('jurusan', jurusan)):
+        if value:
+            clauses.append(f"{column} = %s")
+            params.append(value)
+
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+
+    try:
+        cur.execute(
+            "SELECT tanggal, kelas, jurusan, status, jumlah FROM absensi_harian "
+            f"WHERE {' AND '.join(clauses)} ORDER BY tanggal, kelas, jurusan",
+            params
+        )
+        rows = cur.fetchall()
+
+    finally:
+        cur.close()
+        conn.close()
+
+    # Jumlah siswa per kelas/jurusan (penyebut persentase kehadiran)
+    roster = get_roster_counts()
+
+    rekap = {}
+    for row in rows:
+        key = (str(row['tanggal']), row['kelas'], row['jurusan'])
+        group = rekap.get(key)
+        if group is None:
+            group = dict(zip(('tanggal', 'kelas', 'jurusan'), key))
+            group.update({status: 0 for status in ABSEN_STATUSES})
+            group['total'] = 0
+            rekap[key] = group
+        group[row['status']] = group.get(row['status'], 0) + row['jumlah']
+        group['total'] += row['jumlah']
+
+    for (_, kelas_grup, jurusan_grup), group in rekap.items():
+        jumlah_siswa = roster.get((kelas_grup, jurusan_grup))
+        group['jumlah_siswa'] = jumlah_siswa
+        group['persen_hadir'] = (
+            round(100 * group['hadir'] / jumlah_siswa, 1) if jumlah_siswa else None
+        )
+    return list(rekap.values())
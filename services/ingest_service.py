@@ -0,0 +1,369 @@
+"""
+Service layer untuk ingest absensi write-behind (antrian + batch flush)
+dan journal lokal (scan tetap diterima saat database lambat/mati)
+"""
+import logging
+import queue
+import threading
+import time
+from datetime import datetime
+
+from mysql.connector import Error, errors
+
+from services.absensi_service import has_absen_on, insert_absen_batch
+from utils.db import PoolTimeoutError
+from utils.journal import JournalReplayer, ScanJournal
+from utils.scheduler import PeriodicTask
+
+logger = logging.getLogger('absensi.ingest')
+
+# Error replay journal yang berarti database belum bisa dijangkau (atau
+# deadlock/lock sesaat): entri dicoba lagi, tidak dipindah ke dead-letter
+_JOURNAL_TRANSIENT_ERRORS = (
+    errors.InterfaceError,
+    errors.OperationalError,
+    errors.InternalError,
+    PoolTimeoutError,
+    OSError
+)
+
+
+class IngestQueueFull(Exception):
+    """Antrian ingest penuh; scan harus ditolak atau dicoba lagi"""
+
+
+class _DailySeen:
+    """
+    Himpunan siswa yang sudah scan pada tanggal berjalan.
+
+    Siswa yang belum ada di himpunan dicek ke tabel absensi lewat
+    recorded(id_siswa, tanggal): himpunan kosong setelah restart, dan
+    siswa bisa sudah tercatat lewat scan langsung, scan_batch, atau input
+    manual guru. Jika database tidak bisa dijangkau, scan tetap diterima
+    (insert ulang idempotent lewat unique key).
+    """
+
+    def __init__(self, recorded=None):
+        """
+        Args:
+            recorded (callable): Cek absensi di database, atau None
+        """
+        self._recorded = recorded
+        self._lock = threading.Lock()
+        self._date = None
+        self._ids = set()
+
+    def _contains(self, id_siswa, tanggal):
+        if self._date != tanggal:
+            self._date = tanggal
+            self._ids = set()
+        return id_siswa in self._ids
+
+    def _in_database(self, id_siswa, tanggal):
+        if self._recorded is None:
+            return False
+        try:
+            return self._recorded(id_siswa, tanggal)
+        except Error as err:
+            logger.warning("Cek absensi siswa %s gagal, scan diterima: %s", id_siswa, err)
+            return False
+
+    def add(self, id_siswa, tanggal):
+        """Tandai siswa; False jika sudah tercatat di tanggal yang sama"""
+        with self._lock:
+            if self._contains(id_siswa, tanggal):
+                return False
+        # Query di luar lock agar submit siswa lain tidak ikut menunggu
+        recorded = self._in_database(id_siswa, tanggal)
+        with self._lock:
+            if self._contains(id_siswa, tanggal):
+                return False
+            self._ids.add(id_siswa)
+            return not recorded
+
+    def discard(self, id_siswa):
+        """Batalkan tanda siswa (scan gagal diterima)"""
+        with self._lock:
+            self._ids.discard(id_siswa)
+
+
+class ScanIngestQueue:
+    """
+    Antrian scan absensi in-process dengan flusher di background.
+
+    Scan yang sudah tervalidasi dimasukkan ke antrian terbatas lalu
+    ditulis per batch (executemany, satu transaksi) saat batch penuh
+    atau flush_interval terlewati. Scan ganda siswa di tanggal yang sama
+    ditolak saat submit sehingga tidak pernah masuk batch dua kali.
+    Flusher dijalankan otomatis oleh submit() jika belum berjalan (mis.
+    di proses worker hasil fork).
+    """
+
+    def __init__(self, writer=insert_absen_batch, maxsize=10000,
+                 batch_size=200, flush_interval=0.5, retry_delay=1.0,
+                 recorded=has_absen_on):
+        """
+        Args:
+            writer (callable): Fungsi penulis batch, menerima list scan
+            maxsize (int): Kapasitas antrian
+            batch_size (int): Jumlah scan maksimum per flush
+            flush_interval (float): Jeda maksimum sebelum flush (detik)
+            retry_delay (float): Jeda sebelum mencoba ulang batch gagal (detik)
+            recorded (callable): Cek absensi yang sudah ada di database
+                (id_siswa, tanggal) -> bool
+        """
+        self._writer = writer
+        self._queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.retry_delay = retry_delay
+
+        self._seen = _DailySeen(recorded)
+
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_lock = threading.Lock()
+        self._closed = False
+        self._stats_lock = threading.Lock()
+        self._stats = {
+            'enqueued': 0,
+            'duplicates': 0,
+            'rejected_full': 0,
+            'flushed': 0,
+            'inserted': 0,
+            'batches': 0,
+            'errors': 0,
+            'last_flush_ms': None
+        }
+
+    def _count(self, key, amount=1):
+        with self._stats_lock:
+            self._stats[key] += amount
+
+    # ----------------------------------------
+    # Producer
+    # ----------------------------------------
+    def submit(self, id_siswa, token_qr, waktu_absen):
+        """
+        Memasukkan scan ke antrian
+
+        Args:
+            id_siswa (int): ID siswa
+            token_qr (str): Token QR yang dipakai
+            waktu_absen (datetime): Waktu scan (WIB)
+
+        Returns:
+            bool: True jika diterima, False jika siswa sudah absen hari ini
+
+        Raises:
+            IngestQueueFull: Jika antrian penuh atau sudah dihentikan
+        """
+        if self._closed:
+            raise IngestQueueFull("Antrian absensi sudah dihentikan")
+        self.start()
+
+        if not self._seen.add(id_siswa, waktu_absen.date()):
+            self._count('duplicates')
+            return False
+
+        try:
+            self._queue.put_nowait({
+                'id_siswa': id_siswa,
+                'token_qr': token_qr,
+                'waktu_absen': waktu_absen
+            })
+        except queue.Full as err:
+            self._seen.discard(id_siswa)
+            self._count('rejected_full')
+            raise IngestQueueFull("Antrian absensi penuh") from err
+
+        self._count('enqueued')
+        return True
+
+    # ----------------------------------------
+    # Consumer
+    # ----------------------------------------
+    def _collect_batch(self, pending):
+        deadline = time.monotonic() + self.flush_interval
+        while len(pending) < self.batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                pending.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return pending
+
+    def _flush(self, batch):
+        start = time.perf_counter()
+        inserted = self._writer(batch)
+        with self._stats_lock:
+            self._stats['flushed'] += len(batch)
+            self._stats['inserted'] += inserted
+            self._stats['batches'] += 1
+            self._stats['last_flush_ms'] = round((time.perf_counter() - start) * 1000, 2)
+
+    def _run(self):
+        pending = []
+        while not self._stop.is_set():
+            pending = self._collect_batch(pending)
+            if not pending:
+                continue
+            try:
+                self._flush(pending)
+                pending = []
+            except Exception:  # pylint: disable=broad-except
+                # Batch dipertahankan dan dicoba lagi; tidak ada scan yang hilang
+                self._count('errors')
+                logger.exception("Flush %d scan gagal, dicoba lagi", len(pending))
+                self._stop.wait(self.retry_delay)
+        self._drain(pending)
+
+    def _drain(self, pending):
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        for start in range(0, len(pending), self.batch_size):
+            batch = pending[start:start + self.batch_size]
+            try:
+                self._flush(batch)
+            except Exception:  # pylint: disable=broad-except
+                self._count('errors')
+                logger.exception("Drain %d scan gagal saat shutdown", len(batch))
+
+    def start(self):
+        """Mulai thread flusher (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._thread_lock:
+            if self._thread is not None and self._thread.is_alive():
+                return
+            self._closed = False
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name='scan-ingest', daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=30):
+        """Hentikan flusher dan tulis semua scan yang tersisa di antrian"""
+        with self._thread_lock:
+            self._closed = True
+            self._stop.set()
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            thread.join(timeout)
+
+    def stats(self):
+        """
+        Statistik antrian ingest
+
+        Returns:
+            dict: depth, enqueued, flushed, inserted, batches, errors, ...
+        """
+        with self._stats_lock:
+            data = dict(self._stats)
+        data['depth'] = self._queue.qsize()
+        data['capacity'] = self._queue.maxsize
+        return data
+
+
+def _apply_journal_records(records):
+    """Ubah entri journal menjadi scan lalu tulis lewat insert_absen_batch"""
+    return insert_absen_batch([
+        {
+            'id_siswa': record['id_siswa'],
+            'token_qr': record['token_qr'],
+            'waktu_absen': datetime.fromisoformat(record['waktu_absen'])
+        }
+        for record in records
+    ])
+
+
+class JournaledIngest:
+    """
+    Ingest scan lewat journal lokal.
+
+    submit() menulis scan ke journal (fsync berkelompok) lalu langsung
+    kembali, sehingga latensi scan bergantung pada disk lokal, bukan
+    database. Replayer berkala menerapkan journal ke absensi secara
+    idempotent (unique key id_siswa, tanggal) begitu database bisa
+    dijangkau. Entri yang ditolak database dipindah ke path + '.dead'.
+    """
+
+    def __init__(self, path, replay_interval=0.5, batch_size=500, recorded=has_absen_on):
+        """
+        Args:
+            path (str): Path file journal
+            replay_interval (float): Jeda antar replay (detik)
+            batch_size (int): Entri per batch replay
+            recorded (callable): Cek absensi yang sudah ada di database
+                (id_siswa, tanggal) -> bool
+        """
+        self.journal = ScanJournal(path)
+        self.replayer = JournalReplayer(
+            self.journal, _apply_journal_records, batch_size=batch_size,
+            transient_errors=_JOURNAL_TRANSIENT_ERRORS
+        )
+        self._task = PeriodicTask(
+            'scan_journal_replay', replay_interval, self.replayer.replay,
+            run_at_start=True
+        )
+        self._seen = _DailySeen(recorded)
+        self._duplicates = 0
+
+    def submit(self, id_siswa, token_qr, waktu_absen):
+        """
+        Menulis scan ke journal (durable sebelum kembali)
+
+        Args:
+            id_siswa (int): ID siswa
+            token_qr (str): Token QR yang dipakai
+            waktu_absen (datetime): Waktu scan (WIB)
+
+        Returns:
+            bool: True jika diterima, False jika siswa sudah absen hari ini
+        """
+        if not self._seen.add(id_siswa, waktu_absen.date()):
+            self._duplicates += 1
+            return False
+        try:
+            self.journal.append({
+                'id_siswa': id_siswa,
+                'token_qr': token_qr,
+                'waktu_absen': waktu_absen.replace(tzinfo=None).isoformat(),
+                'ts': time.time()
+            })
+        except OSError:
+            self._seen.discard(id_siswa)
+            raise
+        return True
+
+    def start(self):
+        """
+        Kunci journal untuk proses ini lalu mulai replayer berkala
+
+        Raises:
+            JournalLockedError: Journal dipakai proses lain
+        """
+        self.journal.lock()
+        self._task.start()
+
+    def stop(self, timeout=30):
+        """Hentikan replayer lalu coba terapkan sisa journal sekali lagi"""
+        self._task.stop(timeout)
+        self.replayer.replay()
+        self.journal.close()
+
+    def stats(self):
+        """
+        Metrik journal dan replay
+
+        Returns:
+            dict: lag_bytes, lag_seconds, appended, fsyncs, replayed, errors,
+                dead_letter, ...
+        """
+        data = self.replayer.stats()
+        data['duplicates'] = self._duplicates
+        return data
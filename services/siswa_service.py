@@ -2,8 +2,22 @@
 Service layer untuk operasi terkait data Siswa
 """
 from mysql.connector import Error
+from config import ROSTER_CACHE_CONFIG
+from utils.cache import MISSING, TTLCache
 from utils.db import connect_db, get_db_connection
 
+# Profil siswa di roster cache; nama/jurusan/kelas disalin ke tabel absensi
+PROFILE_FIELDS = ('nis', 'nama_siswa', 'jurusan', 'kelas')
+
+# Cache profil siswa per id_siswa, dipakai jalur scan
+_roster_cache = TTLCache(
+    maxsize=ROSTER_CACHE_CONFIG['maxsize'],
+    default_ttl=ROSTER_CACHE_CONFIG['ttl']
+)
+
+# Jumlah siswa per (kelas, jurusan), penyebut persentase rekap harian
+_roster_count_cache = TTLCache(maxsize=1, default_ttl=ROSTER_CACHE_CONFIG['ttl'])
+
 
 def get_siswa_by_username(username):
     """
@@ -49,6 +63,85 @@ def get_siswa_by_id(id_siswa):
         conn.close()
 
 
+def remember_siswa_profile(siswa):
+    """
+    Menyimpan profil siswa ke roster cache
+
+    Args:
+        siswa (dict): Baris siswa (minimal id_siswa, nis, nama_siswa, jurusan, kelas)
+    """
+    _roster_cache.set(
+        siswa['id_siswa'],
+        {field: siswa.get(field) for field in PROFILE_FIELDS}
+    )
+
+
+def get_cached_siswa_profile(id_siswa):
+    """
+    Mengambil profil siswa dari roster cache tanpa query
+
+    Args:
+        id_siswa (int): ID siswa
+
+    Returns:
+        dict or None: {'nis', 'nama_siswa', 'jurusan', 'kelas'} atau None jika tidak di cache
+    """
+    profile = _roster_cache.get(id_siswa)
+    return None if profile is MISSING else profile
+
+
+def invalidate_siswa_profile(id_siswa):
+    """
+    Membuang profil siswa dari roster cache
+
+    Args:
+        id_siswa (int): ID siswa
+    """
+    _roster_cache.invalidate(id_siswa)
+
+
+def get_roster_counts():
+    """
+    Jumlah siswa per kelas dan jurusan (satu GROUP BY saat cache kosong).
+    Cache dibuang setiap create/update/delete siswa.
+
+    Returns:
+        dict: {(kelas, jurusan): jumlah siswa}, kelas/jurusan kosong sebagai ''
+    """
+    counts = _roster_count_cache.get('all')
+    if counts is not MISSING:
+        return counts
+
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(
+            "SELECT COALESCE(kelas, '') AS kelas, COALESCE(jurusan, '') AS jurusan, "
+            "COUNT(*) AS jumlah FROM siswa GROUP BY COALESCE(kelas, ''), COALESCE(jurusan, '')"
+        )
+        counts = {(row['kelas'], row['jurusan']): row['jumlah'] for row in cur.fetchall()}
+    finally:
+        cur.close()
+        conn.close()
+    _roster_count_cache.set('all', counts)
+    return counts
+
+
+def invalidate_roster_counts():
+    """Membuang cache jumlah siswa per kelas/jurusan"""
+    _roster_count_cache.clear()
+
+
+def get_roster_cache_stats():
+    """
+    Statistik roster cache
+
+    Returns:
+        dict: Statistik TTLCache (hits, misses, hit_rate, ...)
+    """
+    return _roster_cache.stats()
+
+
 def authenticate_siswa(username, password):
     """
     Autentikasi siswa berdasarkan username dan password
@@ -63,6 +156,8 @@ def authenticate_siswa(username, password):
     siswa = get_siswa_by_username(username)
 
     if siswa and siswa.get('password') == password:
+        # Scan pertama setelah login tidak perlu lookup profil
+        remember_siswa_profile(siswa)
         return siswa
 
     return None
@@ -125,6 +220,8 @@ def create_siswa(username, password, nis, nama_siswa, jurusan='', kelas=''):
         values = (username, password, nis, nama_siswa, jurusan, kelas)
         cursor.execute(query, values)
         connection.commit()
+        invalidate_siswa_profile(cursor.lastrowid)
+        invalidate_roster_counts()
         return cursor.lastrowid
     finally:
         cursor.close()
@@ -165,6 +262,8 @@ def update_siswa(id_siswa, username, password, nis, nama_siswa, jurusan='', kela
         values = (username, password, nis, nama_siswa, jurusan, kelas, id_siswa)
         cursor.execute(query, values)
         connection.commit()
+        invalidate_siswa_profile(id_siswa)
+        invalidate_roster_counts()
         return cursor.rowcount
     finally:
         cursor.close()
@@ -194,6 +293,8 @@ def delete_siswa(id_siswa):
         query = "DELETE FROM siswa WHERE id_siswa=%s"
         cursor.execute(query, (id_siswa,))
         connection.commit()
+        invalidate_siswa_profile(id_siswa)
+        invalidate_roster_counts()
         return cursor.rowcount
     finally:
         cursor.close()
@@ -1,10 +1,35 @@
 """
 Service layer untuk operasi QR Token
 """
+import logging
 import secrets
-from datetime import timedelta
+import time
+from datetime import datetime, timedelta
+from itsdangerous import BadSignature, URLSafeSerializer
+from config import TOKEN_CACHE_CONFIG, WIB
+from utils.async_db import get_async_db
+from utils.cache import MISSING, TTLCache
 from utils.db import connect_db
-from utils.time_helper import get_current_time_wib
+from utils.time_helper import get_current_time_wib, localize_to_wib
+
+# Cache hasil verify_token: token aktif disimpan sampai waktu_expired,
+# token tidak dikenal disimpan sebentar (negative_ttl)
+_token_cache = TTLCache(maxsize=TOKEN_CACHE_CONFIG['maxsize'])
+
+# Cache status revokasi token bertanda tangan
+_revoked_cache = TTLCache(maxsize=TOKEN_CACHE_CONFIG['maxsize'])
+
+SIGNED_TOKEN_SALT = 'qr-token'
+
+sweeper_logger = logging.getLogger('absensi.sweeper')
+
+# SQL yang dipakai bersama jalur sinkron dan async
+_SQL_INSERT_TOKEN = """
+    INSERT INTO qr_token (token, waktu_buat, waktu_expired, status, issued_by)
+    VALUES (%s, %s, %s, 'aktif', %s)
+"""
+_SQL_VERIFY_TOKEN = "SELECT * FROM qr_token WHERE token=%s AND status='aktif' LIMIT 1"
+_SQL_TOKEN_REVOKED = "SELECT 1 AS revoked FROM qr_token WHERE token=%s AND status='dicabut' LIMIT 1"
 
 
 def generate_new_token():
@@ -17,13 +42,15 @@ def generate_new_token():
     return secrets.token_urlsafe(32)
 
 
-def insert_qr_token(token, expires_dt):
+def insert_qr_token(token, expires_dt, issued_by=None, waktu_buat=None):
     """
     Menyimpan token QR baru ke database
     
     Args:
         token (str): Token string
         expires_dt (datetime): Waktu expired token
+        issued_by (str): Username guru yang membuat token (opsional)
+        waktu_buat (datetime): Waktu pembuatan (default sekarang, WIB)
         
     Returns:
         None
@@ -31,21 +58,21 @@ def insert_qr_token(token, expires_dt):
     conn = connect_db()
     cur = conn.cursor()
     try:
-        waktu_buat_wib = get_current_time_wib()
-        cur.execute(
-            """INSERT INTO qr_token (token, waktu_buat, waktu_expired, status)
-               VALUES (%s, %s, %s, 'aktif')""",
-            (token, waktu_buat_wib, expires_dt)
-        )
+        waktu_buat_wib = waktu_buat or get_current_time_wib()
+        cur.execute(_SQL_INSERT_TOKEN, (token, waktu_buat_wib, expires_dt, issued_by))
         conn.commit()
     finally:
         cur.close()
         conn.close()
+    # Buang negative cache jika token ini sempat dicek sebelum tersimpan
+    _token_cache.invalidate(token)
 
 
 def verify_token(token):
     """
-    Memverifikasi apakah token masih aktif
+    Memverifikasi apakah token masih aktif.
+    Hasil di-cache sampai waktu_expired token sehingga scan berulang
+    pada QR yang sama tidak memerlukan query.
     
     Args:
         token (str): Token yang akan diverifikasi
@@ -53,27 +80,83 @@ def verify_token(token):
     Returns:
         dict or None: Data token jika aktif, None jika tidak
     """
+    cached = _token_cache.get(token)
+    if cached is not MISSING:
+        return dict(cached) if cached else None
+
+    conn = connect_db()
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(_SQL_VERIFY_TOKEN, (token,))
+        result = cur.fetchone()
+    finally:
+        cur.close()
+        conn.close()
+
+    _remember_verified(token, result)
+    return result
+
+
+def _remember_verified(token, result):
+    """Simpan hasil verifikasi: token aktif sampai expired, lainnya sebentar"""
+    if result:
+        sisa = localize_to_wib(result['waktu_expired']) - get_current_time_wib()
+        _token_cache.set(token, dict(result), sisa.total_seconds())
+    else:
+        _token_cache.set(token, None, TOKEN_CACHE_CONFIG['negative_ttl'])
+
+
+def lookup_tokens(tokens):
+    """
+    Mengambil data banyak token sekaligus dengan satu query IN (...)
+
+    Token yang ada di cache verify_token tidak di-query ulang. Berbeda
+    dengan verify_token, token berstatus 'expired' (sweeper) dan
+    'dicabut' (revokasi) juga dikembalikan agar pemanggil bisa menilai
+    scan yang terjadi saat token masih aktif.
+
+    Args:
+        tokens (list): Token yang akan dicek
+
+    Returns:
+        dict: {token: data token} untuk token yang dikenal
+    """
+    found = {}
+    pending = []
+    for token in set(tokens):
+        cached = _token_cache.get(token)
+        if cached is not MISSING and cached:
+            found[token] = dict(cached)
+        else:
+            pending.append(token)
+    if not pending:
+        return found
+
     conn = connect_db()
     cur = conn.cursor(dictionary=True)
     try:
+        placeholders = ', '.join(['%s'] * len(pending))
         cur.execute(
-            "SELECT * FROM qr_token WHERE token=%s AND status='aktif' LIMIT 1",
-            (token,)
+            f"SELECT * FROM qr_token WHERE token IN ({placeholders})",
+            pending
         )
-        result = cur.fetchone()
-        return result
+        for row in cur.fetchall():
+            found[row['token']] = row
     finally:
         cur.close()
         conn.close()
+    return found
 
 
 def expire_token(token):
     """
-    Mengubah status token menjadi expired
-    
+    Mencabut token sebelum masa berlakunya habis (status 'dicabut').
+    Berbeda dengan status 'expired' dari sweeper, token yang dicabut
+    ditolak juga untuk scan offline yang diunggah belakangan.
+
     Args:
-        token (str): Token yang akan di-expire
-        
+        token (str): Token yang akan dicabut
+
     Returns:
         None
     """
@@ -81,20 +164,34 @@ def expire_token(token):
     cur = conn.cursor()
     try:
         cur.execute(
-            "UPDATE qr_token SET status='expired' WHERE token=%s",
+            "UPDATE qr_token SET status='dicabut' WHERE token=%s",
             (token,)
         )
         conn.commit()
     finally:
         cur.close()
         conn.close()
+    _token_cache.invalidate(token)
+    _revoked_cache.invalidate(token)
+
 
-def create_token_with_ttl(ttl_seconds=300):
+def get_token_cache_stats():
+    """
+    Statistik cache verify_token
+
+    Returns:
+        dict: Statistik TTLCache (hits, misses, hit_rate, ...)
+    """
+    return _token_cache.stats()
+
+
+def create_token_with_ttl(ttl_seconds=300, issued_by=None):
     """
     Membuat token baru dengan Time To Live tertentu
     
     Args:
         ttl_seconds (int): Durasi token dalam detik (default 300 = 5 menit)
+        issued_by (str): Username guru yang membuat token (opsional)
         
     Returns:
         tuple: (token, expires_at) - Token string dan waktu expired
@@ -102,5 +199,347 @@ def create_token_with_ttl(ttl_seconds=300):
     token = generate_new_token()
     waktu_sekarang = get_current_time_wib()
     expires_at = waktu_sekarang + timedelta(seconds=ttl_seconds)
-    insert_qr_token(token, expires_at)
+    insert_qr_token(token, expires_at, issued_by, waktu_buat=waktu_sekarang)
+    return token, expires_at
+
+
+# ========================================
+# SIGNED (STATELESS) TOKENS
+# ========================================
+# Token bertanda tangan memuat waktu buat, waktu expired, guru pembuat,
+# dan id sesi. Validitas dan expiry dicek murni di CPU; database hanya
+# dikonsultasikan untuk revokasi. Baris qr_token tetap ditulis sekali
+# saat token dibuat sebagai audit log.
+
+def _signed_serializer(secret_key):
+    return URLSafeSerializer(secret_key, salt=SIGNED_TOKEN_SALT)
+
+
+def is_signed_token(token):
+    """
+    Mengecek apakah token berformat token bertanda tangan
+
+    Args:
+        token (str): Token dari QR
+
+    Returns:
+        bool: True jika token bertanda tangan (bukan token acak lama)
+    """
+    # token_urlsafe tidak pernah mengandung '.', sedangkan itsdangerous
+    # memisahkan payload dan signature dengan '.'
+    return '.' in token
+
+
+def create_signed_token_with_ttl(secret_key, ttl_seconds=300, issued_by=None):
+    """
+    Membuat token bertanda tangan dan mencatatnya ke qr_token (audit)
+
+    Args:
+        secret_key (str): SECRET_KEY aplikasi untuk menandatangani token
+        ttl_seconds (int): Durasi token dalam detik
+        issued_by (str): Username guru yang membuat token
+
+    Returns:
+        tuple: (token, expires_at) - Token string dan waktu expired
+    """
+    token, waktu_sekarang, expires_at = _new_signed_token(secret_key, ttl_seconds, issued_by)
+    insert_qr_token(token, expires_at, issued_by, waktu_buat=waktu_sekarang)
+    return token, expires_at
+
+
+def _new_signed_token(secret_key, ttl_seconds, issued_by):
+    waktu_sekarang = get_current_time_wib()
+    expires_at = waktu_sekarang + timedelta(seconds=ttl_seconds)
+    payload = {
+        'iat': int(waktu_sekarang.timestamp()),
+        'exp': int(expires_at.timestamp()),
+        'iss': issued_by,
+        'sid': secrets.token_urlsafe(8)
+    }
+    return _signed_serializer(secret_key).dumps(payload), waktu_sekarang, expires_at
+
+
+def verify_signed_token(token, secret_key):
+    """
+    Memverifikasi token bertanda tangan tanpa lookup qr_token
+
+    Args:
+        token (str): Token bertanda tangan
+        secret_key (str): SECRET_KEY aplikasi
+
+    Returns:
+        dict or None: Data token (format sama dengan verify_token)
+            atau None jika signature tidak valid / token direvokasi
+    """
+    row = _decode_signed_token(token, secret_key)
+    if row is None:
+        return None
+    sisa_detik = row.pop('_sisa_detik')
+    if sisa_detik > 0 and is_token_revoked(token, sisa_detik):
+        return None
+    return row
+
+
+def _decode_signed_token(token, secret_key):
+    """Cek signature dan bentuk data token (plus _sisa_detik untuk cek revokasi)"""
+    try:
+        payload = _signed_serializer(secret_key).loads(token)
+    except BadSignature:
+        return None
+
+    return {
+        'token': token,
+        'waktu_buat': datetime.fromtimestamp(payload['iat'], WIB).replace(tzinfo=None),
+        'waktu_expired': datetime.fromtimestamp(payload['exp'], WIB).replace(tzinfo=None),
+        'status': 'aktif',
+        'issued_by': payload.get('iss'),
+        'session_id': payload.get('sid'),
+        '_sisa_detik': payload['exp'] - get_current_time_wib().timestamp()
+    }
+
+
+def is_token_revoked(token, max_cache_seconds=None):
+    """
+    Mengecek apakah token sudah direvokasi (status 'dicabut' di qr_token)
+
+    Args:
+        token (str): Token yang dicek
+        max_cache_seconds (float): Batas lama hasil disimpan di cache
+
+    Returns:
+        bool: True jika token sudah direvokasi
+    """
+    cached = _revoked_cache.get(token)
+    if cached is not MISSING:
+        return cached
+
+    conn = connect_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(_SQL_TOKEN_REVOKED, (token,))
+        revoked = cur.fetchone() is not None
+    finally:
+        cur.close()
+        conn.close()
+
+    _remember_revoked(token, revoked, max_cache_seconds)
+    return revoked
+
+
+def _remember_revoked(token, revoked, max_cache_seconds):
+    # Revokasi dari proses lain terlihat paling lambat setelah TTL ini
+    ttl = TOKEN_CACHE_CONFIG['revocation_ttl']
+    if max_cache_seconds is not None:
+        ttl = min(ttl, max_cache_seconds)
+    _revoked_cache.set(token, revoked, ttl)
+
+
+# ========================================
+# ASYNC (ASGI)
+# ========================================
+# Varian async untuk asgi.py. Kontrak dan cache sama dengan fungsi
+# sinkron di atas; query lewat utils.async_db.
+
+async def insert_qr_token_async(token, expires_dt, issued_by=None, waktu_buat=None):
+    """
+    Versi async insert_qr_token
+
+    Args:
+        token (str): Token string
+        expires_dt (datetime): Waktu expired token
+        issued_by (str): Username guru yang membuat token (opsional)
+        waktu_buat (datetime): Waktu pembuatan (default sekarang, WIB)
+    """
+    waktu_buat_wib = waktu_buat or get_current_time_wib()
+    await get_async_db().execute(
+        _SQL_INSERT_TOKEN, (token, waktu_buat_wib, expires_dt, issued_by)
+    )
+    _token_cache.invalidate(token)
+
+
+async def verify_token_async(token):
+    """
+    Versi async verify_token (cache yang sama)
+
+    Args:
+        token (str): Token yang akan diverifikasi
+
+    Returns:
+        dict or None: Data token jika aktif, None jika tidak
+    """
+    cached = _token_cache.get(token)
+    if cached is not MISSING:
+        return dict(cached) if cached else None
+
+    result = await get_async_db().fetch_one(_SQL_VERIFY_TOKEN, (token,))
+    _remember_verified(token, result)
+    return result
+
+
+async def create_token_with_ttl_async(ttl_seconds=300, issued_by=None):
+    """
+    Versi async create_token_with_ttl
+
+    Returns:
+        tuple: (token, expires_at) - Token string dan waktu expired
+    """
+    token = generate_new_token()
+    waktu_sekarang = get_current_time_wib()
+    expires_at = waktu_sekarang + timedelta(seconds=ttl_seconds)
+    await insert_qr_token_async(token, expires_at, issued_by, waktu_buat=waktu_sekarang)
+    return token, expires_at
+
+
+async def create_signed_token_with_ttl_async(secret_key, ttl_seconds=300, issued_by=None):
+    """
+    Versi async create_signed_token_with_ttl
+
+    Returns:
+        tuple: (token, expires_at) - Token string dan waktu expired
+    """
+    token, waktu_sekarang, expires_at = _new_signed_token(secret_key, ttl_seconds, issued_by)
+    await insert_qr_token_async(token, expires_at, issued_by, waktu_buat=waktu_sekarang)
     return token, expires_at
+
+
+async def verify_signed_token_async(token, secret_key):
+    """
+    Versi async verify_signed_token
+
+    Returns:
+        dict or None: Data token atau None jika tidak valid / direvokasi
+    """
+    row = _decode_signed_token(token, secret_key)
+    if row is None:
+        return None
+    sisa_detik = row.pop('_sisa_detik')
+    if sisa_detik > 0 and await is_token_revoked_async(token, sisa_detik):
+        return None
+    return row
+
+
+async def is_token_revoked_async(token, max_cache_seconds=None):
+    """
+    Versi async is_token_revoked
+
+    Returns:
+        bool: True jika token sudah direvokasi
+    """
+    cached = _revoked_cache.get(token)
+    if cached is not MISSING:
+        return cached
+
+    revoked = await get_async_db().fetch_one(_SQL_TOKEN_REVOKED, (token,)) is not None
+    _remember_revoked(token, revoked, max_cache_seconds)
+    return revoked
+
+
+# ========================================
+# EXPIRY SWEEPER & PURGE
+# ========================================
+
+def _update_in_batch(sql_select, select_params, sql_apply):
+    """
+    Ambil satu batch id lalu terapkan UPDATE/DELETE pada id tersebut.
+    Dua statement pendek agar lock baris singkat dan portable
+    (MySQL & SQLite tidak sama-sama mendukung UPDATE ... LIMIT).
+
+    Returns:
+        int: Jumlah baris yang terpengaruh
+    """
+    conn = connect_db()
+    cur = conn.cursor()
+    try:
+        cur.execute(sql_select, select_params)
+        ids = [row[0] for row in cur.fetchall()]
+        if not ids:
+            return 0
+        placeholders = ', '.join(['%s'] * len(ids))
+        cur.execute(sql_apply.format(ids=placeholders), ids)
+        conn.commit()
+        return cur.rowcount
+    finally:
+        cur.close()
+        conn.close()
+
+
+def expire_stale_tokens(batch_size=500):
+    """
+    Menandai satu batch token aktif yang sudah lewat waktu_expired
+
+    Args:
+        batch_size (int): Jumlah token maksimum per batch
+
+    Returns:
+        int: Jumlah token yang ditandai expired
+    """
+    now = get_current_time_wib()
+    return _update_in_batch(
+        """SELECT id FROM qr_token
+           WHERE status='aktif' AND waktu_expired < %s
+           ORDER BY id LIMIT %s""",
+        (now, batch_size),
+        "UPDATE qr_token SET status='expired' WHERE id IN ({ids})"
+    )
+
+
+def purge_old_tokens(retention_days=30, batch_size=500):
+    """
+    Menghapus satu batch token yang expired lebih lama dari retensi
+
+    Args:
+        retention_days (int): Lama token disimpan setelah expired (hari)
+        batch_size (int): Jumlah token maksimum per batch
+
+    Returns:
+        int: Jumlah token yang dihapus
+    """
+    batas = get_current_time_wib() - timedelta(days=retention_days)
+    return _update_in_batch(
+        """SELECT id FROM qr_token
+           WHERE waktu_expired < %s
+           ORDER BY id LIMIT %s""",
+        (batas, batch_size),
+        "DELETE FROM qr_token WHERE id IN ({ids})"
+    )
+
+
+def sweep_qr_tokens(batch_size=500, max_batches=20, retention_days=30, pause=0.05):
+    """
+    Satu putaran sweeper: tandai token expired lalu purge token lama.
+    Berjalan dalam batch kecil dengan jeda agar tidak menahan lock
+    qr_token lama di jam pelajaran; sisa pekerjaan dilanjutkan putaran
+    berikutnya.
+
+    Args:
+        batch_size (int): Baris per batch
+        max_batches (int): Batch maksimum per tahap per putaran
+        retention_days (int): Retensi token expired (hari)
+        pause (float): Jeda antar batch dalam detik
+
+    Returns:
+        dict: Progres putaran (expired, purged, batches, selesai)
+    """
+    progress = {'expired': 0, 'purged': 0, 'batches': 0, 'complete': True}
+
+    for key, step in (
+        ('expired', lambda: expire_stale_tokens(batch_size)),
+        ('purged', lambda: purge_old_tokens(retention_days, batch_size))
+    ):
+        for _ in range(max_batches):
+            count = step()
+            progress['batches'] += 1
+            progress[key] += count
+            if count < batch_size:
+                break
+            time.sleep(pause)
+        else:
+            progress['complete'] = False
+
+    if progress['expired'] or progress['purged']:
+        sweeper_logger.info(
+            "qr_token sweep: expired=%d purged=%d batches=%d complete=%s",
+            progress['expired'], progress['purged'],
+            progress['batches'], progress['complete']
+        )
+    return progress
@@ -0,0 +1,324 @@
+# load_test.py
+"""
+Load test: simulasi scan pagi satu sekolah
+
+Menjalankan aplikasi di server lokal (werkzeug, thread) dengan database
+SQLite, membuat N guru dan M siswa, login semuanya, guru membuat token
+lewat /guru/generate_token, lalu siswa menembakkan scan ke
+/siswa/scan_token dalam satu burst, termasuk scan ulang per frame seperti
+loop jsQR di halaman siswa.
+
+Laporan: latency p50/p95/p99, error rate, dan jumlah query database
+(header X-DB-Query-Count) per jenis request.
+
+Contoh:
+    python testing/load_test.py --gurus 10 --students 1000 --concurrency 100
+"""
+
+import argparse
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    """Login membalas redirect ke dashboard; tidak perlu diikuti"""
+
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+
+class Client:
+    """Satu pengguna (guru/siswa) dengan cookie session sendiri"""
+
+    def __init__(self, base_url, recorder):
+        self.base_url = base_url
+        self.recorder = recorder
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(CookieJar()), _NoRedirect()
+        )
+
+    def request(self, kind, method, path, form=None, payload=None):
+        """
+        Kirim request dan catat latency, status, dan query DB
+
+        Returns:
+            dict or None: Body JSON (None jika bukan JSON)
+        """
+        headers = {}
+        data = None
+        if form is not None:
+            data = urllib.parse.urlencode(form).encode()
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif payload is not None:
+            data = json.dumps(payload).encode()
+            headers['Content-Type'] = 'application/json'
+        req = urllib.request.Request(self.base_url + path, data=data,
+                                     headers=headers, method=method)
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=30) as resp:
+                status, resp_headers, body = resp.status, resp.headers, resp.read()
+        except urllib.error.HTTPError as err:
+            status, resp_headers, body = err.code, err.headers, err.read()
+        except OSError as err:
+            self.recorder.record(kind, start, time.perf_counter(), 0, None, str(err))
+            return None
+        end = time.perf_counter()
+
+        try:
+            result = json.loads(body)
+        except ValueError:
+            result = None
+        queries = resp_headers.get('X-DB-Query-Count')
+        self.recorder.record(
+            kind, start, end, status, int(queries) if queries else None,
+            result.get('status') if isinstance(result, dict) else None
+        )
+        return result
+
+
+class Recorder:
+    """Kumpulan hasil request per jenis (thread-safe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)  # kind -> [(detik, status, query, hasil)]
+        self.windows = {}  # kind -> [mulai pertama, selesai terakhir]
+
+    def record(self, kind, start, end, status, queries, outcome):
+        with self._lock:
+            self.samples[kind].append((end - start, status, queries, outcome))
+            window = self.windows.setdefault(kind, [start, end])
+            window[0] = min(window[0], start)
+            window[1] = max(window[1], end)
+
+    def report(self):
+        """
+        Ringkasan per jenis request
+
+        Returns:
+            dict: {kind: {count, p50_ms, p95_ms, p99_ms, errors, ...}}
+        """
+        summary = {}
+        for kind, samples in sorted(self.samples.items()):
+            latencies = sorted(s[0] * 1000 for s in samples)
+            queries = [s[2] for s in samples if s[2] is not None]
+            errors = sum(1 for s in samples if s[1] == 0 or s[1] >= 500)
+            window = self.windows[kind][1] - self.windows[kind][0]
+            outcomes = defaultdict(int)
+            for sample in samples:
+                outcomes[f"{sample[1]} {sample[3] or ''}".strip()] += 1
+            summary[kind] = {
+                'count': len(samples),
+                'p50_ms': round(_percentile(latencies, 50), 2),
+                'p95_ms': round(_percentile(latencies, 95), 2),
+                'p99_ms': round(_percentile(latencies, 99), 2),
+                'max_ms': round(latencies[-1], 2),
+                'error_rate': round(errors / len(samples), 4),
+                'throughput_rps': round(len(samples) / window, 1) if window else None,
+                'db_queries': sum(queries),
+                'db_queries_per_request': (
+                    round(sum(queries) / len(queries), 2) if queries else None
+                ),
+                'outcomes': dict(outcomes)
+            }
+        return summary
+
+
+def _percentile(sorted_values, pct):
+    """Percentile nearest-rank"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def seed(gurus, students, classes):
+    """Isi tabel guru dan siswa langsung lewat database (bulk)"""
+    from utils.db import open_connection  # pylint: disable=import-outside-toplevel
+
+    conn = open_connection()
+    cur = conn.cursor()
+    cur.executemany(
+        "INSERT INTO guru (username, password, nama_guru) VALUES (%s, %s, %s)",
+        [(f'guru{i}', 'pw', f'Guru {i}') for i in range(gurus)]
+    )
+    cur.executemany(
+        "INSERT INTO siswa (username, password, nis, nama_siswa, jurusan, kelas) "
+        "VALUES (%s, %s, %s, %s, %s, %s)",
+        [(f'siswa{i}', 'pw', f'{i:06d}', f'Siswa {i}', 'RPL', f'K{i % classes}')
+         for i in range(students)]
+    )
+    conn.commit()
+    conn.close()
+
+
+def count_absensi():
+    """Jumlah baris absensi setelah burst (harus sama dengan jumlah siswa)"""
+    from utils.db import open_connection  # pylint: disable=import-outside-toplevel
+
+    conn = open_connection()
+    cur = conn.cursor()
+    cur.execute("SELECT COUNT(*) FROM absensi")
+    total = cur.fetchone()[0]
+    conn.close()
+    return total
+
+
+def run(args):
+    """Jalankan skenario load test, kembalikan laporan (dict)"""
+    # Konfigurasi dibaca saat import: set environment sebelum import aplikasi
+    os.environ['DB_BACKEND'] = 'sqlite'
+    os.environ['SQLITE_PATH'] = args.db
+    os.environ['SCHEDULER_ENABLED'] = '0'
+    os.environ['SCAN_INGEST_MODE'] = args.ingest_mode
+    os.environ['SIGNED_TOKENS'] = '1' if args.signed else '0'
+    if args.no_admission:
+        os.environ['ADMISSION_CONTROL_ENABLED'] = '0'
+
+    from werkzeug.serving import make_server  # pylint: disable=import-outside-toplevel
+    from app import app as flask_app, start_background  # pylint: disable=import-outside-toplevel
+
+    logging.getLogger('werkzeug').setLevel(logging.WARNING)
+
+    seed(args.gurus, args.students, max(args.gurus, 1))
+    start_background(flask_app)
+    server = make_server('127.0.0.1', 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    recorder = Recorder()
+
+    try:
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            gurus = [Client(base_url, recorder) for _ in range(args.gurus)]
+            siswa = [Client(base_url, recorder) for _ in range(args.students)]
+            list(pool.map(
+                lambda pair: pair[1].request('login_guru', 'POST', '/login_guru',
+                                             form={'username': f'guru{pair[0]}', 'password': 'pw'}),
+                enumerate(gurus)
+            ))
+            list(pool.map(
+                lambda pair: pair[1].request(
+                    'login_siswa', 'POST', '/login_siswa',
+                    form={'username': f'siswa{pair[0]}', 'password': 'pw'}
+                ),
+                enumerate(siswa)
+            ))
+
+            # Setiap guru menampilkan satu QR untuk kelasnya
+            tokens = [
+                (client.request('generate_token', 'POST', '/guru/generate_token')
+                 or {}).get('token')
+                for client in gurus
+            ]
+
+            def student_burst(index):
+                # Siswa datang tersebar dalam jendela ramp, lalu kamera
+                # mengirim scan di setiap frame selama QR terlihat
+                time.sleep(random.uniform(0, args.ramp))
+                token = tokens[index % len(tokens)]
+                siswa[index].request('scan_first', 'POST', '/siswa/scan_token',
+                                     payload={'token': token})
+                for _ in range(args.dup_frames):
+                    time.sleep(args.frame_interval)
+                    siswa[index].request('scan_repeat', 'POST', '/siswa/scan_token',
+                                         payload={'token': token})
+
+            start = time.perf_counter()
+            list(pool.map(student_burst, range(args.students)))
+            wall = time.perf_counter() - start
+
+        ingest = flask_app.extensions.get('scan_ingest')
+        if ingest is not None:
+            ingest.stop()
+        metrics = gurus[0].request('metrics', 'GET', '/api/metrics') if gurus else None
+    finally:
+        server.shutdown()
+
+    return {
+        'config': vars(args),
+        'burst_seconds': round(wall, 2),
+        'absensi_rows': count_absensi(),
+        'requests': recorder.report(),
+        'metrics': (metrics or {}).get('data', {})
+    }
+
+
+def print_report(report):
+    """Cetak laporan dalam bentuk tabel"""
+    print(f"\nBurst selesai dalam {report['burst_seconds']} detik, "
+          f"absensi tercatat: {report['absensi_rows']}\n")
+    header = f"{'request':<16}{'count':>7}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}" \
+             f"{'err %':>8}{'req/s':>9}{'q/req':>7}"
+    print(header)
+    print('-' * len(header))
+    for kind, row in report['requests'].items():
+        q_per_req = row['db_queries_per_request']
+        print(f"{kind:<16}{row['count']:>7}{row['p50_ms']:>9}{row['p95_ms']:>9}"
+              f"{row['p99_ms']:>9}{row['error_rate'] * 100:>8.2f}{row['throughput_rps'] or '-':>9}"
+              f"{'-' if q_per_req is None else q_per_req:>7}")
+    print()
+    for kind, row in report['requests'].items():
+        print(f"{kind}: {row['outcomes']}")
+    for section in ('admission', 'scan_coalescer', 'db_pool', 'token_cache', 'roster_cache'):
+        if section in report['metrics']:
+            print(f"{section}: {report['metrics'][section]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n', 1)[0])
+    parser.add_argument('--gurus', type=int, default=5)
+    parser.add_argument('--students', type=int, default=300)
+    parser.add_argument('--concurrency', type=int, default=50,
+                        help='jumlah client yang berjalan bersamaan')
+    parser.add_argument('--dup-frames', type=int, default=5,
+                        help='scan ulang per siswa (frame jsQR berikutnya)')
+    parser.add_argument('--frame-interval', type=float, default=0.033,
+                        help='jeda antar frame dalam detik')
+    parser.add_argument('--ramp', type=float, default=2.0,
+                        help='jendela kedatangan siswa dalam detik')
+    parser.add_argument('--ingest-mode', choices=('direct', 'queue', 'journal'),
+                        default='direct')
+    parser.add_argument('--signed', action='store_true', help='pakai token bertanda tangan')
+    parser.add_argument('--no-admission', action='store_true',
+                        help='matikan admission control')
+    parser.add_argument('--db', default=None,
+                        help='file SQLite (default file sementara)')
+    parser.add_argument('--json', action='store_true', help='cetak laporan sebagai JSON')
+    args = parser.parse_args()
+
+    tmpdir = None
+    if args.db is None:
+        tmpdir = tempfile.TemporaryDirectory()
+        args.db = os.path.join(tmpdir.name, 'load_test.sqlite3')
+    try:
+        # Output startup aplikasi (migrasi, warning) jangan mengotori JSON
+        with contextlib.redirect_stdout(sys.stderr if args.json else sys.stdout):
+            report = run(args)
+    finally:
+        if tmpdir is not None:
+            tmpdir.cleanup()
+
+    if args.json:
+        print(json.dumps(report, indent=2, default=str))
+    else:
+        print_report(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+# test_admission.py
+"""
+Unit test untuk admission control (utils/admission.py)
+"""
+
+import os
+import sys
+import threading
+import unittest
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import admission
+from utils.admission import AdmissionLimiter, admission_controlled
+
+
+class TestAdmissionLimiter(unittest.TestCase):
+    """Test slot, antrian, dan penolakan"""
+
+    def test_rejects_when_queue_full(self):
+        """Antrian penuh langsung ditolak"""
+        limiter = AdmissionLimiter('t', max_concurrent=1, max_queue=0)
+        self.assertTrue(limiter.acquire())
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.stats()['rejected_queue_full'], 1)
+        limiter.release()
+        self.assertTrue(limiter.acquire())
+
+    def test_waiter_times_out(self):
+        """Request menunggu ditolak setelah queue_timeout"""
+        limiter = AdmissionLimiter('t', max_concurrent=1, max_queue=1, queue_timeout=0.02)
+        limiter.acquire()
+        self.assertFalse(limiter.acquire())
+        self.assertEqual(limiter.stats()['rejected_timeout'], 1)
+        self.assertEqual(limiter.stats()['queue_depth'], 0)
+
+    def test_waiter_admitted_after_release(self):
+        """Request menunggu mendapat slot saat slot dilepas"""
+        limiter = AdmissionLimiter('t', max_concurrent=1, max_queue=1, queue_timeout=2)
+        limiter.acquire()
+        result = []
+        waiter = threading.Thread(target=lambda: result.append(limiter.acquire()))
+        waiter.start()
+        limiter.release()
+        waiter.join()
+        self.assertEqual(result, [True])
+
+
+class TestAdmissionDecorator(unittest.TestCase):
+    """Test respons 503 + Retry-After"""
+
+    def test_overload_returns_503(self):
+        """Route yang penuh membalas 503 dengan Retry-After"""
+        app = Flask(__name__)
+        app.config['ADMISSION_LIMITS'] = {
+            'scan': {'max_concurrent': 1, 'max_queue': 0}
+        }
+        limiters = admission.init_app(app)
+
+        @app.route('/scan')
+        @admission_controlled('scan')
+        def scan():
+            return 'ok'
+
+        client = app.test_client()
+        self.assertEqual(client.get('/scan').status_code, 200)
+
+        limiters['scan'].acquire()
+        response = client.get('/scan')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,187 @@
+# test_api_absensi.py
+"""
+Integration test /api/absensi (polling delta, ETag/304, absensi manual)
+di SQLite in-memory
+"""
+
+import os
+import sys
+import unittest
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+from routes.api_absensi import api_absensi_bp
+from services import absensi_service, siswa_service
+from test_sqlite_backend import SQLiteTestCase
+from utils import db
+
+
+class ApiAbsensiTestCase(SQLiteTestCase):
+    """Base class: app dengan blueprint api_absensi dan tiga siswa kelas 10A"""
+
+    def setUp(self):
+        super().setUp()
+        app = Flask(__name__)
+        app.config.from_object(Config)
+        db.init_app(app)
+        app.register_blueprint(api_absensi_bp)
+        self.app = app
+        self.client = app.test_client()
+        self.siswa = [
+            siswa_service.create_siswa(f'poll{i}', 'pw', f'p{i}', f'Poll {i}', 'RPL', '10A')
+            for i in range(3)
+        ]
+
+    def scan(self, id_siswa):
+        absensi_service.insert_absen_by_id(id_siswa, 'tok')
+
+
+class TestAbsensiPolling(ApiAbsensiTestCase):
+    """since hanya mengirim baris baru; ETag sama dijawab 304"""
+
+    def test_since_and_not_modified(self):
+        self.scan(self.siswa[0])
+        first = self.client.get('/api/absensi')
+        body = first.get_json()
+        self.assertEqual(len(body['data']), 1)
+        since = body['since']
+
+        # ETag memuat parameter query: ETag halaman pertama tidak berlaku
+        # untuk polling since
+        response = self.client.get(f'/api/absensi?since={since}',
+                                   headers={'If-None-Match': first.headers['ETag']})
+        self.assertEqual((response.status_code, response.get_json()['data']), (200, []))
+        etag = response.headers['ETag']
+
+        # Belum ada absensi baru: 304 tanpa body
+        response = self.client.get(f'/api/absensi?since={since}',
+                                   headers={'If-None-Match': etag})
+        self.assertEqual((response.status_code, response.data), (304, b''))
+
+        self.scan(self.siswa[1])
+        self.scan(self.siswa[2])
+        response = self.client.get(f'/api/absensi?since={since}&limit=1',
+                                   headers={'If-None-Match': etag})
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual([r['id_siswa'] for r in body['data']], [self.siswa[1]])
+        self.assertTrue(body['has_more'])
+
+        response = self.client.get(f"/api/absensi?since={body['since']}")
+        body = response.get_json()
+        self.assertEqual([r['id_siswa'] for r in body['data']], [self.siswa[2]])
+        self.assertFalse(body['has_more'])
+
+    def test_since_with_filter_after_update(self):
+        """Absensi yang diubah guru ikut terkirim ke polling berfilter"""
+        self.scan(self.siswa[0])
+        self.scan(self.siswa[1])
+        first = self.client.get('/api/absensi?status=izin')
+        self.assertEqual(first.get_json()['data'], [])
+        since, etag = first.get_json()['since'], first.headers['ETag']
+
+        # ETag memuat parameter query: filter lain tidak dijawab 304
+        other = self.client.get('/api/absensi?status=hadir', headers={'If-None-Match': etag})
+        self.assertEqual(other.status_code, 200)
+        self.assertEqual(len(other.get_json()['data']), 2)
+
+        absensi_service.upsert_absen_manual([(self.siswa[0], 'izin')])
+        response = self.client.get(f'/api/absensi?since={since}&status=izin',
+                                   headers={'If-None-Match': etag})
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([(r['id_siswa'], r['status']) for r in body['data']],
+                         [(self.siswa[0], 'izin')])
+        self.assertGreater(body['since'], since)
+
+        # Watermark baru: tidak ada perubahan lagi
+        query = f"/api/absensi?since={body['since']}&status=izin"
+        etag = self.client.get(query).headers['ETag']
+        self.assertEqual(self.client.get(query, headers={'If-None-Match': etag}).status_code, 304)
+
+    def test_invalid_params(self):
+        for query in ('since=-1', 'since=abc', 'status=libur', 'tanggal=18-10-2026'):
+            self.assertEqual(self.client.get(f'/api/absensi?{query}').status_code, 400, query)
+
+    def test_rekap(self):
+        """Rekap hari ini dari absensi_harian; rentang terbalik ditolak"""
+        self.scan(self.siswa[0])
+        self.scan(self.siswa[1])
+        body = self.client.get('/api/absensi/rekap?kelas=10A').get_json()
+        self.assertEqual(len(body['data']), 1)
+        self.assertEqual((body['data'][0]['hadir'], body['data'][0]['jumlah_siswa']), (2, 3))
+
+        response = self.client.get(
+            '/api/absensi/rekap?tanggal_mulai=2026-10-10&tanggal_selesai=2026-10-01'
+        )
+        self.assertEqual(response.status_code, 400)
+
+
+
+class TestAbsensiManual(ApiAbsensiTestCase):
+    """POST /api/absensi/manual: sesi guru, validasi, dan watermark"""
+
+    def login(self):
+        with self.client.session_transaction() as sess:
+            sess['guru'] = 'guru1'
+
+    def post_manual(self, body):
+        return self.client.post('/api/absensi/manual', json=body)
+
+    def test_requires_guru_session(self):
+        response = self.post_manual({'entries': [{'id_siswa': self.siswa[0], 'status': 'izin'}]})
+        self.assertEqual(response.status_code, 401)
+
+    def test_invalid_body(self):
+        self.login()
+        bodies = [
+            {},
+            {'entries': []},
+            {'entries': ['izin']},
+            {'entries': [{'id_siswa': str(self.siswa[0]), 'status': 'izin'}]},
+            {'entries': [{'id_siswa': True, 'status': 'izin'}]},
+            {'entries': [{'id_siswa': self.siswa[0], 'status': 'libur'}]},
+            {'entries': [{'id_siswa': self.siswa[0], 'status': 'izin'}], 'tanggal': '18-10-2026'}
+        ]
+        for body in bodies:
+            self.assertEqual(self.post_manual(body).status_code, 400, body)
+        self.assertEqual(absensi_service.get_all_absensi(), [])
+
+    def test_too_many_entries(self):
+        self.login()
+        self.app.config['MANUAL_ABSEN_MAX_ENTRIES'] = 2
+        entries = [{'id_siswa': id_siswa, 'status': 'alpa'} for id_siswa in self.siswa]
+        self.assertEqual(self.post_manual({'entries': entries}).status_code, 413)
+
+    def test_upsert_moves_watermark(self):
+        """Absensi manual memajukan since dan mengganti ETag polling"""
+        self.login()
+        self.scan(self.siswa[0])
+        since = self.client.get('/api/absensi').get_json()['since']
+        query = f'/api/absensi?since={since}'
+        etag = self.client.get(query).headers['ETag']
+
+        response = self.post_manual({
+            'kelas': '10A',
+            'entries': [{'id_siswa': self.siswa[0], 'status': 'sakit'},
+                        {'id_siswa': self.siswa[1], 'status': 'izin'},
+                        {'id_siswa': 999, 'status': 'alpa'}]
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['data'], {'written': 2, 'not_found': [999]})
+
+        response = self.client.get(query, headers={'If-None-Match': etag})
+        body = response.get_json()
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+        self.assertEqual(sorted((r['id_siswa'], r['status']) for r in body['data']),
+                         [(self.siswa[0], 'sakit'), (self.siswa[1], 'izin')])
+        self.assertGreater(body['since'], since)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,185 @@
+# test_asgi.py
+"""
+Integration test entry point ASGI (route async native + bridge WSGI)
+di SQLite in-memory, memakai driver async pengganti (thread executor)
+"""
+
+import asyncio
+import json
+import os
+import sys
+import unittest
+
+from flask import Flask, Response, jsonify
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+from routes.asgi_routes import ASYNC_ROUTES
+from routes.guru import guru_bp
+from routes.siswa import siswa_bp
+from services import absensi_service, siswa_service, token_service
+from test_sqlite_backend import SQLiteTestCase
+from utils import db
+from utils.asgi import AsgiApp
+from utils.async_db import configure_async_db
+from utils.coalesce import RequestCoalescer
+from utils.event_hub import get_event_hub
+
+
+class TestAsgi(SQLiteTestCase):
+    """Scan/generate async dan route Flask lewat bridge"""
+
+    def setUp(self):
+        super().setUp()
+        flask_app = Flask(__name__)
+        flask_app.config.from_object(Config)
+        flask_app.extensions['scan_coalescer'] = RequestCoalescer(window=5)
+        db.init_app(flask_app)
+        flask_app.register_blueprint(siswa_bp)
+        flask_app.register_blueprint(guru_bp)
+
+        @flask_app.route('/ping')
+        def ping():
+            return jsonify({'pong': True})
+
+        @flask_app.route('/stream')
+        def stream():
+            return Response((part for part in (b'a', b'b', b'c')), mimetype='text/plain')
+
+        self.flask_app = flask_app
+        self.async_db = configure_async_db(executor_threads=4)
+        self.app = AsgiApp(flask_app, ASYNC_ROUTES, wsgi_threads=2)
+
+    def tearDown(self):
+        self.app.executor.shutdown()
+        asyncio.run(self.async_db.close())
+        super().tearDown()
+
+    def cookie(self, **session):
+        serializer = self.flask_app.session_interface.get_signing_serializer(self.flask_app)
+        return f"session={serializer.dumps(session)}"
+
+    async def request(self, method, path, payload=None, cookie=''):
+        body = json.dumps(payload).encode() if payload is not None else b''
+        scope = {
+            'type': 'http', 'method': method, 'path': path, 'query_string': b'',
+            'headers': [(b'cookie', cookie.encode()), (b'content-type', b'application/json')]
+        }
+        messages = [{'type': 'http.request', 'body': body, 'more_body': False}]
+        sent = []
+
+        async def receive():
+            return messages.pop(0)
+
+        async def send(message):
+            sent.append(message)
+
+        await self.app(scope, receive, send)
+        body = b''.join(m.get('body', b'') for m in sent if m['type'] == 'http.response.body')
+        return sent[0]['status'], body
+
+    def test_scan_async(self):
+        """Scan async mencatat absensi, ulangan dijawab dari coalescer"""
+        id_siswa = siswa_service.create_siswa('kiki', 'pw', '011', 'Kiki', 'RPL', '10A')
+        token, _ = token_service.create_token_with_ttl(300)
+        cookie = self.cookie(id_siswa=id_siswa)
+
+        async def scenario():
+            first = await self.request('POST', '/siswa/scan_token', {'token': token}, cookie)
+            second = await self.request('POST', '/siswa/scan_token', {'token': token}, cookie)
+            anonymous = await self.request('POST', '/siswa/scan_token', {'token': token})
+            return first, second, anonymous
+
+        first, second, anonymous = asyncio.run(scenario())
+        self.assertEqual(first[0], 200)
+        self.assertEqual(json.loads(first[1])['status'], 'success')
+        self.assertEqual(second, first)
+        self.assertEqual(anonymous[0], 401)
+        self.assertEqual(len(absensi_service.get_all_absensi()), 1)
+
+    def test_concurrent_scans(self):
+        """Ratusan scan bersamaan dari siswa berbeda semuanya tercatat"""
+        ids = [siswa_service.create_siswa(f's{i}', 'pw', f'n{i}', f'S{i}', 'RPL', '10A')
+               for i in range(200)]
+        token, _ = token_service.create_token_with_ttl(300)
+
+        async def scenario():
+            return await asyncio.gather(*[
+                self.request('POST', '/siswa/scan_token', {'token': token},
+                             self.cookie(id_siswa=id_siswa))
+                for id_siswa in ids
+            ])
+
+        results = asyncio.run(scenario())
+        self.assertTrue(all(json.loads(body)['status'] == 'success' for _, body in results))
+        self.assertEqual(len(absensi_service.get_all_absensi()), 200)
+
+    def test_generate_token_async(self):
+        """Generate token async hanya untuk guru, token langsung valid"""
+        status, _ = asyncio.run(self.request('POST', '/guru/generate_token'))
+        self.assertEqual(status, 401)
+
+        cookie = self.cookie(guru='budi', role='guru')
+        status, body = asyncio.run(self.request('POST', '/guru/generate_token', cookie=cookie))
+        data = json.loads(body)
+        self.assertEqual(status, 200)
+        self.assertTrue(data['qr_url'].startswith('/guru/qr/'))
+        self.assertTrue(data['qr_data_uri'].startswith('data:image/png;base64,'))
+        self.assertEqual(token_service.verify_token(data['token'])['issued_by'], 'budi')
+
+    def test_absensi_stream(self):
+        """Live feed SSE menerima scan dari token guru, dilepas saat client putus"""
+        id_siswa = siswa_service.create_siswa('lia', 'pw', '012', 'Lia', 'RPL', '10A')
+        token, _ = token_service.create_token_with_ttl(300, 'budi')
+        hub = get_event_hub()
+
+        async def scenario():
+            disconnected = asyncio.Event()
+            messages = [{'type': 'http.request', 'body': b'', 'more_body': False}]
+            sent = []
+
+            async def receive():
+                if messages:
+                    return messages.pop(0)
+                await disconnected.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                sent.append(message)
+
+            scope = {
+                'type': 'http', 'method': 'GET', 'path': '/guru/absensi_stream',
+                'query_string': b'',
+                'headers': [(b'cookie', self.cookie(guru='budi', role='guru').encode())]
+            }
+            stream = asyncio.ensure_future(self.app(scope, receive, send))
+            while not hub.has_subscribers('budi'):
+                await asyncio.sleep(0.01)
+            await self.request('POST', '/siswa/scan_token', {'token': token},
+                               self.cookie(id_siswa=id_siswa))
+            while not any(b'event: absensi' in m.get('body', b'') for m in sent):
+                await asyncio.sleep(0.01)
+            disconnected.set()
+            await asyncio.wait_for(stream, 5)
+            return sent
+
+        sent = asyncio.run(asyncio.wait_for(scenario(), 10))
+        headers = dict(sent[0]['headers'])
+        self.assertEqual((sent[0]['status'], headers[b'content-type']), (200, b'text/event-stream'))
+        body = b''.join(m.get('body', b'') for m in sent[1:])
+        self.assertIn(b'"nama_siswa": "Lia"', body)
+        self.assertFalse(hub.has_subscribers('budi'))
+
+        status, _ = asyncio.run(self.request('GET', '/guru/absensi_stream'))
+        self.assertEqual(status, 401)
+
+    def test_wsgi_bridge(self):
+        """Route lain dijalankan Flask, termasuk response streaming"""
+        self.assertEqual(asyncio.run(self.request('GET', '/ping')),
+                         (200, b'{"pong":true}\n'))
+        self.assertEqual(asyncio.run(self.request('GET', '/stream')), (200, b'abc'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
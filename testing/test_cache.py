@@ -0,0 +1,55 @@
+# test_cache.py
+"""
+Unit test untuk TTLCache di utils/cache.py
+"""
+
+import os
+import sys
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.cache import MISSING, TTLCache
+
+
+class TestTTLCache(unittest.TestCase):
+    """Test TTL, LRU, dan negative caching"""
+
+    def test_hit_and_expiry(self):
+        """Entri tersedia sampai TTL habis"""
+        cache = TTLCache(maxsize=4)
+        cache.set('a', 1, ttl=0.05)
+        self.assertEqual(cache.get('a'), 1)
+        time.sleep(0.06)
+        self.assertIs(cache.get('a'), MISSING)
+        self.assertEqual(cache.stats()['hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 1)
+
+    def test_none_value_is_cached(self):
+        """None disimpan sebagai negative cache"""
+        cache = TTLCache()
+        cache.set('x', None)
+        self.assertIsNone(cache.get('x'))
+
+    def test_lru_eviction(self):
+        """Entri paling lama tidak dipakai dibuang saat penuh"""
+        cache = TTLCache(maxsize=2)
+        cache.set('a', 1)
+        cache.set('b', 2)
+        cache.get('a')
+        cache.set('c', 3)
+        self.assertIs(cache.get('b'), MISSING)
+        self.assertEqual(cache.get('a'), 1)
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+    def test_invalidate(self):
+        """invalidate() menghapus entri"""
+        cache = TTLCache()
+        cache.set('a', 1)
+        cache.invalidate('a')
+        self.assertIs(cache.get('a'), MISSING)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
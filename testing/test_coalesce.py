@@ -0,0 +1,81 @@
+# test_coalesce.py
+"""
+Unit test untuk coalescing request identik (utils/coalesce.py)
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.coalesce import RequestCoalescer
+
+
+class TestRequestCoalescer(unittest.TestCase):
+    """Test single-flight dan dedupe jendela pendek"""
+
+    def test_repeat_answered_from_memory(self):
+        """Ulangan dalam jendela tidak menjalankan fungsi lagi"""
+        coalescer = RequestCoalescer(window=5)
+        calls = []
+
+        def work():
+            calls.append(1)
+            return 'ok'
+
+        self.assertEqual(coalescer.run('k', work), 'ok')
+        self.assertEqual(coalescer.run('k', work), 'ok')
+        self.assertEqual(len(calls), 1)
+        self.assertEqual(coalescer.stats()['replayed'], 1)
+
+    def test_concurrent_duplicates_share_result(self):
+        """Duplikat in-flight menunggu hasil eksekusi pertama"""
+        coalescer = RequestCoalescer(window=5)
+        started = threading.Event()
+        calls = []
+
+        def slow():
+            calls.append(1)
+            started.set()
+            time.sleep(0.05)
+            return 'hasil'
+
+        results = []
+        leader = threading.Thread(target=lambda: results.append(coalescer.run('k', slow)))
+        leader.start()
+        started.wait()
+        results.append(coalescer.run('k', slow))
+        leader.join()
+        self.assertEqual(results, ['hasil', 'hasil'])
+        self.assertEqual(len(calls), 1)
+
+    def test_uncacheable_result_not_replayed(self):
+        """Hasil yang ditolak predikat cacheable dieksekusi ulang"""
+        coalescer = RequestCoalescer(window=5)
+        calls = []
+
+        def busy():
+            calls.append(1)
+            return 503
+
+        coalescer.run('k', busy, cacheable=lambda status: status != 503)
+        coalescer.run('k', busy, cacheable=lambda status: status != 503)
+        self.assertEqual(len(calls), 2)
+
+    def test_error_not_cached(self):
+        """Exception diteruskan dan tidak disimpan"""
+        coalescer = RequestCoalescer(window=5)
+
+        def fail():
+            raise RuntimeError('db down')
+
+        with self.assertRaises(RuntimeError):
+            coalescer.run('k', fail)
+        self.assertEqual(coalescer.run('k', lambda: 'ok'), 'ok')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
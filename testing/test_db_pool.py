@@ -0,0 +1,167 @@
+# test_db_pool.py
+"""
+Unit test untuk ConnectionPool dan koneksi request-scoped di utils/db.py
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import db
+from utils.db import ConnectionPool, PoolTimeoutError
+
+
+def make_pool(**kwargs):
+    """Pool dengan koneksi palsu"""
+    def connect():
+        conn = Mock()
+        conn.is_connected.return_value = True
+        return conn
+    options = {'pool_size': 2, 'max_overflow': 1, 'pool_timeout': 0.05}
+    options.update(kwargs)
+    return ConnectionPool(connect, **options)
+
+
+class TestConnectionPool(unittest.TestCase):
+    """Test checkout, reuse, overflow, dan health check"""
+
+    def test_connection_reused_after_close(self):
+        """Koneksi yang di-close dipakai ulang, bukan dibuat baru"""
+        pool = make_pool()
+        conn = pool.acquire()
+        raw = conn._raw
+        conn.close()
+
+        again = pool.acquire()
+        self.assertIs(again._raw, raw)
+        self.assertEqual(pool.stats()['created'], 1)
+        self.assertEqual(pool.stats()['reused'], 1)
+
+    def test_double_close_is_safe(self):
+        """close() dua kali tidak menggandakan koneksi idle"""
+        pool = make_pool()
+        conn = pool.acquire()
+        conn.close()
+        conn.close()
+        self.assertEqual(pool.stats()['idle'], 1)
+
+    def test_overflow_then_timeout(self):
+        """Pool penuh (size + overflow) menghasilkan PoolTimeoutError"""
+        pool = make_pool()
+        held = [pool.acquire() for _ in range(3)]
+        with self.assertRaises(PoolTimeoutError):
+            pool.acquire()
+        self.assertEqual(pool.stats()['timeouts'], 1)
+
+        # Koneksi overflow ditutup saat dikembalikan
+        for conn in held:
+            conn.close()
+        self.assertEqual(pool.stats()['idle'], 2)
+        self.assertEqual(pool.stats()['total'], 2)
+
+    def test_dead_connection_recycled(self):
+        """Koneksi yang gagal health check dibuang saat checkout"""
+        pool = make_pool()
+        conn = pool.acquire()
+        conn._raw.is_connected.return_value = False
+        conn.close()
+
+        fresh = pool.acquire()
+        self.assertEqual(pool.stats()['recycled_dead'], 1)
+        self.assertEqual(pool.stats()['created'], 2)
+        fresh.close()
+
+    def test_slow_ping_does_not_block_pool(self):
+        """Health check berjalan di luar lock: stats/release tetap jalan"""
+        pool = make_pool()
+        slow = pool.acquire()
+        other = pool.acquire()
+        pinging = threading.Event()
+
+        def slow_ping():
+            pinging.set()
+            time.sleep(0.3)
+            return True
+
+        slow._raw.is_connected.side_effect = slow_ping
+        slow.close()
+        checkout = threading.Thread(target=pool.acquire)
+        checkout.start()
+        pinging.wait(1)
+
+        start = time.monotonic()
+        other.close()
+        pool.stats()
+        self.assertLess(time.monotonic() - start, 0.1)
+        checkout.join()
+
+    def test_idle_timeout_recycles(self):
+        """Koneksi idle melewati idle_timeout tidak dipakai ulang"""
+        pool = make_pool(idle_timeout=0.01)
+        pool.acquire().close()
+        time.sleep(0.02)
+        pool.acquire()
+        self.assertEqual(pool.stats()['recycled_idle'], 1)
+
+
+class TestRequestScopedConnection(unittest.TestCase):
+    """Test koneksi bersama per request dan transaction()"""
+
+    def setUp(self):
+        self.pool = make_pool()
+        self.patcher = patch('utils.db.get_pool', return_value=self.pool)
+        self.patcher.start()
+        self.app = Flask(__name__)
+        db.init_app(self.app)
+
+    def tearDown(self):
+        self.patcher.stop()
+
+    def test_services_share_one_connection(self):
+        """connect_db() dalam satu app context memakai koneksi yang sama"""
+        with self.app.app_context():
+            first = db.connect_db()
+            first.close()
+            second = db.get_db_connection()
+            self.assertIs(first.connection, second.connection)
+            self.assertEqual(self.pool.stats()['checked_out'], 1)
+        # Dilepas ke pool saat teardown
+        self.assertEqual(self.pool.stats()['checked_out'], 0)
+
+    def test_commit_deferred_inside_transaction(self):
+        """commit() service ditunda sampai akhir blok transaction()"""
+        with self.app.app_context():
+            with db.transaction():
+                conn = db.connect_db()
+                conn.commit()
+                raw = conn.connection._raw
+                raw.commit.assert_not_called()
+            raw.commit.assert_called_once()
+
+    def test_transaction_without_queries_borrows_nothing(self):
+        """transaction() tanpa query tidak meminjam koneksi dari pool"""
+        with self.app.app_context():
+            with db.transaction():
+                self.assertEqual(self.pool.stats()['checked_out'], 0)
+        self.assertEqual(self.pool.stats()['created'], 0)
+
+    def test_transaction_rollback_on_error(self):
+        """Exception di dalam transaction() me-rollback perubahan"""
+        with self.app.app_context():
+            with self.assertRaises(ValueError):
+                with db.transaction() as conn:
+                    raw = conn.connection._raw
+                    raise ValueError('gagal')
+            raw.commit.assert_not_called()
+            raw.rollback.assert_called()
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,135 @@
+# test_event_hub.py
+"""
+Test fan-out live feed absensi (utils/event_hub.py) dan publish setelah commit
+"""
+
+import asyncio
+import os
+import sys
+import threading
+import unittest
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services import absensi_service, siswa_service, token_service
+from test_sqlite_backend import SQLiteTestCase
+from utils import db
+from utils.event_hub import EventHub, HubFullError, format_sse_batch, get_event_hub
+from utils.time_helper import get_current_time_wib
+
+
+class TestEventHub(unittest.TestCase):
+    """Filter per kunci, buffer terbatas, batas koneksi"""
+
+    def test_publish_only_to_matching_key(self):
+        hub = EventHub()
+        budi, budi_2, ani = hub.subscribe('budi'), hub.subscribe('budi'), hub.subscribe('ani')
+        self.assertEqual(hub.publish('budi', {'id_absen': 1}), 2)
+        self.assertEqual(budi.get(0), ([{'id_absen': 1}], False))
+        self.assertEqual(budi_2.get(0), ([{'id_absen': 1}], False))
+        self.assertEqual(ani.get(0), ([], False))
+
+        budi.close()
+        budi.close()
+        budi_2.close()
+        self.assertFalse(hub.has_subscribers('budi'))
+        self.assertEqual(hub.stats()['subscribers'], 1)
+
+    def test_slow_client_drops_oldest(self):
+        hub = EventHub(buffer_size=2)
+        with hub.subscribe('budi') as slow:
+            for i in range(5):
+                hub.publish('budi', {'id_absen': i})
+            events, overflowed = slow.get(0)
+        self.assertEqual([e['id_absen'] for e in events], [3, 4])
+        self.assertTrue(overflowed)
+        self.assertEqual(hub.stats()['dropped'], 3)
+        self.assertIn('event: resync', format_sse_batch(events, overflowed))
+        self.assertEqual(format_sse_batch([], False), ': ping\n\n')
+
+    def test_max_subscribers(self):
+        hub = EventHub(max_subscribers=1)
+        first = hub.subscribe('budi')
+        with self.assertRaises(HubFullError):
+            hub.subscribe('ani')
+        first.close()
+        hub.subscribe('ani').close()
+
+    def test_get_wakes_on_publish_from_other_thread(self):
+        hub = EventHub()
+        subscription = hub.subscribe('budi')
+        threading.Timer(0.05, hub.publish, ('budi', {'id_absen': 7})).start()
+        self.assertEqual(subscription.get(5), ([{'id_absen': 7}], False))
+
+        async def scenario():
+            threading.Timer(0.05, hub.publish, ('budi', {'id_absen': 8})).start()
+            return await subscription.get_async(5)
+
+        self.assertEqual(asyncio.run(scenario()), ([{'id_absen': 8}], False))
+
+
+class TestPublishAfterCommit(SQLiteTestCase):
+    """Scan dipublish ke guru pembuat token hanya setelah commit"""
+
+    def setUp(self):
+        super().setUp()
+        self.app = Flask(__name__)
+        db.init_app(self.app)
+        self.subscription = get_event_hub().subscribe('budi')
+
+    def tearDown(self):
+        self.subscription.close()
+        super().tearDown()
+
+    def test_published_after_commit_only(self):
+        a = siswa_service.create_siswa('ea', 'pw', 'e01', 'Eka', 'RPL', '10A')
+        b = siswa_service.create_siswa('eb', 'pw', 'e02', 'Edo', 'TKJ', '10B')
+
+        with self.app.app_context():
+            with db.transaction():
+                self.assertTrue(absensi_service.insert_absen_by_id(a, 'tok', 'budi'))
+                self.assertEqual(self.subscription.get(0), ([], False))
+            events, _ = self.subscription.get(0)
+        self.assertEqual(len(events), 1)
+        self.assertEqual((events[0]['nis'], events[0]['kelas']), ('e01', '10A'))
+
+        with self.app.app_context():
+            with self.assertRaises(RuntimeError):
+                with db.transaction():
+                    absensi_service.insert_absen_by_id(b, 'tok', 'budi')
+                    raise RuntimeError('rollback')
+            # Token guru lain tidak masuk feed budi
+            absensi_service.insert_absen_by_id(b, 'tok', 'ani')
+        self.assertEqual(self.subscription.get(0), ([], False))
+
+
+    def test_bulk_and_manual_writers_publish(self):
+        """Scan batch/antrian dan absensi manual ikut masuk feed, dengan statusnya"""
+        a = siswa_service.create_siswa('ec', 'pw', 'e03', 'Eva', 'RPL', '10A')
+        b = siswa_service.create_siswa('ed', 'pw', 'e04', 'Eko', 'RPL', '10A')
+        token, _ = token_service.create_token_with_ttl(issued_by='budi')
+        now = get_current_time_wib()
+
+        absensi_service.insert_absen_batch([{'id_siswa': a, 'waktu_absen': now, 'token_qr': token}])
+        events, _ = self.subscription.get(0)
+        self.assertEqual([(e['id_siswa'], e['status'], e['nis']) for e in events],
+                         [(a, 'hadir', 'e03')])
+
+        with self.app.app_context():
+            with db.transaction():
+                absensi_service.record_absen_batch(
+                    [{'id_siswa': b, 'waktu_absen': now, 'token_qr': token}]
+                )
+                self.assertEqual(self.subscription.get(0), ([], False))
+        events, _ = self.subscription.get(0)
+        self.assertEqual([(e['id_siswa'], e['nis']) for e in events], [(b, 'e04')])
+
+        # Perubahan manual guru lain: masuk feed guru pembuat token scan-nya
+        absensi_service.upsert_absen_manual([(a, 'izin')], issued_by='ani')
+        events, _ = self.subscription.get(0)
+        self.assertEqual([(e['id_siswa'], e['status']) for e in events], [(a, 'izin')])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,141 @@
+# test_ingest_queue.py
+"""
+Unit test untuk antrian ingest write-behind (services/ingest_service.py)
+"""
+
+import os
+import sys
+import threading
+import unittest
+from datetime import datetime
+
+from mysql.connector import errors
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.ingest_service import IngestQueueFull, ScanIngestQueue
+
+
+class RecordingWriter:
+    """Writer palsu yang mencatat setiap batch"""
+
+    def __init__(self, fail_times=0, release=None):
+        self.batches = []
+        self.fail_times = fail_times
+        self.flushed = threading.Event()
+        self.entered = threading.Event()
+        self.release = release
+
+    def __call__(self, batch):
+        self.entered.set()
+        if self.release is not None:
+            self.release.wait(2)
+        if self.fail_times:
+            self.fail_times -= 1
+            raise RuntimeError('database down')
+        self.batches.append(list(batch))
+        self.flushed.set()
+        return len(batch)
+
+
+def not_recorded(_id_siswa, _tanggal):
+    """Database palsu: belum ada absensi"""
+    return False
+
+
+WAKTU = datetime(2024, 12, 5, 7, 0, 0)
+
+
+class TestScanIngestQueue(unittest.TestCase):
+    """Test dedupe, batching, back-pressure, dan drain"""
+
+    def test_duplicate_same_day_rejected(self):
+        """Scan kedua siswa yang sama di hari yang sama ditolak"""
+        ingest = ScanIngestQueue(writer=RecordingWriter(), recorded=not_recorded)
+        self.assertTrue(ingest.submit(1, 'tok', WAKTU))
+        self.assertFalse(ingest.submit(1, 'tok', WAKTU))
+        self.assertEqual(ingest.stats()['duplicates'], 1)
+        ingest.stop()
+
+    def test_recorded_in_database_rejected(self):
+        """Siswa yang sudah tercatat di database (restart, jalur lain) ditolak"""
+        checks = []
+
+        def recorded(id_siswa, tanggal):
+            checks.append((id_siswa, tanggal))
+            return id_siswa == 1
+
+        ingest = ScanIngestQueue(writer=RecordingWriter(), recorded=recorded)
+        self.assertFalse(ingest.submit(1, 'tok', WAKTU))
+        self.assertFalse(ingest.submit(1, 'tok', WAKTU))
+        self.assertTrue(ingest.submit(2, 'tok', WAKTU))
+        ingest.stop()
+        # Database hanya dicek sekali per siswa per hari
+        self.assertEqual(checks, [(1, WAKTU.date()), (2, WAKTU.date())])
+        self.assertEqual(ingest.stats()['enqueued'], 1)
+
+    def test_database_check_failure_accepts(self):
+        """Database tidak terjangkau: scan tetap diterima (insert idempotent)"""
+        def recorded(_id_siswa, _tanggal):
+            raise errors.InterfaceError(msg='database down')
+
+        writer = RecordingWriter()
+        ingest = ScanIngestQueue(writer=writer, flush_interval=0.01, recorded=recorded)
+        self.assertTrue(ingest.submit(1, 'tok', WAKTU))
+        ingest.stop()
+        self.assertEqual(ingest.stats()['inserted'], 1)
+
+    def test_submit_starts_flusher(self):
+        """submit() menjalankan flusher yang belum berjalan; setelah stop() ditolak"""
+        writer = RecordingWriter()
+        ingest = ScanIngestQueue(writer=writer, flush_interval=0.01, recorded=not_recorded)
+        ingest.submit(1, 'tok', WAKTU)
+        self.assertTrue(writer.flushed.wait(2))
+        ingest.stop()
+        with self.assertRaises(IngestQueueFull):
+            ingest.submit(2, 'tok', WAKTU)
+
+    def test_full_queue_raises(self):
+        """Antrian penuh melempar IngestQueueFull"""
+        release = threading.Event()
+        writer = RecordingWriter(release=release)
+        ingest = ScanIngestQueue(writer=writer, maxsize=1, batch_size=1,
+                                 recorded=not_recorded)
+        # Scan pertama ditahan writer, scan kedua memenuhi antrian
+        ingest.submit(1, 'tok', WAKTU)
+        self.assertTrue(writer.entered.wait(2))
+        ingest.submit(2, 'tok', WAKTU)
+        with self.assertRaises(IngestQueueFull):
+            ingest.submit(3, 'tok', WAKTU)
+        # Siswa yang ditolak boleh mencoba lagi
+        self.assertEqual(ingest.stats()['rejected_full'], 1)
+        release.set()
+        ingest.stop()
+
+    def test_batches_flushed_by_size(self):
+        """Scan ditulis dalam batch sesuai batch_size"""
+        writer = RecordingWriter()
+        ingest = ScanIngestQueue(writer=writer, batch_size=2, flush_interval=0.05,
+                                 recorded=not_recorded)
+        for id_siswa in range(5):
+            ingest.submit(id_siswa, 'tok', WAKTU)
+        ingest.start()
+        ingest.stop()
+        self.assertEqual([len(b) for b in writer.batches], [2, 2, 1])
+        self.assertEqual(ingest.stats()['inserted'], 5)
+
+    def test_failed_batch_retried(self):
+        """Batch yang gagal ditulis dicoba lagi tanpa kehilangan scan"""
+        writer = RecordingWriter(fail_times=1)
+        ingest = ScanIngestQueue(writer=writer, flush_interval=0.01, retry_delay=0.01,
+                                 recorded=not_recorded)
+        ingest.submit(1, 'tok', WAKTU)
+        ingest.start()
+        self.assertTrue(writer.flushed.wait(2))
+        ingest.stop()
+        self.assertEqual(ingest.stats()['errors'], 1)
+        self.assertEqual(ingest.stats()['inserted'], 1)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,149 @@
+# test_journal.py
+"""
+Unit test untuk journal scan lokal (utils/journal.py)
+"""
+
+import json
+import os
+import sys
+import tempfile
+import threading
+import unittest
+from datetime import datetime
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from services.ingest_service import JournaledIngest
+from utils.journal import JournalLockedError, JournalReplayer, ScanJournal
+
+
+class TestScanJournal(unittest.TestCase):
+    """Test append, replay idempotent, dan lag"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.journal = ScanJournal(os.path.join(self.tmp.name, 'scan.jsonl'))
+        self.applied = []
+        self.db_down = False
+
+    def tearDown(self):
+        self.journal.close()
+        self.tmp.cleanup()
+
+    def apply_batch(self, records):
+        """Writer palsu; gagal saat database 'down'"""
+        if self.db_down:
+            raise ConnectionError('database down')
+        if any('n' not in record for record in records):
+            raise KeyError('n')
+        self.applied.extend(records)
+        return len(records)
+
+    def test_concurrent_appends_share_fsync(self):
+        """Append bersamaan semuanya tersimpan, fsync tidak lebih dari append"""
+        threads = [
+            threading.Thread(target=self.journal.append, args=({'n': i},))
+            for i in range(20)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        records, _ = self.journal.read_from(0, 100)
+        self.assertEqual(sorted(r['n'] for r in records), list(range(20)))
+        self.assertLessEqual(self.journal.stats()['fsyncs'], 20)
+
+    def test_replay_waits_for_database(self):
+        """Checkpoint tidak maju selama database down"""
+        replayer = JournalReplayer(self.journal, self.apply_batch, batch_size=2)
+        for i in range(3):
+            self.journal.append({'n': i, 'ts': 1.0})
+
+        self.db_down = True
+        self.assertEqual(replayer.replay(), 0)
+        self.assertGreater(replayer.stats()['lag_bytes'], 0)
+        self.assertEqual(replayer.stats()['errors'], 1)
+
+        self.db_down = False
+        self.assertEqual(replayer.replay(), 3)
+        self.assertEqual(replayer.stats()['lag_bytes'], 0)
+        self.assertEqual([r['n'] for r in self.applied], [0, 1, 2])
+
+        # Replay kedua tidak menerapkan ulang
+        self.assertEqual(replayer.replay(), 0)
+
+    def test_poison_record_dead_lettered(self):
+        """Entri yang ditolak dipindah ke dead-letter dan tidak memblokir checkpoint"""
+        replayer = JournalReplayer(self.journal, self.apply_batch)
+        self.journal.append({'n': 0})
+        self.journal.append({'rusak': True})
+        self.journal.append({'n': 2})
+
+        self.assertEqual(replayer.replay(), 2)
+        self.assertEqual([r['n'] for r in self.applied], [0, 2])
+        self.assertEqual(replayer.stats()['dead_letter'], 1)
+        self.assertEqual(replayer.stats()['lag_bytes'], 0)
+        with open(self.journal.dead_letter_path, encoding='utf-8') as f:
+            dead = [json.loads(line) for line in f]
+        self.assertEqual([entry['record'] for entry in dead], [{'rusak': True}])
+
+        self.assertEqual(replayer.replay(), 0)
+
+    def test_compaction_after_catch_up(self):
+        """Journal dikosongkan setelah semua entri diterapkan"""
+        replayer = JournalReplayer(self.journal, self.apply_batch, compact_bytes=1)
+        self.journal.append({'n': 1})
+        replayer.replay()
+        self.assertEqual(self.journal.size(), 0)
+        self.assertEqual(self.journal.read_checkpoint(), 0)
+
+        self.journal.append({'n': 2})
+        replayer.replay()
+        self.assertEqual([r['n'] for r in self.applied], [1, 2])
+
+    @unittest.skipIf(os.name != 'posix', 'flock hanya di POSIX')
+    def test_second_process_rejected(self):
+        """Journal yang sudah dikunci tidak bisa dipakai pemilik lain"""
+        self.journal.lock()
+        other = ScanJournal(self.journal.path)
+        try:
+            with self.assertRaises(JournalLockedError):
+                other.lock()
+        finally:
+            other.close()
+
+        # Lock dilepas saat journal ditutup
+        self.journal.close()
+        self.journal = ScanJournal(self.journal.path)
+        self.journal.lock()
+
+
+
+class TestJournaledIngest(unittest.TestCase):
+    """Test dedupe submit() journal terhadap absensi di database"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.recorded = {1}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_recorded_in_database_rejected(self):
+        """Siswa yang sudah tercatat di database tidak ditulis ke journal"""
+        ingest = JournaledIngest(
+            os.path.join(self.tmp.name, 'scan.jsonl'),
+            recorded=lambda id_siswa, _tanggal: id_siswa in self.recorded
+        )
+        waktu = datetime(2024, 12, 5, 7, 0, 0)
+        try:
+            self.assertFalse(ingest.submit(1, 'tok', waktu))
+            self.assertTrue(ingest.submit(2, 'tok', waktu))
+            self.assertFalse(ingest.submit(2, 'tok', waktu))
+            self.assertEqual(ingest.stats()['appended'], 1)
+            self.assertEqual(ingest.stats()['duplicates'], 2)
+        finally:
+            ingest.journal.close()
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,36 @@
+# test_qr.py
+"""
+Unit test untuk render QR di memori (utils/qr.py)
+"""
+
+import os
+import sys
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import qr
+
+
+class TestQrRendering(unittest.TestCase):
+    """Test render PNG, cache, dan data URI"""
+
+    def test_png_rendered_and_cached(self):
+        """Render sekali, berikutnya dari cache"""
+        before = qr.get_qr_cache_stats()['hits']
+        png = qr.get_qr_png('token-abc', ttl=60)
+        self.assertTrue(png.startswith(b'\x89PNG'))
+        self.assertIs(qr.get_qr_png('token-abc', ttl=60), png)
+        self.assertEqual(qr.get_qr_cache_stats()['hits'] - before, 1)
+
+    def test_cached_only_lookup(self):
+        """get_cached_qr_png tidak merender token yang belum ada"""
+        self.assertIsNone(qr.get_cached_qr_png('tidak-ada'))
+
+    def test_data_uri(self):
+        """PNG diubah menjadi data URI base64"""
+        self.assertEqual(qr.to_data_uri(b'abc'), 'data:image/png;base64,YWJj')
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,65 @@
+# test_qr_store.py
+"""
+Unit test untuk QRFileStore (garbage collection static/qrcodes)
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.qr_store import QRFileStore
+
+
+class TestQRFileStore(unittest.TestCase):
+    """Test cleanup berdasarkan umur dan budget ukuran"""
+
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def make_file(self, name, size=100, age=0):
+        """Buat file PNG palsu dengan umur tertentu (detik)"""
+        path = os.path.join(self.dir, name)
+        with open(path, 'wb') as f:
+            f.write(b'x' * size)
+        mtime = time.time() - age
+        os.utime(path, (mtime, mtime))
+
+    def test_old_files_removed_and_gone(self):
+        """File lewat umur dihapus dan lookup mengembalikan 'gone'"""
+        self.make_file('lama.png', age=7200)
+        self.make_file('baru.png')
+        store = QRFileStore(self.dir, max_age_seconds=3600)
+
+        result = store.cleanup()
+        self.assertEqual(result['removed'], 1)
+        self.assertEqual(store.lookup('lama.png'), ('gone', None))
+        self.assertEqual(store.lookup('baru.png')[0], 'ok')
+
+    def test_size_budget_removes_oldest(self):
+        """Budget ukuran menghapus file terlama lebih dulu"""
+        self.make_file('a.png', age=30)
+        self.make_file('b.png', age=20)
+        self.make_file('c.png', age=10)
+        store = QRFileStore(self.dir, max_age_seconds=0, max_bytes=150)
+
+        result = store.cleanup()
+        self.assertEqual(result['removed'], 2)
+        self.assertEqual(sorted(os.listdir(self.dir)), ['c.png'])
+
+    def test_missing_and_invalid_names(self):
+        """File tidak ada atau nama tidak valid menghasilkan 'missing'"""
+        store = QRFileStore(self.dir)
+        self.assertEqual(store.lookup('tidak_ada.png'), ('missing', None))
+        self.assertEqual(store.lookup('../config.py'), ('missing', None))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
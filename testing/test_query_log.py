@@ -0,0 +1,75 @@
+# test_query_log.py
+"""
+Unit test untuk instrumentasi SQL di utils/query_log.py
+"""
+
+import os
+import sys
+import unittest
+from unittest.mock import Mock
+
+from flask import Flask, g
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from utils import query_log
+from utils.query_log import InstrumentedCursor, normalize_sql
+
+
+class TestNormalizeSql(unittest.TestCase):
+    """Test normalisasi teks SQL"""
+
+    def test_literals_and_whitespace(self):
+        """Literal dan whitespace dinormalkan"""
+        sql = "SELECT *\n  FROM siswa WHERE id_siswa = 42 AND nama='Andi'"
+        self.assertEqual(
+            normalize_sql(sql),
+            "SELECT * FROM siswa WHERE id_siswa = ? AND nama=?"
+        )
+
+    def test_in_list_collapsed(self):
+        """Daftar placeholder IN (...) dipendekkan"""
+        sql = "SELECT * FROM qr_token WHERE token IN (%s, %s, %s)"
+        self.assertEqual(
+            normalize_sql(sql),
+            "SELECT * FROM qr_token WHERE token IN (?, ...)"
+        )
+
+
+class TestInstrumentedCursor(unittest.TestCase):
+    """Test pencatatan query dan total per request"""
+
+    def setUp(self):
+        query_log.reset_query_stats()
+        self.app = Flask(__name__)
+        query_log.init_app(self.app)
+
+    def test_query_recorded_with_rows(self):
+        """Eksekusi dan fetch tercatat di statistik global"""
+        raw = Mock(rowcount=-1)
+        raw.fetchall.return_value = [{'id': 1}, {'id': 2}]
+        cursor = InstrumentedCursor(raw)
+        cursor.execute("SELECT * FROM siswa WHERE kelas=%s", ('12A',))
+        cursor.fetchall()
+
+        stats = query_log.get_query_stats()
+        self.assertEqual(stats['statements'], 1)
+        self.assertEqual(stats['top'][0]['count'], 1)
+        self.assertEqual(stats['top'][0]['rows'], 2)
+
+    def test_request_totals_header(self):
+        """Jumlah query per request dikirim lewat header"""
+        @self.app.route('/q')
+        def run_queries():
+            cursor = InstrumentedCursor(Mock(rowcount=1))
+            cursor.execute("UPDATE qr_token SET status='expired'")
+            cursor.execute("UPDATE qr_token SET status='expired'")
+            return str(g.sql_query_count)
+
+        response = self.app.test_client().get('/q')
+        self.assertEqual(response.headers['X-DB-Query-Count'], '2')
+        self.assertIn('X-DB-Time-Ms', response.headers)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,137 @@
+# test_scan_batch.py
+"""
+Integration test upload batch scan (/siswa/scan_batch) di SQLite in-memory
+"""
+
+import os
+import sys
+import unittest
+from datetime import timedelta
+
+from flask import Flask
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from config import Config
+from routes.siswa import siswa_bp
+from services import absensi_service, siswa_service, token_service
+from test_sqlite_backend import SQLiteTestCase
+from utils import db
+from utils.cache import TTLCache
+from utils.time_helper import get_current_time_wib
+
+
+def _epoch_ms(waktu):
+    return int(waktu.timestamp() * 1000)
+
+
+class TestScanBatch(SQLiteTestCase):
+    """Validasi satu query, insert bulk, hasil per item, idempotency"""
+
+    def setUp(self):
+        super().setUp()
+        app = Flask(__name__, template_folder='../templates')
+        app.config.from_object(Config)
+        app.extensions['scan_idempotency'] = TTLCache(maxsize=100, default_ttl=60)
+        db.init_app(app)
+        app.register_blueprint(siswa_bp)
+        self.client = app.test_client()
+        self.id_siswa = siswa_service.create_siswa('fani', 'pw', '006', 'Fani', 'RPL', '10A')
+        with self.client.session_transaction() as sess:
+            sess['id_siswa'] = self.id_siswa
+
+    def post(self, scans):
+        return self.client.post('/siswa/scan_batch', json={'scans': scans})
+
+    def test_per_item_results(self):
+        """Scan valid tercatat, duplikat hari sama warning, token asing error"""
+        token, _ = token_service.create_token_with_ttl(300)
+        now = get_current_time_wib()
+        response = self.post([
+            {'token': token, 'client_ts': _epoch_ms(now), 'idempotency_key': 'a'},
+            {'token': token, 'client_ts': _epoch_ms(now), 'idempotency_key': 'b'},
+            {'token': 'asing', 'client_ts': _epoch_ms(now), 'idempotency_key': 'c'},
+            {'token': token, 'client_ts': 'kemarin', 'idempotency_key': 'd'}
+        ])
+        self.assertEqual(response.status_code, 200)
+        statuses = [item['status'] for item in response.get_json()['results']]
+        self.assertEqual(statuses, ['success', 'warning', 'error', 'error'])
+        self.assertEqual(len(absensi_service.get_all_absensi()), 1)
+
+    def test_scan_recorded_at_client_time(self):
+        """Scan offline saat token masih aktif diterima setelah token expired"""
+        token, _ = token_service.create_token_with_ttl(300)
+        now = get_current_time_wib()
+        # Token berlaku 10-5 menit lalu, sudah ditandai expired oleh sweeper
+        conn = db.open_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE qr_token SET waktu_buat=%s, waktu_expired=%s, status='expired' "
+            "WHERE token=%s",
+            ((now - timedelta(minutes=10)).replace(tzinfo=None),
+             (now - timedelta(minutes=5)).replace(tzinfo=None), token)
+        )
+        conn.commit()
+        conn.close()
+
+        waktu_scan = now
+        too_late = self.post([{'token': token, 'client_ts': _epoch_ms(waktu_scan),
+                               'idempotency_key': 'late'}])
+        self.assertEqual(too_late.get_json()['results'][0]['status'], 'error')
+
+        in_time = self.post([{'token': token,
+                              'client_ts': _epoch_ms(now - timedelta(minutes=7)),
+                              'idempotency_key': 'ok'}])
+        self.assertEqual(in_time.get_json()['results'][0]['status'], 'success')
+
+    def test_revoked_token_rejected_after_expiry(self):
+        """Token dicabut guru tetap ditolak setelah masa berlakunya lewat"""
+        token, _ = token_service.create_token_with_ttl(300)
+        now = get_current_time_wib()
+        token_service.expire_token(token)
+        conn = db.open_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "UPDATE qr_token SET waktu_buat=%s, waktu_expired=%s WHERE token=%s",
+            ((now - timedelta(minutes=10)).replace(tzinfo=None),
+             (now - timedelta(minutes=5)).replace(tzinfo=None), token)
+        )
+        conn.commit()
+        conn.close()
+
+        response = self.post([{'token': token,
+                               'client_ts': _epoch_ms(now - timedelta(minutes=7)),
+                               'idempotency_key': 'dicabut'}])
+        self.assertEqual(response.get_json()['results'][0]['status'], 'error')
+        self.assertEqual(absensi_service.get_all_absensi(), [])
+
+    def test_rejects_stale_upload(self):
+        """Scan yang lebih tua dari SCAN_BATCH_MAX_UPLOAD_LAG ditolak"""
+        token, _ = token_service.create_token_with_ttl(300)
+        now = get_current_time_wib()
+        stale = now - timedelta(seconds=Config.SCAN_BATCH_MAX_UPLOAD_LAG + 60)
+        response = self.post([{'token': token, 'client_ts': _epoch_ms(stale),
+                               'idempotency_key': 'basi'}])
+        result = response.get_json()['results'][0]
+        self.assertEqual(result['status'], 'error')
+        self.assertIn('terlalu lama', result['message'])
+
+    def test_idempotency_key_replayed(self):
+        """Retry dengan idempotency_key sama mendapat hasil pertama"""
+        token, _ = token_service.create_token_with_ttl(300)
+        scan = {'token': token, 'client_ts': _epoch_ms(get_current_time_wib()),
+                'idempotency_key': 'retry'}
+        first = self.post([scan]).get_json()['results'][0]
+        second = self.post([scan]).get_json()['results'][0]
+        self.assertEqual(first['status'], 'success')
+        self.assertEqual(second, first)
+
+    def test_rejects_oversized_batch(self):
+        """Batch melebihi SCAN_BATCH_MAX_ITEMS ditolak"""
+        scans = [{'token': 't', 'client_ts': 0, 'idempotency_key': str(i)}
+                 for i in range(Config.SCAN_BATCH_MAX_ITEMS + 1)]
+        self.assertEqual(self.post(scans).status_code, 413)
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
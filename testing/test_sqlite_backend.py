@@ -0,0 +1,387 @@
+# test_sqlite_backend.py
+"""
+Integration test service layer terhadap backend SQLite in-memory
+"""
+
+import os
+import sys
+import unittest
+from datetime import timedelta
+from unittest.mock import patch
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from init_db import migrate
+from utils import db
+from utils.sqlite_backend import SQLiteCursor, translate_sql
+from services import absensi_service, siswa_service, token_service
+from services.guru_service import authenticate_guru
+from utils.time_helper import get_current_time_wib
+
+
+class SQLiteTestCase(unittest.TestCase):
+    """Base class: database SQLite in-memory baru untuk setiap test"""
+
+    def setUp(self):
+        db.use_backend('sqlite', database=':memory:')
+        conn = db.open_connection()
+        cur = conn.cursor()
+        for table in ('absensi_versi', 'absensi_harian', 'absensi', 'qr_token', 'siswa', 'guru',
+                      'schema_version'):
+            cur.execute(f"DROP TABLE IF EXISTS {table}")
+        conn.commit()
+        migrate(conn)
+        conn.close()
+
+    def tearDown(self):
+        db.use_backend('mysql')
+
+
+class TestTranslateSql(unittest.TestCase):
+    """Test penerjemahan dialek MySQL ke SQLite"""
+
+    def test_placeholders_and_insert_ignore(self):
+        """Placeholder %s dan INSERT IGNORE diterjemahkan"""
+        self.assertEqual(
+            translate_sql("INSERT IGNORE INTO t (a) VALUES (%s)"),
+            "INSERT OR IGNORE INTO t (a) VALUES (?)"
+        )
+
+    def test_ddl(self):
+        """AUTO_INCREMENT dan ENUM diterjemahkan"""
+        sql = "id INT AUTO_INCREMENT PRIMARY KEY, status ENUM('aktif', 'expired')"
+        self.assertEqual(
+            translate_sql(sql),
+            "id INTEGER PRIMARY KEY AUTOINCREMENT, status VARCHAR(20)"
+        )
+
+
+class TestServicesOnSQLite(SQLiteTestCase):
+    """Service yang sama berjalan di SQLite"""
+
+    def test_migrate_is_idempotent(self):
+        """Migrasi kedua tidak menerapkan apa-apa"""
+        conn = db.open_connection()
+        self.assertEqual(migrate(conn), [])
+        conn.close()
+
+    def test_siswa_crud(self):
+        """Create, read, update, delete siswa"""
+        id_siswa = siswa_service.create_siswa('andi', 'pw', '001', 'Andi', 'RPL', '12A')
+        self.assertEqual(siswa_service.get_siswa_by_id(id_siswa)['nama_siswa'], 'Andi')
+        self.assertIsNotNone(siswa_service.authenticate_siswa('andi', 'pw'))
+
+        siswa_service.update_siswa(id_siswa, 'andi', 'pw', '001', 'Andi S', 'RPL', '12A')
+        self.assertEqual(siswa_service.get_siswa_by_username('andi')['nama_siswa'], 'Andi S')
+        self.assertEqual(len(siswa_service.get_all_siswa()), 1)
+        self.assertEqual(siswa_service.delete_siswa(id_siswa), 1)
+
+    def test_token_and_absen_flow(self):
+        """Token dibuat, diverifikasi, dan absensi hanya tercatat sekali per hari"""
+        id_siswa = siswa_service.create_siswa('budi', 'pw', '002', 'Budi', 'TKJ', '11B')
+        token, expires_at = token_service.create_token_with_ttl(300)
+
+        row = token_service.verify_token(token)
+        self.assertIsNotNone(row)
+        self.assertAlmostEqual(
+            row['waktu_expired'], expires_at.replace(tzinfo=None),
+            delta=timedelta(seconds=1)
+        )
+
+        self.assertTrue(absensi_service.insert_absen_by_id(id_siswa, token))
+        self.assertFalse(absensi_service.insert_absen_by_id(id_siswa, token))
+
+        history = absensi_service.get_absensi_by_id_siswa(id_siswa)
+        self.assertEqual(len(history), 1)
+        self.assertEqual(history[0]['kelas'], '11B')
+        self.assertEqual(len(absensi_service.get_all_absensi()), 1)
+
+        token_service.expire_token(token)
+        self.assertIsNone(token_service.verify_token(token))
+
+    def test_absen_unknown_siswa(self):
+        """Siswa yang tidak ada tidak tercatat"""
+        self.assertFalse(absensi_service.insert_absen_by_id(999, 'token'))
+        self.assertEqual(absensi_service.get_all_absensi(), [])
+
+    def test_absen_unique_per_day(self):
+        """Unique key (id_siswa, tanggal) menolak baris kedua di hari yang sama"""
+        id_siswa = siswa_service.create_siswa('cici', 'pw', '003', 'Cici', 'RPL', '10A')
+        self.assertTrue(absensi_service.insert_absen_by_id(id_siswa, 'tok'))
+        conn = db.open_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT IGNORE INTO absensi (id_siswa, waktu_absen, tanggal) "
+            "SELECT id_siswa, waktu_absen, tanggal FROM absensi"
+        )
+        self.assertEqual(cur.rowcount, 0)
+        conn.close()
+
+    def test_roster_cache_skips_siswa_lookup(self):
+        """Setelah login, scan tidak membaca tabel siswa; update menginvalidasi cache"""
+        id_siswa = siswa_service.create_siswa('joko', 'pw', '010', 'Joko', 'RPL', '10A')
+        self.assertIsNone(siswa_service.get_cached_siswa_profile(id_siswa))
+        siswa_service.authenticate_siswa('joko', 'pw')
+        self.assertEqual(siswa_service.get_cached_siswa_profile(id_siswa)['kelas'], '10A')
+
+        siswa_service.update_siswa(id_siswa, 'joko', 'pw', '010', 'Joko', 'RPL', '11A')
+        self.assertIsNone(siswa_service.get_cached_siswa_profile(id_siswa))
+        self.assertTrue(absensi_service.insert_absen_by_id(id_siswa, 'tok'))
+        self.assertEqual(absensi_service.get_all_absensi()[0]['kelas'], '11A')
+
+    def test_insert_absen_batch(self):
+        """Insert bulk melewati siswa tidak dikenal dan duplikat"""
+        a = siswa_service.create_siswa('dedi', 'pw', '004', 'Dedi', 'RPL', '10A')
+        b = siswa_service.create_siswa('eka', 'pw', '005', 'Eka', 'TKJ', '10B')
+        now = get_current_time_wib()
+        scans = [
+            {'id_siswa': a, 'waktu_absen': now, 'token_qr': 't'},
+            {'id_siswa': a, 'waktu_absen': now, 'token_qr': 't'},
+            {'id_siswa': b, 'waktu_absen': now, 'token_qr': 't'},
+            {'id_siswa': 999, 'waktu_absen': now, 'token_qr': 't'}
+        ]
+        self.assertEqual(absensi_service.insert_absen_batch(scans), 2)
+        rows = absensi_service.get_all_absensi()
+        self.assertEqual(sorted(r['jurusan'] for r in rows), ['RPL', 'TKJ'])
+
+    def test_upsert_absen_manual(self):
+        """Absensi manual menambah baris baru dan mengganti status hasil scan"""
+        a = siswa_service.create_siswa('gita', 'pw', '007', 'Gita', 'RPL', '10A')
+        b = siswa_service.create_siswa('hana', 'pw', '008', 'Hana', 'RPL', '10A')
+        c = siswa_service.create_siswa('indra', 'pw', '009', 'Indra', 'TKJ', '10B')
+        self.assertTrue(absensi_service.insert_absen_by_id(a, 'tok'))
+
+        result = absensi_service.upsert_absen_manual(
+            [(a, 'izin'), (b, 'sakit'), (c, 'alpa'), (999, 'alpa')], kelas='10A'
+        )
+        self.assertEqual(result, {'written': 2, 'not_found': [c, 999]})
+        rows = {r['id_siswa']: r for r in absensi_service.get_all_absensi()}
+        self.assertEqual(rows[a]['status'], 'izin')
+        self.assertEqual(rows[a]['token_qr'], 'tok')
+        self.assertEqual(rows[b]['status'], 'sakit')
+        self.assertNotIn(c, rows)
+
+        absensi_service.upsert_absen_manual([(b, 'hadir')])
+        rows = {r['id_siswa']: r for r in absensi_service.get_all_absensi()}
+        self.assertEqual((len(rows), rows[b]['status']), (2, 'hadir'))
+
+    def test_rekap_harian_incremental(self):
+        """Rekap ikut berubah di setiap jalur tulis dan sama dengan hasil rebuild"""
+        def rekap():
+            conn = db.open_connection()
+            cur = conn.cursor()
+            cur.execute("SELECT kelas, jurusan, status, jumlah FROM absensi_harian")
+            rows = {tuple(row[:3]): row[3] for row in cur.fetchall()}
+            conn.close()
+            return rows
+
+        a = siswa_service.create_siswa('ra', 'pw', 'r01', 'Rara', 'RPL', '10A')
+        b = siswa_service.create_siswa('rb', 'pw', 'r02', 'Rudi', 'RPL', '10A')
+        c = siswa_service.create_siswa('rc', 'pw', 'r03', 'Rina', 'TKJ', '10B')
+        d = siswa_service.create_siswa('rd', 'pw', 'r04', 'Rama', 'TKJ', '10B')
+        now = get_current_time_wib()
+
+        absensi_service.insert_absen_by_id(a, 'tok')
+        absensi_service.insert_absen_by_id(a, 'tok')
+        absensi_service.insert_absen_batch([{'id_siswa': c, 'waktu_absen': now, 'token_qr': 't'}])
+        absensi_service.record_absen_batch([{'id_siswa': b, 'waktu_absen': now, 'token_qr': 't'}])
+        self.assertEqual(rekap(), {('10A', 'RPL', 'hadir'): 2, ('10B', 'TKJ', 'hadir'): 1})
+
+        absensi_service.upsert_absen_manual([(a, 'izin'), (d, 'alpa')])
+        expected = {('10A', 'RPL', 'hadir'): 1, ('10A', 'RPL', 'izin'): 1,
+                    ('10B', 'TKJ', 'hadir'): 1, ('10B', 'TKJ', 'alpa'): 1}
+        self.assertEqual(rekap(), expected)
+        self.assertEqual(absensi_service.rebuild_absensi_harian(), 4)
+        self.assertEqual(rekap(), expected)
+
+        data = absensi_service.get_rekap_harian(now.date(), now.date(), kelas='10A')
+        self.assertEqual(len(data), 1)
+        self.assertEqual(
+            {k: data[0][k] for k in ('hadir', 'izin', 'total', 'jumlah_siswa', 'persen_hadir')},
+            {'hadir': 1, 'izin': 1, 'total': 2, 'jumlah_siswa': 2, 'persen_hadir': 50.0}
+        )
+
+        # Selisih per grup: grup yang kosong dihapus, sama dengan rebuild
+        absensi_service.upsert_absen_manual([(c, 'sakit'), (a, 'izin')])
+        expected = {('10A', 'RPL', 'hadir'): 1, ('10A', 'RPL', 'izin'): 1,
+                    ('10B', 'TKJ', 'sakit'): 1, ('10B', 'TKJ', 'alpa'): 1}
+        self.assertEqual(rekap(), expected)
+        absensi_service.rebuild_absensi_harian()
+        self.assertEqual(rekap(), expected)
+
+        # Jumlah siswa di-cache, dibuang saat siswa bertambah
+        siswa_service.create_siswa('re', 'pw', 'r05', 'Reni', 'RPL', '10A')
+        data = absensi_service.get_rekap_harian(now.date(), now.date(), kelas='10A')
+        self.assertEqual(data[0]['jumlah_siswa'], 3)
+
+    def test_versi_counter_taken_last(self):
+        """Setiap penulis menaikkan counter versi setelah absensi dan rekap ditulis"""
+        def writes(func, *args):
+            statements = []
+
+            def record(method):
+                def wrapper(cur, sql, params=None):
+                    statements.append(' '.join(sql.split()))
+                    return method(cur, sql, params)
+                return wrapper
+
+            with patch.object(SQLiteCursor, 'execute', record(SQLiteCursor.execute)), \
+                    patch.object(SQLiteCursor, 'executemany', record(SQLiteCursor.executemany)):
+                func(*args)
+            return [sql for sql in statements if not sql.startswith('SELECT')]
+
+        ids = [siswa_service.create_siswa(f'v{i}', 'pw', f'v{i}', f'V{i}', 'RPL', '10A')
+               for i in range(4)]
+        now = get_current_time_wib()
+        calls = [
+            (absensi_service.insert_absen_by_id, ids[0], 'tok'),
+            (absensi_service.insert_absen_batch,
+             [{'id_siswa': ids[1], 'waktu_absen': now, 'token_qr': 't'}]),
+            (absensi_service.record_absen_batch,
+             [{'id_siswa': ids[2], 'waktu_absen': now, 'token_qr': 't'}]),
+            (absensi_service.upsert_absen_manual, [(ids[0], 'izin'), (ids[3], 'sakit')])
+        ]
+        for func, *args in calls:
+            statements = writes(func, *args)
+            counter = [i for i, sql in enumerate(statements)
+                       if sql.startswith('UPDATE absensi_versi')]
+            self.assertEqual(len(counter), 1, func.__name__)
+            after = statements[counter[0] + 1:]
+            self.assertTrue(after, func.__name__)
+            self.assertTrue(all(sql.startswith('UPDATE absensi SET versi') for sql in after),
+                            func.__name__)
+
+        # Versi unik per perubahan dan sesuai urutan penulisan
+        rows, _ = absensi_service.get_absensi_since(0, limit=10)
+        versi = [row['versi'] for row in rows]
+        self.assertEqual(len(set(versi)), 4)
+        self.assertEqual([row['id_siswa'] for row in rows[-2:]], [ids[0], ids[3]])
+
+    def test_absensi_keyset_pagination(self):
+        """Halaman berurutan tanpa duplikat/terlewat, termasuk waktu_absen kembar"""
+        now = get_current_time_wib()
+        scans = []
+        for i in range(7):
+            id_siswa = siswa_service.create_siswa(f'p{i}', 'pw', f'p{i}', f'P{i}', 'RPL', '10A')
+            # Dua baris per waktu_absen agar id_absen ikut menentukan urutan
+            scans.append({'id_siswa': id_siswa, 'token_qr': 't',
+                          'waktu_absen': now - timedelta(minutes=i // 2)})
+        absensi_service.insert_absen_batch(scans)
+
+        seen, cursor, pages = [], None, 0
+        while True:
+            rows, cursor = absensi_service.get_absensi_page(limit=3, cursor=cursor)
+            seen += [row['id_absen'] for row in rows]
+            pages += 1
+            if cursor is None:
+                break
+        expected = [row['id_absen'] for row in absensi_service.get_all_absensi()]
+        self.assertEqual(sorted(seen), sorted(expected))
+        self.assertEqual(len(set(seen)), 7)
+        self.assertEqual(pages, 3)
+
+    def test_absensi_filters(self):
+        """Filter tanggal, kelas, status, NIS, dan nama diterapkan di SQL"""
+        now = get_current_time_wib()
+        a = siswa_service.create_siswa('fa', 'pw', 'f01', 'Budi 100%', 'RPL', '10A')
+        b = siswa_service.create_siswa('fb', 'pw', 'f02', 'Budi Santoso', 'TKJ', '10B')
+        c = siswa_service.create_siswa('fc', 'pw', 'f03', 'Citra', 'RPL', '10A')
+        absensi_service.insert_absen_batch([
+            {'id_siswa': a, 'token_qr': 't', 'waktu_absen': now},
+            {'id_siswa': b, 'token_qr': 't', 'waktu_absen': now},
+            {'id_siswa': c, 'token_qr': 't', 'waktu_absen': now - timedelta(days=1)}
+        ])
+        absensi_service.upsert_absen_manual([(b, 'sakit')])
+
+        def ids(**filters):
+            return sorted(r['id_siswa'] for r in absensi_service.get_absensi_with_filters(filters))
+
+        today, yesterday = now.date(), now.date() - timedelta(days=1)
+        self.assertEqual(ids(), sorted([a, b, c]))
+        self.assertEqual(ids(tanggal_mulai=today, tanggal_selesai=today), sorted([a, b]))
+        self.assertEqual(ids(tanggal_selesai=yesterday), [c])
+        self.assertEqual(ids(kelas='10A'), sorted([a, c]))
+        self.assertEqual(ids(jurusan='TKJ', status='sakit'), [b])
+        self.assertEqual(ids(nis='f03'), [c])
+        self.assertEqual(ids(nama='budi'), sorted([a, b]))
+        # Wildcard di input dicari sebagai teks biasa
+        self.assertEqual(ids(nama='100%'), [a])
+        self.assertEqual(ids(nama='%'), [a])
+
+        rows, cursor = absensi_service.get_absensi_page(1, filters={'kelas': '10A'})
+        self.assertEqual(rows[0]['id_siswa'], a)
+        rows, cursor = absensi_service.get_absensi_page(1, cursor, {'kelas': '10A'})
+        self.assertEqual(([r['id_siswa'] for r in rows], cursor), ([c], None))
+
+    def test_verify_token_cached(self):
+        """Scan berulang pada token yang sama hanya satu query"""
+        token, _ = token_service.create_token_with_ttl(300)
+        before = token_service.get_token_cache_stats()['hits']
+        for _ in range(5):
+            self.assertIsNotNone(token_service.verify_token(token))
+        self.assertEqual(token_service.get_token_cache_stats()['hits'] - before, 4)
+
+    def test_signed_token(self):
+        """Token bertanda tangan valid, tahan modifikasi, dan bisa direvokasi"""
+        token, _ = token_service.create_signed_token_with_ttl('rahasia', 300, 'pakbudi')
+        self.assertTrue(token_service.is_signed_token(token))
+
+        row = token_service.verify_signed_token(token, 'rahasia')
+        self.assertEqual(row['issued_by'], 'pakbudi')
+        self.assertIsNone(token_service.verify_signed_token(token, 'kunci-lain'))
+        self.assertIsNone(token_service.verify_signed_token(token[:-2] + 'xx', 'rahasia'))
+
+        # Audit log tetap tercatat di qr_token
+        self.assertEqual(token_service.verify_token(token)['issued_by'], 'pakbudi')
+
+        token_service.expire_token(token)
+        self.assertIsNone(token_service.verify_signed_token(token, 'rahasia'))
+
+    def test_sweeper_expires_and_purges_in_batches(self):
+        """Sweeper menandai token expired dan menghapus token lama per batch"""
+        now = get_current_time_wib()
+        for i in range(5):
+            token_service.insert_qr_token(f"lama{i}", now - timedelta(days=40))
+        for i in range(3):
+            token_service.insert_qr_token(f"baru{i}", now - timedelta(minutes=1))
+        aktif, _ = token_service.create_token_with_ttl(300)
+
+        progress = token_service.sweep_qr_tokens(
+            batch_size=2, retention_days=30, pause=0
+        )
+        self.assertEqual(progress['expired'], 8)
+        self.assertEqual(progress['purged'], 5)
+        self.assertTrue(progress['complete'])
+        self.assertIsNotNone(token_service.verify_token(aktif))
+
+        conn = db.open_connection()
+        cur = conn.cursor()
+        cur.execute("SELECT COUNT(*) FROM qr_token WHERE status='expired'")
+        self.assertEqual(cur.fetchone()[0], 3)
+        conn.close()
+
+    def test_sweeper_respects_max_batches(self):
+        """Putaran berhenti di max_batches dan melaporkan belum selesai"""
+        now = get_current_time_wib()
+        for i in range(5):
+            token_service.insert_qr_token(f"t{i}", now - timedelta(minutes=1))
+        progress = token_service.sweep_qr_tokens(batch_size=2, max_batches=1, pause=0)
+        self.assertEqual(progress['expired'], 2)
+        self.assertFalse(progress['complete'])
+
+    def test_guru_authentication(self):
+        """Autentikasi guru dari tabel guru"""
+        conn = db.open_connection()
+        cur = conn.cursor()
+        cur.execute(
+            "INSERT INTO guru (username, password, nama_guru) VALUES (%s, %s, %s)",
+            ('pakbudi', 'pw', 'Pak Budi')
+        )
+        conn.commit()
+        conn.close()
+        self.assertEqual(authenticate_guru('pakbudi', 'pw')['nama_guru'], 'Pak Budi')
+        self.assertIsNone(authenticate_guru('pakbudi', 'salah'))
+
+
+if __name__ == '__main__':
+    unittest.main(verbosity=2)
@@ -0,0 +1,163 @@
+"""
+Admission control: batas konkurensi dengan antrian tunggu terbatas
+"""
+import threading
+import time
+from functools import wraps
+
+from flask import current_app, jsonify
+
+
+class AdmissionLimiter:
+    """
+    Membatasi jumlah request yang berjalan bersamaan.
+    Request yang tidak kebagian slot menunggu di antrian terbatas;
+    jika antrian penuh atau waktu tunggu habis, request ditolak.
+    """
+
+    def __init__(self, name, max_concurrent=16, max_queue=64, queue_timeout=2.0):
+        """
+        Args:
+            name (str): Nama limiter
+            max_concurrent (int): Request aktif maksimum
+            max_queue (int): Request menunggu maksimum
+            queue_timeout (float): Lama menunggu slot sebelum ditolak (detik)
+        """
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        self._stats = {
+            'admitted': 0,
+            'queued': 0,
+            'rejected_queue_full': 0,
+            'rejected_timeout': 0,
+            'max_wait_ms': 0.0
+        }
+
+    def acquire(self):
+        """
+        Meminta slot
+
+        Returns:
+            bool: True jika mendapat slot (wajib release()), False jika ditolak
+        """
+        with self._cond:
+            if self._active < self.max_concurrent and self._waiting == 0:
+                self._active += 1
+                self._stats['admitted'] += 1
+                return True
+            if self._waiting >= self.max_queue:
+                self._stats['rejected_queue_full'] += 1
+                return False
+
+            self._waiting += 1
+            self._stats['queued'] += 1
+            start = time.monotonic()
+            deadline = start + self.queue_timeout
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['rejected_timeout'] += 1
+                        return False
+                    self._cond.wait(remaining)
+            finally:
+                self._waiting -= 1
+                waited_ms = (time.monotonic() - start) * 1000
+                self._stats['max_wait_ms'] = max(self._stats['max_wait_ms'], waited_ms)
+
+            self._active += 1
+            self._stats['admitted'] += 1
+            return True
+
+    def release(self):
+        """Mengembalikan slot"""
+        with self._cond:
+            self._active -= 1
+            self._cond.notify()
+
+    def stats(self):
+        """
+        Statistik limiter
+
+        Returns:
+            dict: active, queue_depth, admitted, rejected, max_wait_ms, ...
+        """
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'active': self._active,
+                'queue_depth': self._waiting,
+                'max_concurrent': self.max_concurrent,
+                'max_queue': self.max_queue
+            })
+        data['max_wait_ms'] = round(data['max_wait_ms'], 2)
+        return data
+
+
+def init_app(app):
+    """
+    Membuat limiter dari ADMISSION_LIMITS di config
+
+    Args:
+        app (Flask): Flask application instance
+
+    Returns:
+        dict: {nama: AdmissionLimiter}
+    """
+    limiters = {}
+    if app.config.get('ADMISSION_CONTROL_ENABLED', True):
+        for name, options in app.config.get('ADMISSION_LIMITS', {}).items():
+            limiters[name] = AdmissionLimiter(name, **options)
+    app.extensions['admission'] = limiters
+    return limiters
+
+
+def get_admission_stats(limiters):
+    """
+    Statistik semua limiter
+
+    Args:
+        limiters (dict): {nama: AdmissionLimiter}
+
+    Returns:
+        dict: {nama: stats}
+    """
+    return {name: limiter.stats() for name, limiter in limiters.items()}
+
+
+def admission_controlled(name):
+    """
+    Decorator route: jalankan view hanya jika limiter memberi slot,
+    selain itu balas 503 + Retry-After dengan cepat
+
+    Args:
+        name (str): Nama limiter di ADMISSION_LIMITS
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            limiter = current_app.extensions.get('admission', {}).get(name)
+            if limiter is None:
+                return view(*args, **kwargs)
+            if not limiter.acquire():
+                response = jsonify({
+                    'success': False,
+                    'status': 'error',
+                    'message': 'Server sedang sibuk, silakan coba lagi'
+                })
+                response.status_code = 503
+                response.headers['Retry-After'] = str(
+                    current_app.config.get('ADMISSION_RETRY_AFTER', 1)
+                )
+                return response
+            try:
+                return view(*args, **kwargs)
+            finally:
+                limiter.release()
+        return wrapper
+    return decorator
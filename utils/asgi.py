@@ -0,0 +1,269 @@
+"""
+Adapter ASGI untuk aplikasi Flask
+
+Route tertentu dijalankan native sebagai coroutine; request lain
+diteruskan ke aplikasi Flask (WSGI) di thread pool kecil, termasuk
+response streaming yang dikirim per chunk.
+"""
+import asyncio
+import io
+import json
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+from itsdangerous import BadSignature
+from werkzeug.http import parse_cookie
+
+from utils.async_db import get_async_db
+
+_DONE = object()
+
+
+class AsgiStream:
+    """Response streaming dari handler native (mis. Server-Sent Events)"""
+
+    def __init__(self, body, status=200, headers=None, on_close=None):
+        """
+        Args:
+            body: Async iterator yang menghasilkan str/bytes per chunk
+            status (int): Status HTTP
+            headers (dict): Header response
+            on_close (callable): Dipanggil sekali saat stream selesai
+                atau client putus
+        """
+        self.body = body
+        self.status = status
+        self.headers = headers or {}
+        self.on_close = on_close
+
+
+class AsgiRequest:
+    """Request HTTP yang body-nya sudah dibaca penuh"""
+
+    def __init__(self, scope, body):
+        self.scope = scope
+        self.method = scope['method']
+        self.path = scope['path']
+        self.root_path = scope.get('root_path', '')
+        self.body = body
+        self.headers = {}
+        for name, value in scope.get('headers', []):
+            self.headers[name.decode('latin1').lower()] = value.decode('latin1')
+        self.cookies = parse_cookie(self.headers.get('cookie', ''))
+
+    def get_json(self):
+        """
+        Body sebagai JSON
+
+        Returns:
+            dict or None: Hasil parse, None jika body bukan JSON valid
+        """
+        try:
+            return json.loads(self.body or b'null')
+        except ValueError:
+            return None
+
+
+def load_session(flask_app, request):
+    """
+    Membaca cookie session Flask tanpa request context
+
+    Args:
+        flask_app (Flask): Aplikasi pemilik SECRET_KEY
+        request (AsgiRequest): Request ASGI
+
+    Returns:
+        dict: Isi session (kosong jika tidak ada atau tidak valid)
+    """
+    cookie = request.cookies.get(flask_app.config['SESSION_COOKIE_NAME'])
+    if not cookie:
+        return {}
+    serializer = flask_app.session_interface.get_signing_serializer(flask_app)
+    if serializer is None:
+        return {}
+    try:
+        return serializer.loads(
+            cookie, max_age=int(flask_app.permanent_session_lifetime.total_seconds())
+        )
+    except BadSignature:
+        return {}
+
+
+class AsgiApp:
+    """
+    Aplikasi ASGI: route native dari tabel routes, sisanya ke Flask.
+    Handler native menerima (flask_app, AsgiRequest) dan mengembalikan
+    (payload JSON, status HTTP, header tambahan), atau AsgiStream.
+    """
+
+    def __init__(self, flask_app, routes, wsgi_threads=8):
+        """
+        Args:
+            flask_app (Flask): Aplikasi Flask untuk route non-native
+            routes (dict): {(method, path): coroutine handler}
+            wsgi_threads (int): Thread untuk menjalankan request WSGI
+        """
+        self.flask_app = flask_app
+        self.routes = routes
+        self.executor = ThreadPoolExecutor(
+            max_workers=wsgi_threads, thread_name_prefix='asgi-wsgi'
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+            return
+        if scope['type'] != 'http':
+            return
+
+        handler = self.routes.get((scope['method'], scope['path']))
+        body = await _read_body(receive)
+        if handler is None:
+            await self._call_wsgi(scope, body, send)
+            return
+
+        try:
+            result = await handler(self.flask_app, AsgiRequest(scope, body))
+            if isinstance(result, AsgiStream):
+                await _send_stream(receive, send, result)
+                return
+            payload, status, headers = result
+        except Exception:  # pylint: disable=broad-except
+            self.flask_app.logger.exception("Error pada route async %s", scope['path'])
+            payload, status, headers = {
+                'status': 'error',
+                'message': 'Internal server error'
+            }, 500, {}
+        await _send_json(send, payload, status, headers)
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                await get_async_db().close()
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _call_wsgi(self, scope, body, send):
+        loop = asyncio.get_running_loop()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):  # pylint: disable=unused-argument
+            started['status'] = int(status.split(' ', 1)[0])
+            started['headers'] = headers
+
+        iterable = await loop.run_in_executor(
+            self.executor, self.flask_app, _build_environ(scope, body), start_response
+        )
+        try:
+            await send({
+                'type': 'http.response.start',
+                'status': started['status'],
+                'headers': [
+                    (name.lower().encode('latin1'), value.encode('latin1'))
+                    for name, value in started['headers']
+                ]
+            })
+            # Chunk dikirim satu per satu agar response streaming tetap jalan
+            iterator = iter(iterable)
+            while True:
+                chunk = await loop.run_in_executor(self.executor, next, iterator, _DONE)
+                if chunk is _DONE:
+                    break
+                if chunk:
+                    await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+            await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+        finally:
+            close = getattr(iterable, 'close', None)
+            if close is not None:
+                await loop.run_in_executor(self.executor, close)
+
+
+async def _read_body(receive):
+    chunks = []
+    while True:
+        message = await receive()
+        if message['type'] == 'http.disconnect':
+            break
+        chunks.append(message.get('body', b''))
+        if not message.get('more_body'):
+            break
+    return b''.join(chunks)
+
+
+async def _send_json(send, payload, status, headers):
+    body = json.dumps(payload).encode('utf-8')
+    raw_headers = [
+        (b'content-type', b'application/json'),
+        (b'content-length', str(len(body)).encode('latin1'))
+    ]
+    for name, value in headers.items():
+        raw_headers.append((name.lower().encode('latin1'), str(value).encode('latin1')))
+    await send({'type': 'http.response.start', 'status': status, 'headers': raw_headers})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def _send_stream(receive, send, stream):
+    """Kirim AsgiStream per chunk sampai selesai atau client putus"""
+    raw_headers = [
+        (name.lower().encode('latin1'), str(value).encode('latin1'))
+        for name, value in stream.headers.items()
+    ]
+
+    async def pump():
+        await send({'type': 'http.response.start', 'status': stream.status, 'headers': raw_headers})
+        async for chunk in stream.body:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            await send({'type': 'http.response.body', 'body': chunk, 'more_body': True})
+        await send({'type': 'http.response.body', 'body': b'', 'more_body': False})
+
+    async def wait_disconnect():
+        while (await receive())['type'] != 'http.disconnect':
+            pass
+
+    tasks = [asyncio.ensure_future(pump()), asyncio.ensure_future(wait_disconnect())]
+    try:
+        await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        # Membatalkan pump menjalankan blok finally di generator body
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if stream.on_close is not None:
+            stream.on_close()
+
+
+def _build_environ(scope, body):
+    """Environ WSGI (PEP 3333) dari scope ASGI"""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', '').encode('utf-8').decode('latin1'),
+        'PATH_INFO': scope['path'].encode('utf-8').decode('latin1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin1'),
+        'SERVER_NAME': str(server[0]),
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f"HTTP/{scope.get('http_version', '1.1')}",
+        'REMOTE_ADDR': client[0],
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False
+    }
+    for name, value in scope.get('headers', []):
+        key = name.decode('latin1').upper().replace('-', '_')
+        value = value.decode('latin1')
+        if key not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            key = 'HTTP_' + key
+        if key in environ:
+            value = environ[key] + ',' + value
+        environ[key] = value
+    return environ
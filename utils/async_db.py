@@ -0,0 +1,320 @@
+"""
+Akses database asyncio untuk entry point ASGI
+
+Memakai aiomysql jika terpasang dan backend aktif MySQL. Tanpa aiomysql
+(atau pada backend SQLite) query dijalankan lewat pool koneksi sinkron
+di thread executor kecil, sehingga service async punya kontrak yang
+sama di test dan di produksi.
+"""
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+try:
+    import aiomysql
+    AIOMYSQL_AVAILABLE = True
+except ImportError:
+    aiomysql = None
+    AIOMYSQL_AVAILABLE = False
+
+from utils import db
+
+
+class AsyncDatabase:
+    """
+    Pool koneksi async dengan helper fetch_one / fetch_all / execute.
+    Setiap helper meminjam satu koneksi, menjalankan satu statement,
+    commit, lalu mengembalikan koneksi. Beberapa statement yang harus
+    atomik dijalankan lewat transaction().
+    """
+
+    def __init__(self, pool_size=20, executor_threads=4):
+        """
+        Args:
+            pool_size (int): Koneksi maksimum pool aiomysql
+            executor_threads (int): Thread untuk driver pengganti (tanpa aiomysql)
+        """
+        self.pool_size = pool_size
+        self.executor_threads = executor_threads
+        self.driver = 'aiomysql' if AIOMYSQL_AVAILABLE and db.get_dialect() == 'mysql' \
+            else 'executor'
+        self._pool = None
+        self._pool_lock = None
+        self._executor = None
+        self._tx_slots = None
+        self._stats = {'queries': 0, 'errors': 0}
+
+    async def fetch_one(self, sql, params=()):
+        """
+        Menjalankan SELECT dan mengambil satu baris
+
+        Returns:
+            dict or None: Baris pertama
+        """
+        return await self._run(sql, params, 'one')
+
+    async def fetch_all(self, sql, params=()):
+        """
+        Menjalankan SELECT dan mengambil semua baris
+
+        Returns:
+            list: List of dictionaries
+        """
+        return await self._run(sql, params, 'all')
+
+    async def execute(self, sql, params=()):
+        """
+        Menjalankan INSERT/UPDATE/DELETE lalu commit
+
+        Returns:
+            int: Jumlah baris yang terpengaruh
+        """
+        return await self._run(sql, params, 'rowcount')
+
+    async def insert(self, sql, params=()):
+        """
+        Menjalankan INSERT lalu commit
+
+        Returns:
+            tuple: (jumlah baris yang terpengaruh, lastrowid)
+        """
+        return await self._run(sql, params, 'insert')
+
+    def transaction(self):
+        """
+        Beberapa statement dalam satu transaksi di satu koneksi:
+
+            async with get_async_db().transaction() as tx:
+                rowcount, id_absen = await tx.insert(...)
+                await tx.execute(...)
+
+        Commit saat blok selesai, rollback jika terjadi exception.
+
+        Returns:
+            AsyncTransaction: Context manager async
+        """
+        return AsyncTransaction(self)
+
+    async def _run(self, sql, params, mode):
+        self._stats['queries'] += 1
+        try:
+            if self.driver == 'aiomysql':
+                pool = await self._get_pool()
+                async with pool.acquire() as conn:
+                    result = await _execute_aiomysql(conn, sql, params, mode)
+                    await conn.commit()
+                    return result
+            return await self._in_executor(_run_sync, sql, params, mode)
+        except Exception:
+            self._stats['errors'] += 1
+            raise
+
+    async def _get_pool(self):
+        if self._pool is None:
+            if self._pool_lock is None:
+                self._pool_lock = asyncio.Lock()
+            async with self._pool_lock:
+                if self._pool is None:
+                    self._pool = await aiomysql.create_pool(
+                        minsize=1, maxsize=self.pool_size,
+                        autocommit=False, **_aiomysql_options()
+                    )
+        return self._pool
+
+    def _transaction_slots(self):
+        if self._tx_slots is None:
+            # Sisakan satu thread untuk statement transaksi yang sedang berjalan
+            self._tx_slots = asyncio.Semaphore(max(self.executor_threads - 1, 1))
+        return self._tx_slots
+
+    async def _in_executor(self, func, *args):
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=self.executor_threads, thread_name_prefix='async-db'
+            )
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, func, *args)
+
+    async def close(self):
+        """Menutup pool aiomysql dan executor"""
+        if self._pool is not None:
+            self._pool.close()
+            await self._pool.wait_closed()
+            self._pool = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    def stats(self):
+        """
+        Statistik database async
+
+        Returns:
+            dict: driver, queries, errors, dan ukuran pool
+        """
+        data = dict(self._stats)
+        data['driver'] = self.driver
+        if self._pool is not None:
+            data['pool_size'] = self._pool.size
+            data['pool_free'] = self._pool.freesize
+        return data
+
+
+class AsyncTransaction:
+    """Transaksi async: semua statement memakai koneksi yang sama"""
+
+    def __init__(self, database):
+        self._db = database
+        self._pool = None
+        self._slots = None
+        self._conn = None
+
+    async def __aenter__(self):
+        if self._db.driver == 'aiomysql':
+            self._pool = await self._db._get_pool()  # pylint: disable=protected-access
+            self._conn = await self._pool.acquire()
+        else:
+            # Koneksi dipakai lintas beberapa tugas executor: jumlah
+            # transaksi dibatasi agar thread executor tidak habis menunggu
+            # koneksi yang dipegang transaksi lain
+            self._slots = self._db._transaction_slots()  # pylint: disable=protected-access
+            await self._slots.acquire()
+            try:
+                self._conn = await self._db._in_executor(  # pylint: disable=protected-access
+                    db.get_pool().acquire
+                )
+            except BaseException:
+                self._slots.release()
+                raise
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        conn, self._conn = self._conn, None
+        try:
+            if self._db.driver == 'aiomysql':
+                if exc_type is None:
+                    await conn.commit()
+                else:
+                    await conn.rollback()
+            else:
+                await self._db._in_executor(  # pylint: disable=protected-access
+                    conn.commit if exc_type is None else conn.rollback
+                )
+        finally:
+            if self._db.driver == 'aiomysql':
+                self._pool.release(conn)
+            else:
+                conn.close()
+                self._slots.release()
+        return False
+
+    async def fetch_one(self, sql, params=()):
+        """SELECT satu baris di dalam transaksi"""
+        return await self._run(sql, params, 'one')
+
+    async def fetch_all(self, sql, params=()):
+        """SELECT semua baris di dalam transaksi"""
+        return await self._run(sql, params, 'all')
+
+    async def execute(self, sql, params=()):
+        """INSERT/UPDATE/DELETE di dalam transaksi (jumlah baris terpengaruh)"""
+        return await self._run(sql, params, 'rowcount')
+
+    async def insert(self, sql, params=()):
+        """INSERT di dalam transaksi ((jumlah baris terpengaruh, lastrowid))"""
+        return await self._run(sql, params, 'insert')
+
+    async def _run(self, sql, params, mode):
+        stats = self._db._stats  # pylint: disable=protected-access
+        stats['queries'] += 1
+        try:
+            if self._db.driver == 'aiomysql':
+                return await _execute_aiomysql(self._conn, sql, params, mode)
+            return await self._db._in_executor(  # pylint: disable=protected-access
+                _execute_sync, self._conn, sql, params, mode
+            )
+        except Exception:
+            stats['errors'] += 1
+            raise
+
+
+async def _execute_aiomysql(conn, sql, params, mode):
+    async with conn.cursor(aiomysql.DictCursor) as cur:
+        rowcount = await cur.execute(sql, params)
+        if mode == 'one':
+            return await cur.fetchone()
+        if mode == 'all':
+            return await cur.fetchall()
+        if mode == 'insert':
+            return (rowcount, cur.lastrowid)
+        return rowcount
+
+
+def _aiomysql_options():
+    options = db.get_connection_options()
+    # Nama opsi mysql.connector -> aiomysql
+    if 'database' in options:
+        options['db'] = options.pop('database')
+    return options
+
+
+def _run_sync(sql, params, mode):
+    """Driver pengganti: satu statement di koneksi pool sinkron"""
+    conn = db.get_pool().acquire()
+    try:
+        result = _execute_sync(conn, sql, params, mode)
+        conn.commit()
+        return result
+    finally:
+        conn.close()
+
+
+def _execute_sync(conn, sql, params, mode):
+    cur = conn.cursor(dictionary=True)
+    try:
+        cur.execute(sql, params)
+        if mode == 'one':
+            return cur.fetchone()
+        if mode == 'all':
+            return cur.fetchall()
+        if mode == 'insert':
+            return (cur.rowcount, cur.lastrowid)
+        return cur.rowcount
+    finally:
+        cur.close()
+
+
+_async_db = None
+_async_db_lock = threading.Lock()
+
+
+def configure_async_db(pool_size=20, executor_threads=4):
+    """
+    Membuat ulang database async global dengan ukuran pool tertentu
+
+    Args:
+        pool_size (int): Koneksi maksimum pool aiomysql
+        executor_threads (int): Thread untuk driver pengganti
+
+    Returns:
+        AsyncDatabase: Instance global yang baru
+    """
+    global _async_db  # pylint: disable=global-statement
+    with _async_db_lock:
+        _async_db = AsyncDatabase(pool_size, executor_threads)
+    return _async_db
+
+
+def get_async_db():
+    """
+    Mengambil database async global (dibuat saat pertama kali dipakai)
+
+    Returns:
+        AsyncDatabase: Database async
+    """
+    global _async_db  # pylint: disable=global-statement
+    if _async_db is None:
+        with _async_db_lock:
+            if _async_db is None:
+                _async_db = AsyncDatabase()
+    return _async_db
@@ -0,0 +1,96 @@
+"""
+Cache in-process berukuran terbatas dengan TTL per entri
+"""
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+
+class TTLCache:
+    """
+    Cache LRU thread-safe dengan waktu kedaluwarsa per entri.
+    Nilai None boleh disimpan (negative caching); gunakan MISSING
+    untuk membedakan "tidak ada di cache".
+    """
+
+    def __init__(self, maxsize=1024, default_ttl=60):
+        """
+        Args:
+            maxsize (int): Jumlah entri maksimum (LRU dibuang saat penuh)
+            default_ttl (float): TTL default dalam detik
+        """
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()  # key -> (value, expires_at)
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'invalidations': 0}
+
+    def get(self, key, default=MISSING):
+        """
+        Ambil nilai dari cache
+
+        Args:
+            key: Kunci cache
+            default: Nilai jika tidak ada/kedaluwarsa (default MISSING)
+
+        Returns:
+            Nilai tersimpan atau default
+        """
+        now = time.monotonic()
+        with self._lock:
+            item = self._data.get(key)
+            if item is None or item[1] <= now:
+                if item is not None:
+                    del self._data[key]
+                self._stats['misses'] += 1
+                return default
+            self._data.move_to_end(key)
+            self._stats['hits'] += 1
+            return item[0]
+
+    def set(self, key, value, ttl=None):
+        """
+        Simpan nilai ke cache
+
+        Args:
+            key: Kunci cache
+            value: Nilai (boleh None)
+            ttl (float): TTL dalam detik (default default_ttl)
+        """
+        ttl = self.default_ttl if ttl is None else ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + ttl)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self._stats['evictions'] += 1
+
+    def invalidate(self, key):
+        """Hapus satu entri dari cache"""
+        with self._lock:
+            if self._data.pop(key, None) is not None:
+                self._stats['invalidations'] += 1
+
+    def clear(self):
+        """Kosongkan cache"""
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        """
+        Statistik cache
+
+        Returns:
+            dict: Ukuran, hits, misses, evictions, invalidations, hit_rate
+        """
+        with self._lock:
+            data = dict(self._stats)
+            data['size'] = len(self._data)
+            data['maxsize'] = self.maxsize
+        lookups = data['hits'] + data['misses']
+        data['hit_rate'] = round(data['hits'] / lookups, 3) if lookups else 0.0
+        return data
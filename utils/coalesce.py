@@ -0,0 +1,151 @@
+"""
+Coalescing request identik: satu eksekusi, hasil dipakai bersama
+"""
+import asyncio
+import threading
+
+from utils.cache import MISSING, TTLCache
+
+
+class _InFlight:
+    """Eksekusi yang sedang berjalan untuk satu kunci"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class RequestCoalescer:
+    """
+    Single-flight + dedupe jendela pendek.
+
+    Pemanggil pertama untuk sebuah kunci menjalankan fungsi; pemanggil
+    lain dengan kunci yang sama menunggu hasil yang sama (in-flight),
+    dan pemanggil berikutnya dalam `window` detik langsung dijawab dari
+    memori tanpa menyentuh database.
+    """
+
+    def __init__(self, window=5.0, maxsize=4096, wait_timeout=10.0):
+        """
+        Args:
+            window (float): Lama hasil disimpan untuk menjawab ulangan (detik)
+            maxsize (int): Jumlah kunci maksimum yang diingat
+            wait_timeout (float): Batas menunggu eksekusi in-flight (detik)
+        """
+        self.window = window
+        self.wait_timeout = wait_timeout
+        self._results = TTLCache(maxsize=maxsize, default_ttl=window)
+        self._inflight = {}
+        self._inflight_async = {}  # key -> asyncio.Future (satu event loop)
+        self._lock = threading.Lock()
+        self._stats = {'executed': 0, 'joined': 0, 'replayed': 0}
+
+    def run(self, key, func, cacheable=None):
+        """
+        Jalankan func() sekali untuk kunci yang sama
+
+        Args:
+            key: Kunci dedupe (mis. (id_siswa, token))
+            func (callable): Fungsi tanpa argumen
+            cacheable (callable): Predikat hasil; False berarti hasil
+                tidak disimpan untuk ulangan (mis. error sementara)
+
+        Returns:
+            Hasil func() (atau hasil eksekusi pertama)
+        """
+        result = self._results.get(key)
+        if result is not MISSING:
+            with self._lock:
+                self._stats['replayed'] += 1
+            return result
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = _InFlight()
+                self._inflight[key] = flight
+                self._stats['executed'] += 1
+            else:
+                self._stats['joined'] += 1
+
+        if not leader:
+            if not flight.done.wait(self.wait_timeout):
+                # Eksekusi pertama macet: jalan sendiri daripada menggantung
+                return func()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = func()
+            if cacheable is None or cacheable(flight.result):
+                self._results.set(key, flight.result)
+            return flight.result
+        except BaseException as err:
+            flight.error = err
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+            flight.done.set()
+
+    async def run_async(self, key, func, cacheable=None):
+        """
+        Versi asyncio dari run(): func adalah coroutine function.
+        Hasil yang tersimpan dipakai bersama dengan run().
+
+        Args:
+            key: Kunci dedupe
+            func (callable): Coroutine function tanpa argumen
+            cacheable (callable): Predikat hasil yang boleh disimpan
+
+        Returns:
+            Hasil await func() (atau hasil eksekusi pertama)
+        """
+        result = self._results.get(key)
+        if result is not MISSING:
+            with self._lock:
+                self._stats['replayed'] += 1
+            return result
+
+        flight = self._inflight_async.get(key)
+        if flight is not None:
+            with self._lock:
+                self._stats['joined'] += 1
+            return await asyncio.shield(flight)
+
+        flight = asyncio.get_running_loop().create_future()
+        self._inflight_async[key] = flight
+        with self._lock:
+            self._stats['executed'] += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            flight.cancel()
+            raise
+        except Exception as err:
+            flight.set_exception(err)
+            flight.exception()  # ditandai sudah dibaca meski tak ada yang menunggu
+            raise
+        finally:
+            self._inflight_async.pop(key, None)
+        if cacheable is None or cacheable(result):
+            self._results.set(key, result)
+        flight.set_result(result)
+        return result
+
+    def stats(self):
+        """
+        Statistik coalescer
+
+        Returns:
+            dict: executed, joined, replayed, inflight, size
+        """
+        with self._lock:
+            data = dict(self._stats)
+            data['inflight'] = len(self._inflight) + len(self._inflight_async)
+        data['size'] = self._results.stats()['size']
+        data['window'] = self.window
+        return data
@@ -1,20 +1,500 @@
 """
 Database connection utilities
 """
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
 import mysql.connector
+from flask import g, has_app_context
 from mysql.connector import Error
-from config import DB_CONFIG
+from config import DB_BACKEND, DB_CONFIG, DB_POOL_CONFIG, SQLITE_CONFIG
+from utils.query_log import InstrumentedCursor
+
+logger = logging.getLogger('absensi.db')
+
+
+class PoolTimeoutError(Error):
+    """Pool kehabisan koneksi dan waktu tunggu sudah habis"""
+
+
+class PooledConnection:
+    """
+    Proxy koneksi database yang dipinjam dari pool.
+    Memanggil close() mengembalikan koneksi ke pool, bukan menutupnya.
+    """
+
+    def __init__(self, pool, raw_conn):
+        self._pool = pool
+        self._raw = raw_conn
+        self._released = False
+
+    def cursor(self, *args, **kwargs):
+        """Membuat cursor terinstrumentasi dari koneksi asli"""
+        return InstrumentedCursor(self._raw.cursor(*args, **kwargs))
+
+    def commit(self):
+        """Commit transaksi pada koneksi asli"""
+        self._raw.commit()
+
+    def rollback(self):
+        """Rollback transaksi pada koneksi asli"""
+        self._raw.rollback()
+
+    def close(self):
+        """Kembalikan koneksi ke pool (aman dipanggil lebih dari sekali)"""
+        if self._released:
+            return
+        self._released = True
+        self._pool.release(self._raw)
+
+    def __getattr__(self, name):
+        return getattr(self._raw, name)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class ConnectionPool:
+    """
+    Pool koneksi thread-safe dengan overflow, idle timeout,
+    health check saat checkout, dan statistik penggunaan.
+    """
+
+    def __init__(self, connect_fn, pool_size=10, max_overflow=10,
+                 idle_timeout=300, pool_timeout=5, health_check=True):
+        """
+        Args:
+            connect_fn (callable): Fungsi pembuat koneksi baru
+            pool_size (int): Jumlah koneksi idle yang dipertahankan
+            max_overflow (int): Koneksi tambahan di atas pool_size saat burst
+            idle_timeout (int): Koneksi idle lebih lama dari ini (detik) dibuang
+            pool_timeout (float): Lama menunggu koneksi bebas (detik)
+            health_check (bool): Ping koneksi sebelum diberikan ke pemanggil
+        """
+        self._connect_fn = connect_fn
+        self.pool_size = pool_size
+        self.max_overflow = max_overflow
+        self.idle_timeout = idle_timeout
+        self.pool_timeout = pool_timeout
+        self.health_check = health_check
+
+        self._idle = deque()  # (raw_conn, waktu_kembali)
+        self._total = 0
+        self._cond = threading.Condition()
+        self._stats = {
+            'created': 0,
+            'reused': 0,
+            'recycled_idle': 0,
+            'recycled_dead': 0,
+            'waits': 0,
+            'timeouts': 0
+        }
+
+    # ----------------------------------------
+    # Checkout / checkin
+    # ----------------------------------------
+    def acquire(self):
+        """
+        Meminjam koneksi dari pool
+
+        Returns:
+            PooledConnection: Koneksi yang harus di-close() setelah dipakai
+
+        Raises:
+            PoolTimeoutError: Jika tidak ada koneksi bebas dalam pool_timeout
+        """
+        deadline = time.monotonic() + self.pool_timeout
+        while True:
+            expired = []
+            with self._cond:
+                while True:
+                    raw = self._take_idle(expired)
+                    if raw is not None:
+                        break
+                    if self._total < self.pool_size + self.max_overflow:
+                        self._total += 1
+                        break
+
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats['timeouts'] += 1
+                        raise PoolTimeoutError("Pool koneksi database penuh")
+                    self._stats['waits'] += 1
+                    self._cond.wait(remaining)
+
+            # Close dan ping memakai jaringan: di luar lock agar satu
+            # koneksi yang lambat/mati tidak menahan acquire/release lain
+            for old in expired:
+                self._close_quietly(old)
+            if raw is None:
+                break
+            if self.health_check and not self._is_alive(raw):
+                self._discard(raw, 'recycled_dead')
+                continue
+            with self._cond:
+                self._stats['reused'] += 1
+            return PooledConnection(self, raw)
+
+        # Buka koneksi baru di luar lock agar tidak memblokir thread lain
+        try:
+            raw = self._connect_fn()
+        except Exception:
+            with self._cond:
+                self._total -= 1
+                self._cond.notify()
+            raise
+        with self._cond:
+            self._stats['created'] += 1
+        return PooledConnection(self, raw)
+
+    def release(self, raw):
+        """
+        Mengembalikan koneksi ke pool
+
+        Args:
+            raw: Koneksi asli yang dipinjam lewat acquire()
+        """
+        try:
+            # Jangan biarkan transaksi menggantung ke peminjam berikutnya
+            raw.rollback()
+        except Exception:  # pylint: disable=broad-except
+            self._discard(raw, 'recycled_dead')
+            return
+
+        with self._cond:
+            if len(self._idle) < self.pool_size:
+                self._idle.append((raw, time.monotonic()))
+                self._cond.notify()
+                return
+        self._discard(raw)
+
+    def _take_idle(self, expired):
+        """
+        Ambil koneksi idle terbaru (dipanggil dengan lock). Koneksi yang
+        melewati idle_timeout dipindah ke expired untuk ditutup di luar lock.
+        """
+        now = time.monotonic()
+        while self._idle:
+            raw, returned_at = self._idle.pop()
+            if self.idle_timeout and now - returned_at > self.idle_timeout:
+                expired.append(raw)
+                self._total -= 1
+                self._stats['recycled_idle'] += 1
+                continue
+            return raw
+        return None
+
+    def _discard(self, raw, stat=None):
+        self._close_quietly(raw)
+        with self._cond:
+            self._total -= 1
+            if stat:
+                self._stats[stat] += 1
+            self._cond.notify()
+
+    @staticmethod
+    def _is_alive(raw):
+        is_connected = getattr(raw, 'is_connected', None)
+        if is_connected is None:
+            return True
+        try:
+            return is_connected()
+        except Exception:  # pylint: disable=broad-except
+            return False
+
+    @staticmethod
+    def _close_quietly(raw):
+        try:
+            raw.close()
+        except Exception:  # pylint: disable=broad-except
+            pass
+
+    # ----------------------------------------
+    # Maintenance
+    # ----------------------------------------
+    def stats(self):
+        """
+        Statistik pool saat ini
+
+        Returns:
+            dict: Jumlah koneksi total, idle, dipinjam, dan counter lainnya
+        """
+        with self._cond:
+            data = dict(self._stats)
+            data.update({
+                'pool_size': self.pool_size,
+                'max_overflow': self.max_overflow,
+                'total': self._total,
+                'idle': len(self._idle),
+                'checked_out': self._total - len(self._idle)
+            })
+            return data
+
+    def dispose(self):
+        """Menutup semua koneksi idle"""
+        with self._cond:
+            idle = list(self._idle)
+            self._idle.clear()
+            self._total -= len(idle)
+        for raw, _ in idle:
+            self._close_quietly(raw)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+# Backend aktif; default dari config.py, bisa diganti lewat use_backend()
+_backend = {
+    'name': DB_BACKEND,
+    'mysql': DB_CONFIG,
+    'sqlite': SQLITE_CONFIG
+}
+
+
+def get_dialect():
+    """
+    Backend database yang aktif
+
+    Returns:
+        str: 'mysql' atau 'sqlite'
+    """
+    return _backend['name']
+
+
+def get_connection_options():
+    """
+    Opsi koneksi backend yang aktif (dipakai driver async)
+
+    Returns:
+        dict: Salinan opsi koneksi (mis. DB_CONFIG untuk MySQL)
+    """
+    return dict(_backend[_backend['name']])
+
+
+def use_backend(name, **options):
+    """
+    Mengganti backend database saat runtime (test, benchmark, load test).
+    Pool lama ditutup; koneksi berikutnya memakai backend baru.
+
+    Args:
+        name (str): 'mysql' atau 'sqlite'
+        **options: Opsi koneksi pengganti (mis. database=':memory:')
+    """
+    global _pool  # pylint: disable=global-statement
+    if name not in ('mysql', 'sqlite'):
+        raise ValueError(f"Backend database tidak dikenal: {name}")
+    with _pool_lock:
+        if _pool is not None:
+            _pool.dispose()
+            _pool = None
+        _backend['name'] = name
+        if options:
+            _backend[name] = dict(_backend[name], **options)
+
+
+def open_connection():
+    """
+    Membuka koneksi baru (tanpa pool) ke backend yang dikonfigurasi
+
+    Returns:
+        Koneksi mysql.connector atau SQLiteConnection
+    """
+    if _backend['name'] == 'sqlite':
+        # Import lokal: backend SQLite hanya dimuat jika dipakai
+        from utils import sqlite_backend  # pylint: disable=import-outside-toplevel
+        return sqlite_backend.connect(**_backend['sqlite'])
+    return mysql.connector.connect(**_backend['mysql'])
+
+
+def get_pool():
+    """
+    Mengambil pool koneksi global (dibuat saat pertama kali dipakai)
+
+    Returns:
+        ConnectionPool: Pool koneksi database
+    """
+    global _pool  # pylint: disable=global-statement
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(open_connection, **DB_POOL_CONFIG)
+    return _pool
+
+
+def get_pool_stats():
+    """
+    Statistik pool koneksi global
+
+    Returns:
+        dict: Statistik pool (lihat ConnectionPool.stats)
+    """
+    return get_pool().stats()
+
+
+class RequestConnection:
+    """
+    Proxy koneksi request-scoped yang disimpan di flask.g.
+
+    Semua service dalam satu request berbagi koneksi ini. Koneksi baru
+    dipinjam dari pool saat pertama kali dibutuhkan. close() tidak
+    melakukan apa-apa (koneksi dilepas saat teardown_appcontext), dan
+    commit() ditunda selama berada di dalam blok transaction().
+    """
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = None
+        self.tx_depth = 0
+        self.after_commit = []  # callback run_after_commit() milik transaksi ini
+
+    @property
+    def connection(self):
+        """Koneksi pool milik request (dipinjam saat pertama dipakai)"""
+        if self._conn is None:
+            self._conn = self._pool.acquire()
+        return self._conn
+
+    def cursor(self, *args, **kwargs):
+        """Membuat cursor dari koneksi request"""
+        return self.connection.cursor(*args, **kwargs)
+
+    def commit(self):
+        """Commit, kecuali sedang di dalam transaction() (ditunda)"""
+        if self.tx_depth == 0 and self._conn is not None:
+            self._conn.commit()
+
+    def rollback(self):
+        """Rollback transaksi yang sedang berjalan"""
+        self.after_commit.clear()
+        if self._conn is not None:
+            self._conn.rollback()
+
+    def close(self):
+        """No-op: koneksi dikembalikan ke pool saat teardown"""
+
+    def release(self):
+        """Kembalikan koneksi ke pool (dipanggil saat teardown)"""
+        self.after_commit.clear()
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def __getattr__(self, name):
+        return getattr(self.connection, name)
+
+
+def _get_request_connection(eager=True):
+    """
+    Ambil proxy koneksi milik app context saat ini
+
+    Args:
+        eager (bool): Langsung pinjam koneksi dari pool. transaction()
+            memakai False agar request yang tidak menyentuh database
+            (mis. token dari cache) tidak memakan koneksi.
+    """
+    conn = g.get('_db_conn')
+    if conn is None:
+        conn = RequestConnection(get_pool())
+        g._db_conn = conn
+    if eager:
+        conn.connection  # pylint: disable=pointless-statement
+    return conn
+
+
+def _acquire():
+    if has_app_context():
+        return _get_request_connection()
+    return get_pool().acquire()
+
+
+@contextmanager
+def transaction():
+    """
+    Menjalankan beberapa operasi service dalam satu transaksi
+    pada satu koneksi (request-scoped).
+
+    Commit dilakukan sekali di akhir blok; jika terjadi exception
+    seluruh perubahan di-rollback. Blok bisa bersarang.
+
+    Yields:
+        RequestConnection: Koneksi yang dipakai bersama oleh service
+    """
+    conn = _get_request_connection(eager=False)
+    conn.tx_depth += 1
+    try:
+        yield conn
+    except BaseException:
+        conn.tx_depth -= 1
+        if conn.tx_depth == 0:
+            conn.rollback()
+        raise
+    conn.tx_depth -= 1
+    if conn.tx_depth == 0:
+        conn.commit()
+        callbacks, conn.after_commit = conn.after_commit, []
+        for callback in callbacks:
+            _run_callback(callback)
+
+
+def run_after_commit(callback):
+    """
+    Menjalankan callback setelah transaksi saat ini ter-commit.
+
+    Di dalam transaction() callback ditunda sampai commit (dan dibuang
+    jika rollback); di luar transaksi service sudah commit sendiri,
+    sehingga callback langsung dijalankan. Error callback hanya dicatat:
+    data sudah tersimpan dan request tidak boleh gagal karenanya.
+
+    Args:
+        callback (callable): Fungsi tanpa argumen (mis. publish event)
+    """
+    conn = g.get('_db_conn') if has_app_context() else None
+    if conn is not None and conn.tx_depth > 0:
+        conn.after_commit.append(callback)
+    else:
+        _run_callback(callback)
+
+
+def _run_callback(callback):
+    try:
+        callback()
+    except Exception:  # pylint: disable=broad-except
+        logger.exception("Callback after-commit gagal")
+
+
+def _teardown_connection(_exc):
+    conn = g.pop('_db_conn', None)
+    if conn is not None:
+        # Perubahan yang tidak di-commit tidak boleh bocor ke request lain
+        conn.release()
+
+
+def init_app(app):
+    """
+    Mendaftarkan teardown koneksi request-scoped ke Flask app
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    app.teardown_appcontext(_teardown_connection)
 
 
 def connect_db():
     """
-    Membuat koneksi ke database MySQL
-    
+    Membuat koneksi ke database (dari pool).
+    Di dalam app context, koneksi dipakai bersama selama request.
+
     Returns:
-        mysql.connector.connection: Database connection object
+        PooledConnection or RequestConnection: Database connection object
     """
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return _acquire()
     except Error as err:
         print(f"Error connecting to database: {err}")
         raise
@@ -24,12 +504,12 @@ def get_db_connection():
     """
     Fungsi alternatif untuk mendapatkan koneksi database
     Mengembalikan None jika koneksi gagal
-    
+
     Returns:
-        mysql.connector.connection or None: Database connection object or None
+        PooledConnection or RequestConnection or None: Connection atau None
     """
     try:
-        return mysql.connector.connect(**DB_CONFIG)
+        return _acquire()
     except Error as err:
         print(f"Error connecting to MySQL: {err}")
         return None
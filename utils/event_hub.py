@@ -0,0 +1,256 @@
+"""
+Fan-out event in-process untuk Server-Sent Events (live feed dashboard)
+
+Satu publish per event; hub meneruskannya ke buffer setiap subscriber
+dengan kunci yang sama (mis. username guru). Buffer dibatasi: client
+yang lambat kehilangan event terlama dan diberi tanda untuk resync,
+bukan membuat publisher ikut menunggu.
+"""
+import asyncio
+import json
+import threading
+from collections import deque
+
+
+class HubFullError(Exception):
+    """Jumlah subscriber sudah mencapai batas"""
+
+
+class Subscription:
+    """Buffer event milik satu client (satu koneksi SSE)"""
+
+    def __init__(self, hub, key, buffer_size):
+        self.hub = hub
+        self.key = key
+        self._buffer = deque()
+        self._buffer_size = buffer_size
+        self._lock = threading.Lock()
+        self._ready = threading.Event()
+        self._async_ready = None  # (event loop, asyncio.Event) untuk get_async
+        self._overflowed = False
+
+    def push(self, event):
+        """
+        Tambahkan event ke buffer (dipanggil hub, thread mana pun)
+
+        Returns:
+            bool: False jika event terlama dibuang karena buffer penuh
+        """
+        with self._lock:
+            dropped = len(self._buffer) >= self._buffer_size
+            if dropped:
+                self._buffer.popleft()
+                self._overflowed = True
+            self._buffer.append(event)
+            self._ready.set()
+            if self._async_ready is not None:
+                loop, ready = self._async_ready
+                loop.call_soon_threadsafe(ready.set)
+        return not dropped
+
+    def _drain(self):
+        with self._lock:
+            events = list(self._buffer)
+            self._buffer.clear()
+            overflowed, self._overflowed = self._overflowed, False
+            self._ready.clear()
+        return events, overflowed
+
+    def get(self, timeout):
+        """
+        Tunggu event (blocking, untuk route WSGI)
+
+        Args:
+            timeout (float): Batas menunggu (detik), mis. interval heartbeat
+
+        Returns:
+            tuple: (events, overflowed) - list kosong jika timeout;
+                overflowed True jika ada event yang terbuang
+        """
+        if not self._ready.wait(timeout):
+            return [], False
+        return self._drain()
+
+    async def get_async(self, timeout):
+        """
+        Versi asyncio dari get() (untuk route ASGI native)
+
+        Returns:
+            tuple: (events, overflowed)
+        """
+        if self._async_ready is None:
+            with self._lock:
+                self._async_ready = (asyncio.get_running_loop(), asyncio.Event())
+        ready = self._async_ready[1]
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return [], False
+        ready.clear()
+        return self._drain()
+
+    def close(self):
+        """Lepas dari hub (dipanggil saat koneksi client selesai)"""
+        self.hub.unsubscribe(self)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class EventHub:
+    """Registry subscriber per kunci + publish fan-out"""
+
+    def __init__(self, buffer_size=100, max_subscribers=200):
+        """
+        Args:
+            buffer_size (int): Event maksimum yang ditahan per client
+            max_subscribers (int): Koneksi maksimum untuk seluruh hub
+        """
+        self.buffer_size = buffer_size
+        self.max_subscribers = max_subscribers
+        self._subscribers = {}  # key -> set(Subscription)
+        self._count = 0
+        self._lock = threading.Lock()
+        self._stats = {'published': 0, 'delivered': 0, 'dropped': 0, 'rejected': 0}
+
+    def subscribe(self, key):
+        """
+        Daftarkan client baru untuk event dengan kunci tertentu
+
+        Args:
+            key: Kunci filter (mis. username guru)
+
+        Returns:
+            Subscription: Buffer milik client
+
+        Raises:
+            HubFullError: Batas max_subscribers tercapai
+        """
+        with self._lock:
+            if self._count >= self.max_subscribers:
+                self._stats['rejected'] += 1
+                raise HubFullError('Terlalu banyak koneksi live')
+            subscription = Subscription(self, key, self.buffer_size)
+            self._subscribers.setdefault(key, set()).add(subscription)
+            self._count += 1
+        return subscription
+
+    def unsubscribe(self, subscription):
+        """Hapus subscriber (aman dipanggil berulang)"""
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.key)
+            if subscribers is None or subscription not in subscribers:
+                return
+            subscribers.discard(subscription)
+            if not subscribers:
+                del self._subscribers[subscription.key]
+            self._count -= 1
+
+    def has_subscribers(self, key):
+        """
+        Cek apakah ada client untuk kunci ini (agar publisher bisa
+        melewati pekerjaan menyiapkan event yang tidak ditunggu siapa pun)
+
+        Returns:
+            bool: True jika ada minimal satu subscriber
+        """
+        with self._lock:
+            return key in self._subscribers
+
+    def publish(self, key, event):
+        """
+        Kirim event ke semua subscriber dengan kunci yang sama
+
+        Args:
+            key: Kunci filter
+            event (dict): Data event (harus bisa di-serialize JSON)
+
+        Returns:
+            int: Jumlah subscriber yang menerima
+        """
+        with self._lock:
+            subscribers = list(self._subscribers.get(key, ()))
+            self._stats['published'] += 1
+        dropped = sum(1 for subscription in subscribers if not subscription.push(event))
+        with self._lock:
+            self._stats['delivered'] += len(subscribers)
+            self._stats['dropped'] += dropped
+        return len(subscribers)
+
+    def stats(self):
+        """
+        Statistik hub
+
+        Returns:
+            dict: subscribers, keys, published, delivered, dropped, rejected
+        """
+        with self._lock:
+            data = dict(self._stats)
+            data['subscribers'] = self._count
+            data['keys'] = len(self._subscribers)
+        return data
+
+
+def format_sse(event, data, event_id=None):
+    """
+    Format satu pesan Server-Sent Events
+
+    Args:
+        event (str): Nama event
+        data: Data (di-serialize JSON)
+        event_id: ID event opsional (Last-Event-ID saat reconnect)
+
+    Returns:
+        str: Pesan SSE lengkap dengan baris kosong penutup
+    """
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return '\n'.join(lines) + '\n\n'
+
+
+def format_sse_batch(events, overflowed):
+    """
+    Pesan SSE untuk hasil Subscription.get(): event absensi, 'resync' jika
+    ada event terbuang, atau komentar heartbeat jika tidak ada apa-apa
+
+    Returns:
+        str: Chunk yang dikirim ke client
+    """
+    if not events and not overflowed:
+        return ': ping\n\n'
+    chunk = format_sse('resync', {}) if overflowed else ''
+    for event in events:
+        chunk += format_sse('absensi', event, event.get('id_absen'))
+    return chunk
+
+
+_hub = EventHub()
+
+
+def configure_event_hub(buffer_size=100, max_subscribers=200):
+    """
+    Atur batas hub (dipanggil sekali saat aplikasi dibuat)
+
+    Returns:
+        EventHub: Hub global
+    """
+    _hub.buffer_size = buffer_size
+    _hub.max_subscribers = max_subscribers
+    return _hub
+
+
+def get_event_hub():
+    """
+    Hub global milik proses ini
+
+    Returns:
+        EventHub: Hub global
+    """
+    return _hub
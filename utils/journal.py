@@ -0,0 +1,319 @@
+"""
+Journal append-only lokal untuk scan absensi
+
+Scan ditulis ke file JSON-lines dan di-fsync secara berkelompok
+(group commit): penulis yang datang bersamaan berbagi satu fsync.
+Replayer membaca dari offset checkpoint dan menerapkan entri ke
+database; checkpoint hanya maju setelah batch berhasil ditulis. Entri
+yang ditolak database (bukan karena database tidak terjangkau) dipindah
+ke file dead-letter agar tidak memblokir entri sesudahnya.
+Satu file journal hanya boleh dipakai satu proses (flock).
+"""
+import json
+import logging
+import os
+import threading
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: tanpa lock antar proses
+    fcntl = None
+
+logger = logging.getLogger('absensi.journal')
+
+
+class JournalLockedError(RuntimeError):
+    """File journal sedang dipakai proses lain"""
+
+
+class ScanJournal:
+    """File journal append-only dengan fsync berkelompok"""
+
+    def __init__(self, path):
+        """
+        Args:
+            path (str): Path file journal (checkpoint disimpan di path + '.offset',
+                entri yang gagal diterapkan di path + '.dead')
+        """
+        self.path = path
+        self.checkpoint_path = path + '.offset'
+        self.dead_letter_path = path + '.dead'
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+        self._file = open(path, 'ab')  # pylint: disable=consider-using-with
+        self._write_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        self._written = 0  # nomor urut entri terakhir yang ditulis
+        self._synced = 0   # nomor urut entri terakhir yang sudah di-fsync
+        self._stats = {'appended': 0, 'fsyncs': 0}
+
+    def lock(self):
+        """
+        Mengunci file journal untuk proses ini (dilepas saat close()).
+        Dua proses yang menulis dan men-truncate journal yang sama akan
+        saling merusak offset, jadi proses kedua ditolak.
+
+        Raises:
+            JournalLockedError: Journal dipakai proses lain
+        """
+        if fcntl is None:
+            logger.warning("fcntl tidak tersedia; journal %s tidak dikunci", self.path)
+            return
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError as err:
+            raise JournalLockedError(
+                f"Journal {self.path} dipakai proses lain; "
+                "pakai SCAN_JOURNAL_PATH berbeda per proses"
+            ) from err
+
+    def append(self, record):
+        """
+        Menulis satu entri dan menunggu sampai durable di disk
+
+        Args:
+            record (dict): Data entri (harus bisa di-serialize ke JSON)
+        """
+        line = (json.dumps(record, separators=(',', ':')) + '\n').encode('utf-8')
+        with self._write_lock:
+            self._file.write(line)
+            self._written += 1
+            seq = self._written
+            self._stats['appended'] += 1
+        self._sync_upto(seq)
+
+    def _sync_upto(self, seq):
+        with self._sync_lock:
+            # Penulis lain mungkin sudah melakukan fsync yang mencakup entri ini
+            if self._synced >= seq:
+                return
+            with self._write_lock:
+                self._file.flush()
+                target = self._written
+            os.fsync(self._file.fileno())
+            self._synced = target
+            self._stats['fsyncs'] += 1
+
+    # ----------------------------------------
+    # Checkpoint & baca ulang
+    # ----------------------------------------
+    def read_checkpoint(self):
+        """
+        Offset byte entri pertama yang belum diterapkan
+
+        Returns:
+            int: Offset checkpoint
+        """
+        try:
+            with open(self.checkpoint_path, 'r', encoding='utf-8') as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def write_checkpoint(self, offset):
+        """Simpan offset checkpoint secara atomik"""
+        tmp_path = self.checkpoint_path + '.tmp'
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            f.write(str(offset))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def read_from(self, offset, limit):
+        """
+        Membaca entri lengkap mulai dari offset
+
+        Args:
+            offset (int): Offset byte awal
+            limit (int): Jumlah entri maksimum
+
+        Returns:
+            tuple: (list entri, offset setelah entri terakhir)
+        """
+        records = []
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while len(records) < limit:
+                line = f.readline()
+                # Baris tanpa newline berarti masih ditulis; baca lain kali
+                if not line or not line.endswith(b'\n'):
+                    break
+                offset += len(line)
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    logger.error("Entri journal rusak di offset %d dilewati", offset - len(line))
+        return records, offset
+
+    def dead_letter(self, record, error):
+        """
+        Simpan entri yang tidak bisa diterapkan ke file dead-letter
+        (JSON-lines, di-fsync) untuk diperiksa manual
+
+        Args:
+            record (dict): Entri journal
+            error (Exception): Error saat entri diterapkan
+        """
+        line = json.dumps(
+            {'record': record, 'error': repr(error), 'ts': time.time()},
+            separators=(',', ':'), default=str
+        ) + '\n'
+        with open(self.dead_letter_path, 'a', encoding='utf-8') as f:
+            f.write(line)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def size(self):
+        """Ukuran file journal dalam byte"""
+        return os.path.getsize(self.path)
+
+    def truncate_if_applied(self, offset):
+        """
+        Mengosongkan journal jika semua entri sudah diterapkan.
+        Checkpoint 0 ditulis (fsync) lebih dulu: crash sebelum truncate
+        hanya membuat entri diterapkan ulang (idempotent), bukan offset
+        yang menunjuk melewati akhir file kosong.
+
+        Args:
+            offset (int): Offset checkpoint saat ini
+
+        Returns:
+            bool: True jika journal dikosongkan
+        """
+        with self._write_lock:
+            self._file.flush()
+            if os.path.getsize(self.path) != offset:
+                return False
+            self.write_checkpoint(0)
+            self._file.truncate(0)
+            os.fsync(self._file.fileno())
+            return True
+
+    def stats(self):
+        """Statistik penulisan journal"""
+        with self._write_lock:
+            return dict(self._stats)
+
+    def close(self):
+        """Tutup file journal"""
+        with self._write_lock:
+            self._file.close()
+
+
+class JournalReplayer:
+    """
+    Menerapkan entri journal ke database secara idempotent.
+
+    Error yang termasuk transient_errors (database tidak terjangkau)
+    menahan checkpoint dan dicoba lagi di replay berikutnya. Batch yang
+    gagal karena error lain diterapkan ulang satu per satu; entri yang
+    tetap gagal dipindah ke dead-letter lalu checkpoint maju.
+    """
+
+    def __init__(self, journal, apply_batch, batch_size=500, compact_bytes=1024 * 1024,
+                 transient_errors=(OSError,)):
+        """
+        Args:
+            journal (ScanJournal): Journal sumber
+            apply_batch (callable): Penulis batch entri ke database (idempotent)
+            batch_size (int): Entri per batch
+            compact_bytes (int): Journal dikosongkan setelah lewat ukuran ini
+                dan semua entri sudah diterapkan
+            transient_errors (tuple): Exception yang berarti database belum
+                bisa dijangkau (entri tidak dipindah ke dead-letter)
+        """
+        self.journal = journal
+        self.apply_batch = apply_batch
+        self.batch_size = batch_size
+        self.compact_bytes = compact_bytes
+        self.transient_errors = tuple(transient_errors)
+        self._lock = threading.Lock()
+        self._stats = {
+            'replayed': 0,
+            'batches': 0,
+            'errors': 0,
+            'dead_letter': 0,
+            'last_error': None,
+            'last_replay_at': None,
+            'oldest_pending_at': None
+        }
+
+    def _apply_each(self, records):
+        """
+        Terapkan entri satu per satu; entri yang ditolak ke dead-letter
+
+        Returns:
+            int: Jumlah entri yang dipindah ke dead-letter
+        """
+        dead = 0
+        for record in records:
+            try:
+                self.apply_batch([record])
+            except self.transient_errors:
+                raise
+            except Exception as err:  # pylint: disable=broad-except
+                self.journal.dead_letter(record, err)
+                dead += 1
+                self._stats['dead_letter'] += 1
+                logger.error("Entri journal dipindah ke dead-letter: %s (%r)", record, err)
+        return dead
+
+    def replay(self):
+        """
+        Menerapkan semua entri yang belum diterapkan (berhenti saat
+        database tidak terjangkau)
+
+        Returns:
+            int: Jumlah entri yang diterapkan pada pemanggilan ini
+        """
+        with self._lock:
+            offset = self.journal.read_checkpoint()
+            applied = 0
+            while True:
+                records, next_offset = self.journal.read_from(offset, self.batch_size)
+                if not records:
+                    self._stats['oldest_pending_at'] = None
+                    break
+                self._stats['oldest_pending_at'] = records[0].get('ts')
+                dead = 0
+                try:
+                    try:
+                        self.apply_batch(records)
+                    except self.transient_errors:
+                        raise
+                    except Exception as err:  # pylint: disable=broad-except
+                        # Ada entri yang ditolak: pisahkan dari entri yang valid
+                        self._stats['errors'] += 1
+                        self._stats['last_error'] = str(err)
+                        dead = self._apply_each(records)
+                except self.transient_errors as err:
+                    # Database belum bisa dijangkau: checkpoint tidak maju
+                    self._stats['errors'] += 1
+                    self._stats['last_error'] = str(err)
+                    logger.warning("Replay journal tertunda: %s", err)
+                    break
+                self.journal.write_checkpoint(next_offset)
+                offset = next_offset
+                applied += len(records) - dead
+                self._stats['replayed'] += len(records) - dead
+                self._stats['batches'] += 1
+                self._stats['last_replay_at'] = time.time()
+
+            if offset >= self.compact_bytes:
+                self.journal.truncate_if_applied(offset)
+            return applied
+
+    def stats(self):
+        """
+        Metrik lag journal
+
+        Returns:
+            dict: lag_bytes, lag_seconds, replayed, errors, dead_letter, ...
+        """
+        data = dict(self._stats)
+        data.update(self.journal.stats())
+        data['lag_bytes'] = max(self.journal.size() - self.journal.read_checkpoint(), 0)
+        oldest = data['oldest_pending_at']
+        data['lag_seconds'] = round(time.time() - oldest, 3) if oldest and data['lag_bytes'] else 0
+        return data
@@ -0,0 +1,38 @@
+"""
+Registry metrik runtime (pool koneksi, cache, antrian, dll.)
+"""
+import threading
+
+_providers = {}
+_lock = threading.Lock()
+
+
+def register_metrics_provider(name, provider):
+    """
+    Mendaftarkan fungsi penyedia metrik
+
+    Args:
+        name (str): Nama bagian metrik (mis. 'db_pool')
+        provider (callable): Fungsi tanpa argumen yang mengembalikan dict
+    """
+    with _lock:
+        _providers[name] = provider
+
+
+def collect_metrics():
+    """
+    Mengumpulkan metrik dari semua provider terdaftar
+
+    Returns:
+        dict: {nama_bagian: dict metrik}
+    """
+    with _lock:
+        providers = dict(_providers)
+
+    result = {}
+    for name, provider in providers.items():
+        try:
+            result[name] = provider()
+        except Exception as err:  # pylint: disable=broad-except
+            result[name] = {'error': str(err)}
+    return result
@@ -0,0 +1,60 @@
+"""
+Cursor keyset pagination untuk daftar absensi (waktu_absen, id_absen)
+"""
+import base64
+from datetime import datetime
+
+
+def encode_cursor(waktu, row_id):
+    """
+    Membuat cursor opaque dari baris terakhir sebuah halaman
+
+    Args:
+        waktu (datetime): waktu_absen baris terakhir
+        row_id (int): id_absen baris terakhir
+
+    Returns:
+        str: Cursor (base64 URL-safe)
+    """
+    raw = f"{waktu.replace(tzinfo=None).isoformat(' ')}|{int(row_id)}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """
+    Membaca cursor dari encode_cursor
+
+    Args:
+        cursor (str): Cursor dari client
+
+    Returns:
+        tuple: (waktu, row_id)
+
+    Raises:
+        ValueError: Jika cursor rusak
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        waktu, row_id = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.fromisoformat(waktu), int(row_id)
+    except (ValueError, UnicodeDecodeError) as err:
+        raise ValueError("Cursor tidak valid") from err
+
+
+def clamp_page_size(value, default, maximum):
+    """
+    Ukuran halaman dari query string, dibatasi [1, maximum]
+
+    Args:
+        value (str): Nilai parameter limit (boleh None)
+        default (int): Ukuran jika tidak diisi / tidak valid
+        maximum (int): Batas atas
+
+    Returns:
+        int: Ukuran halaman
+    """
+    try:
+        size = int(value) if value is not None else default
+    except ValueError:
+        size = default
+    return max(1, min(size, maximum))
@@ -0,0 +1,101 @@
+"""
+Render QR code di memori dengan cache LRU per token
+"""
+import base64
+import io
+
+import qrcode
+
+from utils.cache import MISSING, TTLCache
+
+_png_cache = TTLCache(maxsize=256)
+
+
+def configure_qr_cache(maxsize):
+    """
+    Mengatur ukuran maksimum cache PNG QR
+
+    Args:
+        maxsize (int): Jumlah gambar QR yang disimpan
+    """
+    _png_cache.maxsize = maxsize
+
+
+def render_qr_png(data):
+    """
+    Render data menjadi PNG QR code (tanpa menulis ke disk)
+
+    Args:
+        data (str): Isi QR code (token)
+
+    Returns:
+        bytes: Gambar PNG
+    """
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    img = qr.make_image(fill_color="black", back_color="white")
+    bio = io.BytesIO()
+    img.save(bio, format='PNG')
+    return bio.getvalue()
+
+
+def get_qr_png(token, ttl=None):
+    """
+    Ambil PNG QR untuk token dari cache, render jika belum ada
+
+    Args:
+        token (str): Token QR
+        ttl (float): Lama gambar disimpan di cache (detik), biasanya TTL token
+
+    Returns:
+        bytes: Gambar PNG
+    """
+    png = _png_cache.get(token)
+    if png is MISSING:
+        png = render_qr_png(token)
+        _png_cache.set(token, png, ttl)
+    return png
+
+
+def get_cached_qr_png(token):
+    """
+    Ambil PNG QR dari cache saja (tanpa render)
+
+    Args:
+        token (str): Token QR
+
+    Returns:
+        bytes or None: Gambar PNG atau None jika tidak ada di cache
+    """
+    png = _png_cache.get(token)
+    return None if png is MISSING else png
+
+
+def to_data_uri(png):
+    """
+    Ubah PNG menjadi data URI untuk ditampilkan inline di <img>
+
+    Args:
+        png (bytes): Gambar PNG
+
+    Returns:
+        str: data:image/png;base64,...
+    """
+    return 'data:image/png;base64,' + base64.b64encode(png).decode('ascii')
+
+
+def get_qr_cache_stats():
+    """
+    Statistik cache PNG QR
+
+    Returns:
+        dict: Statistik TTLCache
+    """
+    return _png_cache.stats()
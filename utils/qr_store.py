@@ -0,0 +1,154 @@
+"""
+Penyimpanan file QR di static/qrcodes dengan batas umur dan ukuran
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from utils.cache import MISSING, TTLCache
+
+logger = logging.getLogger('absensi.qr_store')
+
+
+class QRFileStore:
+    """
+    Mengelola folder file QR: cleanup berdasarkan umur dan total ukuran,
+    serta lookup cepat untuk file yang sudah dihapus (410) atau tidak
+    pernah ada (404) tanpa menyentuh filesystem berulang kali.
+    """
+
+    def __init__(self, directory, max_age_seconds=86400, max_bytes=50 * 1024 * 1024,
+                 remember_evicted=10000, negative_ttl=60):
+        """
+        Args:
+            directory (str): Folder file QR
+            max_age_seconds (int): File lebih tua dari ini dihapus
+            max_bytes (int): Budget total ukuran folder; file terlama dihapus dulu
+            remember_evicted (int): Jumlah nama file terhapus yang diingat (410)
+            negative_ttl (float): Lama mengingat file yang tidak ada (detik)
+        """
+        self.directory = directory
+        self.max_age_seconds = max_age_seconds
+        self.max_bytes = max_bytes
+        self.remember_evicted = remember_evicted
+        self._evicted = OrderedDict()
+        self._missing = TTLCache(maxsize=remember_evicted, default_ttl=negative_ttl)
+        self._lock = threading.Lock()
+        self._stats = {'runs': 0, 'removed': 0, 'bytes_freed': 0, 'total_bytes': 0, 'files': 0}
+
+    def _remember_evicted(self, name):
+        with self._lock:
+            self._evicted[name] = True
+            self._evicted.move_to_end(name)
+            while len(self._evicted) > self.remember_evicted:
+                self._evicted.popitem(last=False)
+
+    def _scan(self):
+        entries = []
+        try:
+            with os.scandir(self.directory) as iterator:
+                for entry in iterator:
+                    if entry.is_file() and entry.name.endswith('.png'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.name))
+        except FileNotFoundError:
+            pass
+        return entries
+
+    def _remove(self, name):
+        try:
+            os.remove(os.path.join(self.directory, name))
+        except FileNotFoundError:
+            pass
+        self._remember_evicted(name)
+
+    def cleanup(self):
+        """
+        Hapus file yang melewati umur maksimum, lalu file terlama
+        sampai total ukuran di bawah budget
+
+        Returns:
+            dict: removed, bytes_freed, total_bytes, files
+        """
+        now = time.time()
+        entries = sorted(self._scan())  # terlama dulu
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        freed = 0
+
+        keep = []
+        for mtime, size, name in entries:
+            if self.max_age_seconds and now - mtime > self.max_age_seconds:
+                self._remove(name)
+                removed += 1
+                freed += size
+                total -= size
+            else:
+                keep.append((mtime, size, name))
+
+        for mtime, size, name in keep:
+            if not self.max_bytes or total <= self.max_bytes:
+                break
+            self._remove(name)
+            removed += 1
+            freed += size
+            total -= size
+
+        result = {
+            'removed': removed,
+            'bytes_freed': freed,
+            'total_bytes': total,
+            'files': len(entries) - removed
+        }
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['removed'] += removed
+            self._stats['bytes_freed'] += freed
+            self._stats['total_bytes'] = total
+            self._stats['files'] = result['files']
+        if removed:
+            logger.info("QR cleanup: removed=%d freed=%d bytes", removed, freed)
+        return result
+
+    def lookup(self, filename):
+        """
+        Cari file QR
+
+        Args:
+            filename (str): Nama file
+
+        Returns:
+            tuple: (status, path) dengan status 'ok', 'gone' (sudah dihapus
+                cleanup) atau 'missing' (tidak ada)
+        """
+        name = os.path.basename(filename)
+        if name != filename or not name.endswith('.png'):
+            return 'missing', None
+
+        with self._lock:
+            if name in self._evicted:
+                return 'gone', None
+        if self._missing.get(name) is not MISSING:
+            return 'missing', None
+
+        path = os.path.join(self.directory, name)
+        if not os.path.isfile(path):
+            self._missing.set(name, True)
+            return 'missing', None
+        return 'ok', path
+
+    def stats(self):
+        """
+        Statistik cleanup
+
+        Returns:
+            dict: Total run, file dihapus, byte dibebaskan, ukuran saat ini
+        """
+        with self._lock:
+            data = dict(self._stats)
+            data['evicted_remembered'] = len(self._evicted)
+        data['max_age_seconds'] = self.max_age_seconds
+        data['max_bytes'] = self.max_bytes
+        return data
@@ -0,0 +1,226 @@
+"""
+Instrumentasi SQL: timing per query, slow-query log, dan total per request
+"""
+import logging
+import re
+import sys
+import threading
+import time
+
+from flask import g, has_app_context
+
+slow_query_logger = logging.getLogger('absensi.sql.slow')
+request_logger = logging.getLogger('absensi.sql.request')
+
+# Batas default, ditimpa oleh init_app() dari config Flask
+_settings = {
+    'slow_query_ms': 200.0,
+    'log_requests': False,
+    'max_statements': 500
+}
+
+_stats = {}
+_stats_lock = threading.Lock()
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_RE = re.compile(r"'(?:[^'\\]|\\.)*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_IN_LIST_RE = re.compile(r'\(\s*(?:%s|\?)(?:\s*,\s*(?:%s|\?))+\s*\)')
+
+
+def normalize_sql(sql):
+    """
+    Menormalkan teks SQL agar query sejenis dikelompokkan bersama
+
+    Literal string/angka diganti '?', whitespace dirapatkan, dan daftar
+    placeholder IN (...) dipendekkan.
+
+    Args:
+        sql (str): Teks SQL asli
+
+    Returns:
+        str: Teks SQL ternormalisasi
+    """
+    if isinstance(sql, (bytes, bytearray)):
+        sql = sql.decode('utf-8', 'replace')
+    text = _WHITESPACE_RE.sub(' ', str(sql)).strip()
+    text = _STRING_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = text.replace('%s', '?')
+    return _IN_LIST_RE.sub('(?, ...)', text)
+
+
+def _find_caller():
+    """Cari fungsi service (modul services.*) yang menjalankan query"""
+    frame = sys._getframe(2)  # pylint: disable=protected-access
+    while frame is not None:
+        module = frame.f_globals.get('__name__', '')
+        if module.startswith('services.'):
+            return f"{module}.{frame.f_code.co_name}"
+        frame = frame.f_back
+    return 'unknown'
+
+
+def record_query(sql, duration_ms, rows, caller):
+    """
+    Mencatat satu eksekusi query ke statistik global dan per request
+
+    Args:
+        sql (str): SQL ternormalisasi
+        duration_ms (float): Durasi eksekusi dalam milidetik
+        rows (int): Jumlah baris yang dikembalikan/terpengaruh
+        caller (str): Fungsi service pemanggil
+    """
+    with _stats_lock:
+        entry = _stats.get(sql)
+        if entry is None:
+            if len(_stats) >= _settings['max_statements']:
+                entry = None
+            else:
+                entry = _stats[sql] = {
+                    'count': 0, 'total_ms': 0.0, 'max_ms': 0.0,
+                    'rows': 0, 'callers': set()
+                }
+        if entry is not None:
+            entry['count'] += 1
+            entry['total_ms'] += duration_ms
+            entry['max_ms'] = max(entry['max_ms'], duration_ms)
+            entry['rows'] += max(rows, 0)
+            entry['callers'].add(caller)
+
+    if has_app_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+        g.sql_time_ms = g.get('sql_time_ms', 0.0) + duration_ms
+
+    if duration_ms >= _settings['slow_query_ms']:
+        slow_query_logger.warning(
+            "slow query %.1fms rows=%s caller=%s sql=%s",
+            duration_ms, rows, caller, sql
+        )
+
+
+class InstrumentedCursor:
+    """
+    Pembungkus cursor DB-API yang mengukur setiap execute/executemany.
+    Baris yang di-fetch ditambahkan ke query terakhir.
+    """
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._last = None
+
+    def _run(self, method, operation, params):
+        caller = _find_caller()
+        start = time.perf_counter()
+        try:
+            if params is None:
+                return method(operation)
+            return method(operation, params)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            rowcount = getattr(self._cursor, 'rowcount', -1)
+            rows = rowcount if isinstance(rowcount, int) else -1
+            sql = normalize_sql(operation)
+            record_query(sql, duration_ms, rows, caller)
+            # Cursor unbuffered belum tahu jumlah baris; hitung saat fetch
+            self._last = sql if rows < 0 else None
+
+    def execute(self, operation, params=None):
+        """Jalankan satu statement dengan timing"""
+        return self._run(self._cursor.execute, operation, params)
+
+    def executemany(self, operation, seq_params):
+        """Jalankan statement batch dengan timing"""
+        return self._run(self._cursor.executemany, operation, seq_params)
+
+    def _count_fetched(self, rows):
+        if self._last is None:
+            return
+        with _stats_lock:
+            entry = _stats.get(self._last)
+            if entry is not None:
+                entry['rows'] += rows
+
+    def fetchone(self):
+        """Ambil satu baris"""
+        row = self._cursor.fetchone()
+        if row is not None:
+            self._count_fetched(1)
+        return row
+
+    def fetchall(self):
+        """Ambil semua baris"""
+        rows = self._cursor.fetchall()
+        self._count_fetched(len(rows))
+        return rows
+
+    def fetchmany(self, *args, **kwargs):
+        """Ambil sebagian baris"""
+        rows = self._cursor.fetchmany(*args, **kwargs)
+        self._count_fetched(len(rows))
+        return rows
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def get_query_stats(top=20):
+    """
+    Statistik query terberat berdasarkan total waktu
+
+    Args:
+        top (int): Jumlah statement yang ditampilkan
+
+    Returns:
+        dict: Ringkasan dan daftar statement terberat
+    """
+    with _stats_lock:
+        items = [
+            {
+                'sql': sql,
+                'count': entry['count'],
+                'total_ms': round(entry['total_ms'], 2),
+                'avg_ms': round(entry['total_ms'] / entry['count'], 2),
+                'max_ms': round(entry['max_ms'], 2),
+                'rows': entry['rows'],
+                'callers': sorted(entry['callers'])
+            }
+            for sql, entry in _stats.items()
+        ]
+    items.sort(key=lambda item: item['total_ms'], reverse=True)
+    return {
+        'statements': len(items),
+        'slow_query_ms': _settings['slow_query_ms'],
+        'top': items[:top]
+    }
+
+
+def reset_query_stats():
+    """Mengosongkan statistik query global"""
+    with _stats_lock:
+        _stats.clear()
+
+
+def _add_request_totals(response):
+    count = g.get('sql_query_count', 0)
+    db_time_ms = g.get('sql_time_ms', 0.0)
+    response.headers['X-DB-Query-Count'] = str(count)
+    response.headers['X-DB-Time-Ms'] = f"{db_time_ms:.2f}"
+    if _settings['log_requests'] and count:
+        request_logger.info("queries=%d db_time=%.2fms", count, db_time_ms)
+    return response
+
+
+def init_app(app):
+    """
+    Membaca konfigurasi instrumentasi dan memasang header total per request
+
+    Args:
+        app (Flask): Flask application instance
+    """
+    _settings['slow_query_ms'] = float(app.config.get('SLOW_QUERY_THRESHOLD_MS', 200))
+    _settings['log_requests'] = bool(app.config.get('SQL_LOG_REQUESTS', False))
+    app.after_request(_add_request_totals)
@@ -0,0 +1,153 @@
+"""
+Scheduler sederhana untuk tugas periodik di dalam proses aplikasi
+"""
+import logging
+import threading
+import time
+
+logger = logging.getLogger('absensi.scheduler')
+
+
+class PeriodicTask:
+    """Menjalankan satu fungsi secara berkala di thread daemon"""
+
+    def __init__(self, name, interval, func, run_at_start=False):
+        """
+        Args:
+            name (str): Nama tugas (unik di scheduler)
+            interval (float): Jeda antar eksekusi dalam detik
+            func (callable): Fungsi tanpa argumen; hasilnya dicatat di stats
+            run_at_start (bool): Jalankan sekali segera saat start
+        """
+        self.name = name
+        self.interval = interval
+        self.func = func
+        self.run_at_start = run_at_start
+        self._stop = threading.Event()
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stats = {
+            'runs': 0,
+            'errors': 0,
+            'last_run': None,
+            'last_duration_ms': None,
+            'last_result': None,
+            'last_error': None
+        }
+
+    def run_once(self):
+        """
+        Menjalankan tugas sekali (exception dicatat, tidak dilempar)
+
+        Returns:
+            Hasil fungsi atau None jika gagal
+        """
+        start = time.perf_counter()
+        result = None
+        error = None
+        try:
+            result = self.func()
+        except Exception as err:  # pylint: disable=broad-except
+            error = str(err)
+            logger.exception("Tugas %s gagal", self.name)
+        duration_ms = round((time.perf_counter() - start) * 1000, 2)
+        with self._lock:
+            self._stats['runs'] += 1
+            self._stats['last_run'] = time.time()
+            self._stats['last_duration_ms'] = duration_ms
+            if error is None:
+                self._stats['last_result'] = result
+            else:
+                self._stats['errors'] += 1
+                self._stats['last_error'] = error
+        return result
+
+    def _loop(self):
+        if self.run_at_start:
+            self.run_once()
+        while not self._stop.wait(self.interval):
+            self.run_once()
+
+    def start(self):
+        """Mulai thread tugas (idempotent)"""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._loop, name=f"task-{self.name}", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self, timeout=None):
+        """Hentikan thread tugas"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def stats(self):
+        """
+        Statistik eksekusi tugas
+
+        Returns:
+            dict: runs, errors, waktu & hasil eksekusi terakhir
+        """
+        with self._lock:
+            data = dict(self._stats)
+        data['interval'] = self.interval
+        data['running'] = self._thread is not None and self._thread.is_alive()
+        return data
+
+
+class Scheduler:
+    """Kumpulan PeriodicTask yang dijalankan bersama"""
+
+    def __init__(self):
+        self._tasks = {}
+        self._lock = threading.Lock()
+
+    def add(self, name, interval, func, run_at_start=False):
+        """
+        Mendaftarkan tugas periodik. Nama yang sudah terdaftar diabaikan
+        (create_app boleh dipanggil lebih dari sekali).
+
+        Returns:
+            PeriodicTask: Tugas yang terdaftar
+        """
+        with self._lock:
+            task = self._tasks.get(name)
+            if task is None:
+                task = PeriodicTask(name, interval, func, run_at_start)
+                self._tasks[name] = task
+            return task
+
+    def get(self, name):
+        """Ambil tugas berdasarkan nama (atau None)"""
+        return self._tasks.get(name)
+
+    def start(self):
+        """Mulai semua tugas"""
+        with self._lock:
+            tasks = list(self._tasks.values())
+        for task in tasks:
+            task.start()
+
+    def stop(self, timeout=None):
+        """Hentikan semua tugas"""
+        with self._lock:
+            tasks = list(self._tasks.values())
+        for task in tasks:
+            task.stop(timeout)
+
+    def stats(self):
+        """
+        Statistik semua tugas
+
+        Returns:
+            dict: {nama_tugas: stats}
+        """
+        with self._lock:
+            tasks = dict(self._tasks)
+        return {name: task.stats() for name, task in tasks.items()}
+
+
+scheduler = Scheduler()
@@ -0,0 +1,233 @@
+"""
+Backend SQLite (file atau in-memory) dengan antarmuka mirip mysql.connector
+
+Dipakai untuk menjalankan aplikasi, test, dan benchmark tanpa server MySQL.
+Query service tetap ditulis dalam dialek MySQL (placeholder %s,
+INSERT IGNORE, DDL AUTO_INCREMENT/ENUM) lalu diterjemahkan di sini.
+"""
+import re
+import sqlite3
+import threading
+import time
+from datetime import date, datetime
+
+from mysql.connector import errors
+
+# ========================================
+# TYPE ADAPTERS
+# ========================================
+# Waktu disimpan sebagai teks 'YYYY-MM-DD HH:MM:SS' (waktu WIB lokal),
+# sama seperti yang dilakukan mysql.connector untuk kolom DATETIME.
+
+
+def _adapt_datetime(value):
+    return value.replace(tzinfo=None).isoformat(' ')
+
+
+def _convert_datetime(value):
+    return datetime.fromisoformat(value.decode())
+
+
+def _convert_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, lambda value: value.isoformat())
+sqlite3.register_converter('DATETIME', _convert_datetime)
+sqlite3.register_converter('DATE', _convert_date)
+
+# ========================================
+# SQL TRANSLATION
+# ========================================
+_TRANSLATIONS = [
+    (re.compile(r'\bINT\s+AUTO_INCREMENT\s+PRIMARY\s+KEY\b', re.I),
+     'INTEGER PRIMARY KEY AUTOINCREMENT'),
+    (re.compile(r'\bENUM\s*\([^)]*\)', re.I), 'VARCHAR(20)'),
+    (re.compile(r'\bINSERT\s+IGNORE\b', re.I), 'INSERT OR IGNORE'),
+    (re.compile(r'%s'), '?'),
+]
+
+_translation_cache = {}
+
+# Berapa lama menunggu lock tabel (shared-cache in-memory) sebelum menyerah
+LOCK_RETRY_SECONDS = 5.0
+
+
+def translate_sql(sql):
+    """
+    Menerjemahkan SQL dialek MySQL yang dipakai service ke SQLite
+
+    Args:
+        sql (str): SQL dialek MySQL
+
+    Returns:
+        str: SQL dialek SQLite
+    """
+    translated = _translation_cache.get(sql)
+    if translated is None:
+        translated = sql
+        for pattern, replacement in _TRANSLATIONS:
+            translated = pattern.sub(replacement, translated)
+        if len(_translation_cache) < 1000:
+            _translation_cache[sql] = translated
+    return translated
+
+
+def _map_error(err):
+    """Ubah error sqlite3 menjadi error mysql.connector yang ditangkap routes"""
+    if isinstance(err, sqlite3.IntegrityError):
+        return errors.IntegrityError(msg=str(err))
+    if isinstance(err, sqlite3.OperationalError):
+        return errors.OperationalError(msg=str(err))
+    if isinstance(err, sqlite3.ProgrammingError):
+        return errors.ProgrammingError(msg=str(err))
+    return errors.DatabaseError(msg=str(err))
+
+
+def _is_locked(err):
+    message = str(err).lower()
+    return 'locked' in message or 'busy' in message
+
+
+class SQLiteCursor:
+    """Cursor SQLite dengan opsi dictionary=True seperti mysql.connector"""
+
+    def __init__(self, conn, dictionary=False):
+        self._cursor = conn.cursor()
+        self._dictionary = dictionary
+
+    def _retry(self, method, sql, params):
+        deadline = time.monotonic() + LOCK_RETRY_SECONDS
+        while True:
+            try:
+                return method(translate_sql(sql), params)
+            except sqlite3.OperationalError as err:
+                if not _is_locked(err) or time.monotonic() > deadline:
+                    raise _map_error(err) from err
+                time.sleep(0.005)
+            except sqlite3.Error as err:
+                raise _map_error(err) from err
+
+    def execute(self, operation, params=None):
+        """Jalankan satu statement"""
+        self._retry(self._cursor.execute, operation, tuple(params or ()))
+
+    def executemany(self, operation, seq_params):
+        """Jalankan statement untuk setiap set parameter"""
+        self._retry(
+            self._cursor.executemany, operation,
+            [tuple(params) for params in seq_params]
+        )
+
+    def _to_row(self, row):
+        if row is None or not self._dictionary:
+            return row
+        columns = [col[0] for col in self._cursor.description]
+        return dict(zip(columns, row))
+
+    def fetchone(self):
+        """Ambil satu baris"""
+        return self._to_row(self._cursor.fetchone())
+
+    def fetchall(self):
+        """Ambil semua baris"""
+        return [self._to_row(row) for row in self._cursor.fetchall()]
+
+    def fetchmany(self, size=1):
+        """Ambil sebagian baris"""
+        return [self._to_row(row) for row in self._cursor.fetchmany(size)]
+
+    def __iter__(self):
+        return iter(self.fetchall())
+
+    @property
+    def rowcount(self):
+        """Jumlah baris terpengaruh (-1 untuk SELECT)"""
+        return self._cursor.rowcount
+
+    @property
+    def lastrowid(self):
+        """ID baris terakhir yang di-insert"""
+        return self._cursor.lastrowid
+
+    @property
+    def description(self):
+        """Deskripsi kolom hasil query"""
+        return self._cursor.description
+
+    def close(self):
+        """Tutup cursor"""
+        self._cursor.close()
+
+
+class SQLiteConnection:
+    """Koneksi SQLite dengan antarmuka yang dipakai service dan pool"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self, dictionary=False, **_kwargs):
+        """Membuat cursor (argumen lain mysql.connector diabaikan)"""
+        return SQLiteCursor(self._conn, dictionary=dictionary)
+
+    def commit(self):
+        """Commit transaksi"""
+        try:
+            self._conn.commit()
+        except sqlite3.Error as err:
+            raise _map_error(err) from err
+
+    def rollback(self):
+        """Rollback transaksi"""
+        self._conn.rollback()
+
+    def is_connected(self):
+        """Health check untuk pool"""
+        try:
+            self._conn.execute('SELECT 1')
+            return True
+        except sqlite3.Error:
+            return False
+
+    def close(self):
+        """Tutup koneksi"""
+        self._conn.close()
+
+
+_memory_keepalive = {}
+_memory_lock = threading.Lock()
+
+
+def connect(database=':memory:', timeout=5.0):
+    """
+    Membuka koneksi SQLite
+
+    Untuk database ':memory:' semua koneksi berbagi satu database
+    in-memory (shared cache) yang hidup selama proses berjalan.
+
+    Args:
+        database (str): Path file database atau ':memory:'
+        timeout (float): Busy timeout dalam detik
+
+    Returns:
+        SQLiteConnection: Koneksi database
+    """
+    options = {
+        'timeout': timeout,
+        'detect_types': sqlite3.PARSE_DECLTYPES,
+        'check_same_thread': False
+    }
+    if database == ':memory:':
+        uri = 'file:absensi_qr_memory?mode=memory&cache=shared'
+        with _memory_lock:
+            # Database in-memory hilang saat koneksi terakhir ditutup
+            if uri not in _memory_keepalive:
+                _memory_keepalive[uri] = sqlite3.connect(uri, uri=True, **options)
+        conn = sqlite3.connect(uri, uri=True, **options)
+    else:
+        conn = sqlite3.connect(database, **options)
+        conn.execute('PRAGMA journal_mode=WAL')
+        conn.execute('PRAGMA synchronous=NORMAL')
+    conn.execute('PRAGMA foreign_keys=ON')
+    return SQLiteConnection(conn)
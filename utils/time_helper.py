@@ -1,7 +1,7 @@
 """
 Time helper utilities untuk timezone WIB
 """
-from datetime import datetime
+from datetime import datetime, timedelta
 from config import WIB
 
 
@@ -44,3 +44,51 @@ def format_datetime(dt_object, fmt='%Y-%m-%d %H:%M:%S'):
     if isinstance(dt_object, datetime):
         return dt_object.strftime(fmt)
     return str(dt_object)
+
+
+def get_day_range_wib(day=None):
+    """
+    Rentang setengah-terbuka [awal hari, awal hari berikutnya) dalam WIB
+
+    Dipakai sebagai predikat range (waktu_absen >= awal AND waktu_absen < akhir)
+    agar query per tanggal bisa memakai index pada kolom waktu.
+
+    Args:
+        day (date): Tanggal yang diinginkan (default hari ini WIB)
+
+    Returns:
+        tuple: (awal, akhir) berupa naive datetime waktu WIB
+    """
+    if day is None:
+        day = get_current_time_wib().date()
+    start = datetime(day.year, day.month, day.day)
+    return start, start + timedelta(days=1)
+
+
+def parse_client_time_wib(value):
+    """
+    Mengubah timestamp dari client ke datetime WIB
+
+    Args:
+        value: Epoch milidetik (Date.now() di browser) atau string
+            ISO 8601; string tanpa zona waktu dianggap WIB
+
+    Returns:
+        datetime or None: Datetime WIB, None jika format tidak dikenal
+    """
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        try:
+            return datetime.fromtimestamp(value / 1000, WIB)
+        except (OverflowError, OSError, ValueError):
+            return None
+    if isinstance(value, str):
+        try:
+            parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+        except ValueError:
+            return None
+        if parsed.tzinfo is None:
+            return localize_to_wib(parsed)
+        return parsed.astimezone(WIB)
+    return None